@@ -0,0 +1,72 @@
+'''
+Memory check of a long plotting campaign
+========================================
+
+Makes many plots in a PlotSession (with fresh synthetic histograms for each of them)
+and checks that the resident memory stays flat: the growth between the end of the
+warm-up and the last plot must stay below --max-growth MB (exit code 1 otherwise).
+
+Usage:
+  python benchmarks/bench_memory.py [-n 10000] [--outputs png] [--max-growth 20]
+'''
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import hepplotting as plt
+from hepplotting.root_setup import load_root
+
+ROOT = load_root()
+ROOT.gROOT.SetBatch(True)
+ROOT.gErrorIgnoreLevel = ROOT.kWarning
+
+
+def rss_mb():
+    '''Current resident memory of the process in MB'''
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1])*os.sysconf('SC_PAGE_SIZE')/1024.**2
+
+
+def make_inputs(i, nbins=50):
+    def histo(name, n):
+        h = ROOT.TH1F('{}_{}'.format(name, i), name, nbins, -5, 10)
+        h.FillRandom('gaus', n)
+        return h
+    dictBkg = {b: [histo(b, 500), c, b] for b, c in (('bkg1', 868), ('bkg2', 867), ('bkg3', 866))}
+    dictSig = {'s': [histo('s', 100), ROOT.kRed+1, 20, 'signal']}
+    hData = histo('data', 1500)
+    hTot = plt.sum_histograms([v[0] for v in dictBkg.values()], name='tot_{}'.format(i))
+    return dictBkg, dictSig, hTot, hData
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check that memory stays flat in a PlotSession')
+    parser.add_argument('-n', '--nplots', type=int, default=10000, help='number of plots')
+    parser.add_argument('--outputs', default='none', help='output formats (default: none)')
+    parser.add_argument('--max-growth', type=float, default=20., help='allowed growth in MB')
+    args = parser.parse_args()
+
+    plotdir = tempfile.mkdtemp(prefix='hepplotting_mem_')
+    warmup = max(args.nplots//10, 1)
+    try:
+        with plt.PlotSession() as session:
+            for i in range(args.nplots):
+                dictBkg, dictSig, hTot, hData = make_inputs(i)
+                ratio_type = ('ratio', 'signif')[i % 2]
+                plt.make_nice_canvas(dictBkg, hTot, hData, 'mem', dictSig=dictSig, ratio_type=ratio_type,
+                                     is_logy=bool(i % 3), plotdir=plotdir, outputs=args.outputs, session=session)
+                if i+1 == warmup:
+                    rss0 = rss_mb()
+            rss1 = rss_mb()
+    finally:
+        shutil.rmtree(plotdir)
+
+    growth = rss1-rss0
+    sys.stdout.write('{} plots: {:.1f} MB after warm-up, {:.1f} MB at the end ({:+.1f} MB)\n'.format(
+        args.nplots, rss0, rss1, growth))
+    if growth > args.max_growth:
+        sys.stdout.write('FAILED: memory grew by more than {} MB\n'.format(args.max_growth))
+        sys.exit(1)
@@ -0,0 +1,211 @@
+'''
+Benchmarks of the plotting pipeline
+===================================
+
+Times make_nice_canvas (end to end and per stage, without outputs, and for each output format)
+and the histogram helpers on synthetic histograms, for several numbers of bins,
+backgrounds and signals, ratio types and log-y, and the large-bin modes (unrolled TH2 and
+one bin per region with bin_label). Results are written in a JSON file
+which can be compared with the one of another version.
+
+Usage:
+  python benchmarks/bench_plotting.py -o bench_new.json [--quick]
+  python benchmarks/bench_plotting.py --compare bench_old.json bench_new.json
+'''
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import itertools
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import hepplotting as plt
+from hepplotting.root_setup import load_root
+
+ROOT = load_root()
+ROOT.gROOT.SetBatch(True)
+ROOT.gErrorIgnoreLevel = ROOT.kWarning
+
+counter = 0
+
+
+def get_random_histo(name, N, nbins):
+    global counter
+    counter += 1
+    h = ROOT.TH1F('{}_bench{}'.format(name, counter), name, nbins, -5, 10)
+    h.SetDirectory(0)
+    h.FillRandom('gaus', N)
+    return h
+
+
+def make_inputs(nbins, nbkg, nsig):
+    n_evts = 20*nbins
+    colors = [868, 867, 866, 865, 864, 863, 862, 861]
+    dictBkg = {'bkg{}'.format(i): [get_random_histo('bkg{}'.format(i), n_evts, nbins),
+                                   colors[i % len(colors)], 'Background {}'.format(i)]
+               for i in range(nbkg)}
+    dictSig = {'sig{}'.format(i): [get_random_histo('sig{}'.format(i), n_evts//5, nbins),
+                                   ROOT.kRed+i, 20, 'Signal {}'.format(i)]
+               for i in range(nsig)}
+    hData = plt.sum_histograms([get_random_histo('Data', n_evts, nbins) for i in range(nbkg)], name='data')
+    hTot = plt.sum_histograms([v[0] for v in dictBkg.values()])
+    return dictBkg, dictSig, hTot, hData
+
+
+def get_random_histo2d(name, nx, ny, mean):
+    global counter
+    counter += 1
+    h = ROOT.TH2F('{}_bench{}'.format(name, counter), name, nx, 0, 500, ny, 0, 5)
+    h.SetDirectory(0)
+    contents, sumw2 = plt.th1_views(h)
+    contents[:] = np.random.poisson(mean, contents.size)
+    sumw2[:] = contents
+    return h
+
+
+def bench_large(plotdir, nbins, mode, repeat):
+    '''
+    Time of make_nice_canvas (png output) for nbins bins made of 100-bin groups: TH2 inputs
+    drawn with unroll=True (mode 'unroll'), or TH1 inputs with one label per bin and the
+    groups given by bin_groups (mode 'bin_label')
+    '''
+    nx, ny = min(nbins, 100), max(nbins//100, 1)
+    def run():
+        if mode == 'unroll':
+            dictBkg = {'bkg{}'.format(i): [get_random_histo2d('bkg{}'.format(i), nx, ny, 20), 868-i, 'Background {}'.format(i)]
+                       for i in range(3)}
+            hTot = plt.sum_histograms([v[0] for v in dictBkg.values()])
+            hData = get_random_histo2d('data', nx, ny, 60)
+            kwargs = dict(unroll=True)
+        else:
+            dictBkg, dictSig, hTot, hData = make_inputs(nbins, 3, 0)
+            kwargs = dict(bin_label=['SR{}'.format(i) for i in range(nbins)],
+                          bin_groups=[('Channel {}'.format(j), j*nx, (j+1)*nx) for j in range(ny)])
+        t0 = time.perf_counter()
+        canv = plt.make_nice_canvas(dictBkg, hTot, hData, 'bench', plotdir=plotdir, outputs='png', **kwargs)
+        elapsed = time.perf_counter()-t0
+        canv.Close()
+        return elapsed
+    run()
+    times = [run() for i in range(repeat)]
+    return {'best': min(times), 'mean': sum(times)/len(times), 'repeat': repeat}
+
+
+def timeit(func, repeat):
+    '''Best and mean wall time of func() over repeat calls'''
+    times = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter()-t0)
+    return {'best': min(times), 'mean': sum(times)/len(times), 'repeat': repeat}
+
+
+def bench_canvas(plotdir, nbins, nbkg, nsig, ratio_type, is_logy, outputs, repeat):
+    '''Time of make_nice_canvas only (fresh inputs are made before each call)'''
+    def run():
+        dictBkg, dictSig, hTot, hData = make_inputs(nbins, nbkg, nsig)
+        kwargs = dict(plotdir=plotdir, ratio_type=ratio_type, is_logy=is_logy, outputs=outputs, profile=True)
+        if nsig:
+            kwargs['dictSig'] = dictSig
+        t0 = time.perf_counter()
+        canv = plt.make_nice_canvas(dictBkg, hTot, hData, 'bench', **kwargs)
+        elapsed = time.perf_counter()-t0
+        canv.Close()
+        return elapsed, plt.last_profile()
+    run()  # warm-up (ROOT start-up, first drawing)
+    runs = [run() for i in range(repeat)]
+    times = [t for t, p in runs]
+    stages = plt.summarize_profiles([p for t, p in runs])['stages']
+    return {'best': min(times), 'mean': sum(times)/len(times), 'repeat': repeat,
+            'stages': {s: v['mean'] for s, v in stages.items()}}
+
+
+def bench_helpers(nbins, repeat):
+    dictBkg, dictSig, hTot, hData = make_inputs(nbins, 4, 0)
+    histos = [v[0] for v in dictBkg.values()]
+    return {
+        'sum_histograms': timeit(lambda: plt.sum_histograms(histos), repeat),
+        'add_flat_syst': timeit(lambda: plt.add_flat_syst(hTot, 0.1), repeat),
+        'scale_xaxis': timeit(lambda: plt.scale_xaxis(hTot, 1e-3, addOverflow=True), repeat),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.STDOUT,
+                                         cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except Exception:
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'root': ROOT.gROOT.GetVersion(),
+            'machine': platform.machine(), 'node': platform.node(), 'date': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+
+def run_all(quick=False, repeat=3):
+    bin_counts = [10, 1000] if quick else [10, 100, 1000, 10000]
+    n_procs = [(3, 1)] if quick else [(1, 0), (3, 1), (8, 4)]
+    results = []
+    plotdir = tempfile.mkdtemp(prefix='hepplotting_bench_')
+    try:
+        for nbins, (nbkg, nsig), ratio_type, is_logy in itertools.product(
+                bin_counts, n_procs, ['ratio', 'SoverB', 'signif'], [False, True]):
+            if nsig == 0 and ratio_type != 'ratio':
+                continue
+            config = dict(nbins=nbins, nbkg=nbkg, nsig=nsig, ratio_type=ratio_type, is_logy=is_logy)
+            for outputs in ['none', 'pdf', 'png', 'svg', 'eps', 'root', None]:
+                if quick and outputs not in ('none', None):
+                    continue
+                t = bench_canvas(plotdir, outputs=outputs, repeat=repeat, **config)
+                results.append(dict(config, bench='make_nice_canvas', outputs=outputs or 'default', **t))
+                sys.stdout.write('{:<60} {:8.1f} ms\n'.format(
+                    'make_nice_canvas {} outputs={}'.format(config, outputs or 'default'), 1e3*t['best']))
+        for nbins, mode in itertools.product(bin_counts, ['unroll', 'bin_label']):
+            t = bench_large(plotdir, nbins, mode, repeat)
+            results.append(dict(nbins=nbins, bench='large_bins', mode=mode, **t))
+            sys.stdout.write('{:<60} {:8.1f} ms\n'.format('large_bins mode={} nbins={}'.format(mode, nbins), 1e3*t['best']))
+        for nbins in bin_counts:
+            for name, t in bench_helpers(nbins, 10*repeat).items():
+                results.append(dict(nbins=nbins, bench=name, **t))
+                sys.stdout.write('{:<60} {:8.3f} ms\n'.format('{} nbins={}'.format(name, nbins), 1e3*t['best']))
+    finally:
+        shutil.rmtree(plotdir)
+    return results
+
+
+def _key(r):
+    return tuple(sorted((k, str(v)) for k, v in r.items() if k not in ('best', 'mean', 'repeat', 'stages')))
+
+
+def compare(old_file, new_file):
+    '''Print the ratio new/old of the best times of benchmarks present in both files'''
+    with open(old_file) as f:
+        old = {_key(r): r for r in json.load(f)['results']}
+    with open(new_file) as f:
+        new = json.load(f)['results']
+    for r in new:
+        if _key(r) in old:
+            o = old[_key(r)]['best']
+            label = ' '.join('{}={}'.format(k, v) for k, v in _key(r))
+            sys.stdout.write('{:<100} {:8.2f} ms -> {:8.2f} ms  x{:.2f}\n'.format(label, 1e3*o, 1e3*r['best'], r['best']/o))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the hepplotting pipeline')
+    parser.add_argument('-o', '--output', default='bench_output.json', help='JSON file with the results')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='number of repetitions of each benchmark')
+    parser.add_argument('--quick', action='store_true', help='run a reduced set of configurations')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files')
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+    else:
+        results = run_all(args.quick, args.repeat)
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=1)
+        sys.stdout.write('Results written in {}\n'.format(args.output))
@@ -1 +0,0 @@
-convert -resize 50% plots/Example_plot_Internal.png plots/Example_plot_Internal_reduced.png
@@ -1 +1,22 @@
 from .plot_maker import *
+from .histo import Histo, th1_views, th1_edges
+from .batch import make_many_canvases, PlotResult
+from .significance import significance_array, asimov_z, s_over_sqrt_b, cumulative_significance, optimal_cut
+from .root_setup import load_root, root_loaded
+from .writers import OutputWriter, wait_outputs, OUTPUT_FORMATS
+from .cache import fingerprint, cache_stats, cache_report, reset_cache_stats
+from .inputs import HistoProvider
+from .systematics import combine_systematics, build_total, asym_graph
+from .profiling import last_profile, summarize_profiles, profile_report
+from .session import PlotSession
+from .rebinning import find_binning, rebin, rebin_inputs, fold_flow, merge_bins
+from .yields import make_yield_table, YieldTable, format_yield
+from .filling import fill_histograms, FilledHistos, iter_chunks, fill_arrays
+from .booklet import Booklet
+from .scene import update_canvas, COSMETIC_KWARGS
+from .layout import auto_layout, plot_layout
+from .preview import Preview
+from .intervals import garwood_interval, toy_ratio_interval, gamma_quantile
+from .store import build_store, HistoStore
+from .validation import validate_specs, validation_report, ValidationIssue
+from .unroll import unroll, unroll_arrays, unroll_inputs
@@ -0,0 +1,279 @@
+import os
+import sys
+import time
+import pickle
+import traceback
+import multiprocessing
+import multiprocessing.util
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .profiling import profile_report
+from .validation import validate_specs, validation_report
+
+
+PlotResult = namedtuple('PlotResult', ['plot_name', 'ok', 'elapsed', 'error', 'outputs', 'cached', 'profile', 'page',
+                                       'refreshed'])
+
+
+_session = None
+_booklet = None
+
+
+def _init_worker():
+    '''
+    Executed once per worker process, before its first ROOT plot: ROOT (and
+    the ATLAS style) is set up in batch mode, together with the PlotSession
+    reused by all the plots of the worker. Workers only making matplotlib
+    plots never import ROOT.
+    '''
+    global _session
+    if _session is None:
+        from .root_setup import load_root
+        from .session import PlotSession
+        load_root().gROOT.SetBatch(True)
+        _session = PlotSession()
+
+
+def _get_booklet(name, plotdir, max_pages, per_worker):
+    '''
+    Booklet of the current process. In worker processes, each worker writes its own
+    booklet (name_w<pid>), closed when the worker exits.
+    '''
+    global _booklet
+    if _booklet is None:
+        from .booklet import Booklet
+        if per_worker:
+            name = '{}_w{}'.format(name, os.getpid())
+        _booklet = Booklet(name, plotdir, max_pages)
+        if per_worker:
+            multiprocessing.util.Finalize(_booklet, _booklet.close, exitpriority=10)
+    return _booklet
+
+
+def _close_booklet():
+    global _booklet
+    if _booklet is not None:
+        _booklet.close()
+        _booklet = None
+
+
+def _unpack_spec(spec):
+    '''
+    Return (dictBkg, hTot, hData, plot_name, kwargs) from a plot specification,
+    calling the loader in the current process if the spec provides one (a loader
+    can also return dictSig as fourth element).
+    '''
+    kwargs = dict(spec.get('kwargs', {}))
+    if 'loader' in spec:
+        loaded = spec['loader'](*spec.get('loader_args', ()))
+        dictBkg, hTot, hData = loaded[:3]
+        if len(loaded) > 3:
+            kwargs['dictSig'] = loaded[3]
+    else:
+        dictBkg, hTot, hData = spec['dictBkg'], spec['hTot'], spec['hData']
+    return dictBkg, hTot, hData, spec['plot_name'], kwargs
+
+
+def _spec_outputs(spec):
+    '''Files written by make_nice_canvas for a spec, with the same default outputs'''
+    from .plot_maker import output_paths
+    kwargs = spec.get('kwargs', {})
+    outputs = kwargs.get('outputs')
+    if spec.get('booklet') and outputs is None:
+        outputs = 'none'
+    if kwargs.get('backend', 'root') == 'mpl' and outputs is None:
+        outputs = ['pdf', 'png']
+    return output_paths(spec['plot_name'], kwargs.get('plotdir', 'plots'),
+                        kwargs.get('atlas_label', 'Internal'), outputs, kwargs.get('png_sizes'))
+
+
+def _render_one(payload):
+    '''
+    Worker entry point: payload is the pickled spec, serialized once in the
+    parent process (TH1 are streamed by ROOT in their compact binary form).
+    '''
+    from .plot_maker import make_nice_canvas
+    from .writers import wait_outputs
+    from .profiling import last_profile
+    from .cache import cache_stats
+    spec = pickle.loads(payload)
+    t0 = time.time()
+    try:
+        dictBkg, hTot, hData, plot_name, kwargs = _unpack_spec(spec)
+        is_root = kwargs.get('backend', 'root') == 'root'
+        if is_root:
+            _init_worker()
+            kwargs.setdefault('session', _session)
+        if spec.get('booklet'):
+            kwargs['booklet'] = _get_booklet(*spec['booklet'])
+        n_refreshed = cache_stats()['refreshed']
+        canv = make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs)
+        refreshed = cache_stats()['refreshed'] > n_refreshed
+        if kwargs.get('async_outputs'):
+            wait_outputs()
+        if canv and is_root and not kwargs['session']:
+            canv.Close()
+        profile = last_profile() if kwargs.get('profile') else None
+        page = kwargs['booklet'].index.get(plot_name) if spec.get('booklet') else None
+        return PlotResult(spec['plot_name'], True, time.time()-t0, None, _spec_outputs(spec), canv is None,
+                          profile, page, refreshed)
+    except Exception:
+        return PlotResult(spec['plot_name'], False, time.time()-t0, traceback.format_exc(), [], False, None, None,
+                          False)
+
+
+def _render_chunk(payloads):
+    return [_render_one(p) for p in payloads]
+
+
+def _pool_results(payloads, plot_names, n_workers, mp_context, chunksize, max_plots_per_worker):
+    '''
+    Render the payloads in worker processes and yield their PlotResult in order. The workers
+    are restarted after max_plots_per_worker plots each (in rounds of n_workers*max_plots_per_worker
+    plots); if a worker dies (crash, out of memory), the plots it had not returned yet fail, and
+    the next round goes on with new workers.
+    '''
+    ctx = multiprocessing.get_context(mp_context)
+    step = n_workers*max_plots_per_worker if max_plots_per_worker else len(payloads)
+    for start in range(0, len(payloads), step):
+        end = min(start+step, len(payloads))
+        chunks = [(i, min(i+chunksize, end)) for i in range(start, end, chunksize)]
+        with ProcessPoolExecutor(n_workers, mp_context=ctx) as executor:
+            futures = [executor.submit(_render_chunk, payloads[i:j]) for i, j in chunks]
+            for (i, j), future in zip(chunks, futures):
+                try:
+                    for r in future.result():
+                        yield r
+                except BrokenProcessPool as err:
+                    for plot_name in plot_names[i:j]:
+                        yield PlotResult(plot_name, False, 0., 'BrokenProcessPool: {}'.format(err), [], False, None,
+                                         None, False)
+
+
+def _cached_result(spec):
+    '''
+    Check the render cache in the main process, so that unchanged plots are not
+    even sent to a worker. Return a PlotResult if the plot can be skipped.
+    '''
+    from .cache import fingerprint, is_cached, count
+    if 'loader' in spec or spec['kwargs'].get('force_render'):
+        return None
+    t0 = time.time()
+    dictBkg, hTot, hData, plot_name, kwargs = _unpack_spec(spec)
+    paths = _spec_outputs(spec)
+    plotdir = kwargs.get('plotdir', 'plots')
+    if is_cached(fingerprint(dictBkg, hTot, hData, plot_name, kwargs), plotdir, plot_name, paths):
+        count('hits')
+        return PlotResult(plot_name, True, time.time()-t0, None, paths, True, None, None, False)
+    return None
+
+
+def make_many_canvases(plot_specs, n_workers=None, mp_context=None, chunksize=1,
+                       max_plots_per_worker=None, use_cache=False, force_render=False, profile=False,
+                       booklet=None, booklet_pages=None, on_result=None, validate=True, verbose=False):
+    '''
+    Render many plots with make_nice_canvas using a pool of processes
+    (ROOT is not thread-safe, so each worker is a separate process).
+
+    - Args:
+    . plot_specs [list of dict] one dictionary per plot, with keys:
+       'plot_name' [string] (required),
+       'dictBkg', 'hTot', 'hData' exactly as passed to make_nice_canvas, or
+       'loader' [callable] and 'loader_args' [tuple] returning (dictBkg, hTot, hData)
+        or (dictBkg, hTot, hData, dictSig) inside the worker, to avoid shipping histograms at all,
+       'kwargs' [dict] the key-word arguments of make_nice_canvas.
+    . n_workers [int] number of processes (default: number of cores).
+      With n_workers=1 plots are made in the current process.
+    . mp_context [string] multiprocessing start method ('fork', 'spawn', 'forkserver')
+    . chunksize [int] number of plots sent at once to a worker
+    . max_plots_per_worker [int] restart workers after this many plots (bounds memory)
+      If a worker process dies, its pending plots are reported as failed instead of blocking the campaign.
+    . use_cache [bool] skip plots which did not change since their last rendering (see make_nice_canvas)
+    . force_render [bool] render every plot even if found in the cache
+    . profile [bool] record the per-stage timing of every plot (see profile_report(r.profile for r in results))
+    . booklet [string] path without extension (eg. 'plots/campaign') of the multi-page PDF and ROOT file
+      collecting all plots (see Booklet), with one booklet per worker process (path_w<pid>.pdf) and
+      a common index path_index.json; no individual file is written unless outputs is given
+    . booklet_pages [int] maximum number of pages per booklet file
+    . on_result [callable] called with each PlotResult as soon as the plot is done (in the order
+      of plot_specs), eg. to record the progress of a long campaign
+    . validate [bool] check all specs before making any plot (see validate_specs) and raise a ValueError
+      listing every problem if one is an error (default: True)
+    . verbose [bool] print a summary at the end (with the profile report if profile is True)
+
+    - Return:
+    . list of PlotResult(plot_name, ok, elapsed, error, outputs, cached, profile, page, refreshed) in the order of plot_specs,
+      where outputs are the file names written by make_nice_canvas, error is
+      the formatted traceback of a failed plot, cached is True for skipped plots, refreshed is True for
+      plots only updated for cosmetic changes (see make_nice_canvas use_cache)
+      profile is the dictionary given by make_nice_canvas(..., profile=True) and page the booklet
+      index entry {'pdf': file, 'page': number, 'root': file, 'key': name}.
+    '''
+    for spec in plot_specs:
+        for arg in ('canvas', 'session', 'writer', 'booklet'):
+            if arg in spec.get('kwargs', {}):
+                raise ValueError('plot \'{}\': a {} cannot be sent to a worker process'.format(spec['plot_name'], arg))
+    if validate:
+        issues = validate_specs(plot_specs)
+        if any(i.severity == 'error' for i in issues):
+            raise ValueError(validation_report(issues))
+        if issues and verbose:
+            sys.stdout.write(validation_report(issues)+'\n')
+    for spec in plot_specs:
+        plotdir = spec.get('kwargs', {}).get('plotdir', 'plots')
+        if plotdir and not os.path.isdir(plotdir):
+            os.makedirs(plotdir)
+
+    t0 = time.time()
+    if profile:
+        plot_specs = [dict(spec, kwargs=dict(spec.get('kwargs', {}), profile=True)) for spec in plot_specs]
+    results = [None]*len(plot_specs)
+    if use_cache:
+        plot_specs = [dict(spec, kwargs=dict(spec.get('kwargs', {}), use_cache=True, force_render=force_render))
+                      for spec in plot_specs]
+        # Plots of a booklet always go to a worker, which adds them to its booklet
+        if not booklet:
+            results = [_cached_result(spec) for spec in plot_specs]
+        if on_result:
+            for r in results:
+                if r is not None:
+                    on_result(r)
+    todo = [i for i, r in enumerate(results) if r is None]
+    if n_workers is None:
+        n_workers = multiprocessing.cpu_count()
+    in_pool = n_workers > 1 and len(todo) > 1
+    if booklet:
+        booklet_dir, booklet_name = os.path.split(booklet)
+        if booklet_dir and not os.path.isdir(booklet_dir):
+            os.makedirs(booklet_dir)
+        plot_specs = [dict(spec, booklet=(booklet_name, booklet_dir, booklet_pages, in_pool)) for spec in plot_specs]
+    payloads = [pickle.dumps(plot_specs[i], pickle.HIGHEST_PROTOCOL) for i in todo]
+
+    def collect(rendered):
+        for i, r in zip(todo, rendered):
+            results[i] = r
+            if on_result:
+                on_result(r)
+
+    if not in_pool:
+        try:
+            collect(_render_one(p) for p in payloads)
+        finally:
+            _close_booklet()
+    else:
+        collect(_pool_results(payloads, [plot_specs[i]['plot_name'] for i in todo], n_workers, mp_context,
+                              chunksize, max_plots_per_worker))
+    if booklet:
+        from .booklet import write_index
+        write_index(OrderedDict((r.plot_name, r.page) for r in results if r.page), booklet+'_index.json')
+
+    if verbose:
+        n_ok, n_cached = sum(r.ok for r in results), sum(r.cached for r in results)
+        n_refreshed = sum(r.refreshed for r in results)
+        sys.stdout.write('{}/{} plots done in {:.1f} s ({} unchanged, {} refreshed, {} failed)\n'.format(
+            n_ok, len(results), time.time()-t0, n_cached, n_refreshed, len(results)-n_ok))
+        if profile:
+            sys.stdout.write(profile_report([r.profile for r in results])+'\n')
+    return results
@@ -0,0 +1,131 @@
+import os
+import json
+from collections import OrderedDict
+
+
+class Booklet(object):
+    '''
+    Multi-page output of a plot campaign
+    ====================================
+
+    Every canvas added to the booklet becomes a page of one multi-page PDF (with a bookmark
+    titled by the plot name) and is written in one ROOT file under the plot name, instead of
+    a few small files per plot. An index maps each plot name to its PDF file, page and ROOT
+    file. With max_pages, the booklet is split in shards of at most max_pages pages
+    (name_000.pdf, name_000.root, name_001.pdf...).
+
+    ROOT can only write one multi-page PDF at a time: a single booklet of ROOT canvases can be
+    open per process (make_many_canvases(..., booklet=name) writes one booklet per worker).
+    matplotlib figures (backend='mpl') are only written in the PDF.
+
+    - Args:
+    . name [string] base name of the files
+    . plotdir [string] directory of the files (default: 'plots')
+    . max_pages [int] number of pages per shard (default: None, no sharding)
+    . root_file [bool] also write the canvases in a ROOT file (default: True)
+
+    Usage:
+       with Booklet('control_plots') as booklet:
+           for ...:
+               make_nice_canvas(dictBkg, hTot, hData, plot_name=name, booklet=booklet)
+       # plots/control_plots.pdf, plots/control_plots.root and plots/control_plots_index.json
+    '''
+
+    def __init__(self, name, plotdir='plots', max_pages=None, root_file=True):
+        self.name = name
+        self.plotdir = plotdir
+        self.max_pages = max_pages
+        self.root_file = root_file
+        self.index = OrderedDict()
+        self.files = []
+        self._shard, self._pages = -1, 0
+        self._pdf, self._tfile, self._mpl_pdf = None, None, None
+        if plotdir and not os.path.isdir(plotdir):
+            os.makedirs(plotdir)
+
+    def _path(self, ext):
+        base = self.name if self.max_pages is None else '{}_{:03d}'.format(self.name, self._shard)
+        return os.path.join(self.plotdir, base+ext)
+
+    def _close_shard(self):
+        if self._pdf:
+            from .root_setup import ROOT
+            # Any canvas closes the multi-page file
+            closer = ROOT.TCanvas('booklet_closer', '', 10, 10)
+            closer.Print(self._pdf+']')
+            closer.Close()
+        if self._mpl_pdf:
+            self._mpl_pdf.close()
+        if self._tfile:
+            self._tfile.Close()
+        self._pdf, self._tfile, self._mpl_pdf = None, None, None
+
+    def _next_page(self):
+        if self._shard < 0 or (self.max_pages and self._pages >= self.max_pages):
+            self._close_shard()
+            self._shard, self._pages = self._shard+1, 0
+            self.files.append(self._path('.pdf'))
+        self._pages += 1
+
+    def add(self, canv, plot_name):
+        '''
+        Add canv [TCanvas or matplotlib Figure] as a new page; return its index entry
+        {'pdf': file, 'page': number (from 1), 'root': file or None, 'key': name in the ROOT file}
+        '''
+        is_mpl = hasattr(canv, 'savefig')
+        if plot_name in self.index:
+            raise NameError('plot \'{}\' is already in booklet \'{}\''.format(plot_name, self.name))
+        if (is_mpl and self._pdf) or (not is_mpl and self._mpl_pdf):
+            raise NameError('booklet \'{}\' cannot mix ROOT canvases and matplotlib figures'.format(self.name))
+        self._next_page()
+        entry = {'pdf': self._path('.pdf'), 'page': self._pages, 'root': None, 'key': plot_name}
+        if is_mpl:
+            if self._mpl_pdf is None:
+                from matplotlib.backends.backend_pdf import PdfPages
+                self._mpl_pdf = PdfPages(entry['pdf'])
+            self._mpl_pdf.savefig(canv)
+        else:
+            from .root_setup import ROOT
+            if self._pdf is None:
+                self._pdf = entry['pdf']
+                canv.Print(self._pdf+'[')
+            canv.Print(self._pdf, 'Title:'+plot_name)
+            if self.root_file:
+                if self._tfile is None:
+                    self._tfile = ROOT.TFile.Open(self._path('.root'), 'RECREATE')
+                    self.files.append(self._path('.root'))
+                self._tfile.WriteTObject(canv, plot_name)
+                entry['root'] = self._path('.root')
+        self.index[plot_name] = entry
+        return entry
+
+    def write_index(self, path=None):
+        '''Write the index (plot name -> PDF page and ROOT key) as JSON; return its path'''
+        path = path or os.path.join(self.plotdir, self.name+'_index.json')
+        write_index(self.index, path)
+        return path
+
+    def close(self):
+        '''Close the files and write the index; return the list of written files'''
+        self._close_shard()
+        if self.index:
+            self.files.append(self.write_index())
+        return list(self.files)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_index(index, path):
+    '''
+    Write the booklet index {plot_name: entry} as JSON, with the list of plots of each
+    PDF file as table of contents
+    '''
+    toc = OrderedDict()
+    for name, entry in index.items():
+        toc.setdefault(entry['pdf'], []).append([entry['page'], name])
+    with open(path, 'w') as f:
+        json.dump({'plots': index, 'toc': toc}, f, indent=1)
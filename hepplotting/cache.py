@@ -0,0 +1,181 @@
+import os
+import hashlib
+import json
+import numpy as np
+
+from .histo import Histo, _buffer_view
+from .unroll import histo_arrays
+from .scene import COSMETIC_KWARGS, cosmetic_changes
+
+
+# Increase when the rendering changes, to invalidate every existing fingerprint
+CACHE_VERSION = 3
+
+# make_nice_canvas arguments which do not change the content of the output files
+_IGNORED_KWARGS = ('canvas', 'session', 'writer', 'async_outputs', 'use_cache', 'force_render', 'profile',
+                   'booklet')
+
+_stats = {'hits': 0, 'misses': 0, 'forced': 0, 'refreshed': 0}
+
+# Point arrays hashed for each class of graph (eg. tot_graph of build_total)
+_GRAPH_ARRAYS = (
+    ('TGraphAsymmErrors', ('GetX', 'GetY', 'GetEXlow', 'GetEXhigh', 'GetEYlow', 'GetEYhigh')),
+    ('TGraphErrors', ('GetX', 'GetY', 'GetEX', 'GetEY')),
+    ('TGraph', ('GetX', 'GetY')),
+)
+
+# Plain values hashed through their repr, which does not depend on the process
+_SCALARS = (str, bytes, bool, int, float, np.generic, type(None))
+
+
+def _feed(hasher, obj):
+    '''
+    Recursively feed obj into hasher: histograms and graphs through their arrays,
+    containers element by element (dictionaries in insertion order, which matters for
+    eg. dictSig) and plain values through their repr. Any other object raises TypeError,
+    as its repr may change from one run to the next.
+    '''
+    if isinstance(obj, Histo):
+        hasher.update(b'Histo')
+        for a in (obj.edges, obj.contents, obj.sumw2):
+            hasher.update(np.ascontiguousarray(a).tobytes())
+    elif hasattr(obj, 'InheritsFrom') and obj.InheritsFrom('TH1') and obj.GetDimension() == 1:
+        hasher.update(obj.ClassName().encode())
+        _feed(hasher, Histo.from_th1(obj))
+    elif hasattr(obj, 'InheritsFrom') and obj.InheritsFrom('TH1'):
+        contents, sumw2, edges = histo_arrays(obj)
+        hasher.update(obj.ClassName().encode())
+        for a in edges+[contents, sumw2]:
+            hasher.update(np.ascontiguousarray(a).tobytes())
+    elif hasattr(obj, 'InheritsFrom') and obj.InheritsFrom('TGraph'):
+        hasher.update(obj.ClassName().encode())
+        getters = next(g for cls, g in _GRAPH_ARRAYS if obj.InheritsFrom(cls))
+        n = obj.GetN()
+        for getter in getters:
+            if n:
+                hasher.update(_buffer_view(getattr(obj, getter)(), n, np.float64).tobytes())
+    elif isinstance(obj, np.ndarray):
+        hasher.update(str(obj.dtype).encode())
+        hasher.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        hasher.update(b'{')
+        for k in obj:
+            _feed(hasher, k)
+            _feed(hasher, obj[k])
+        hasher.update(b'}')
+    elif isinstance(obj, (list, tuple)):
+        hasher.update(b'[')
+        for o in obj:
+            _feed(hasher, o)
+        hasher.update(b']')
+    elif isinstance(obj, _SCALARS):
+        hasher.update(repr(obj).encode())
+    else:
+        raise TypeError('Cannot fingerprint {!r} of type {} for the render cache (use_cache)'.format(obj, type(obj).__name__))
+
+
+def fingerprint(dictBkg, hTot, hData, plot_name, kwargs):
+    '''
+    Return the fingerprint of everything defining a plot, as 'data:cosmetic' where data is the
+    hexadecimal SHA-1 of the histogram arrays, colors, legend names and key-word arguments of
+    make_nice_canvas, and cosmetic the one of the arguments which can be updated on a drawn
+    plot (see COSMETIC_KWARGS).
+    '''
+    data, cosmetic = hashlib.sha1(), hashlib.sha1()
+    _feed(data, CACHE_VERSION)
+    _feed(data, plot_name)
+    _feed(data, [[n]+list(v) for n, v in dictBkg.items()])
+    _feed(data, hTot)
+    _feed(data, hData)
+    # The order of the key-word arguments does not matter, unlike the one of their values
+    _feed(data, sorted((k, v) for k, v in kwargs.items() if k not in _IGNORED_KWARGS+COSMETIC_KWARGS))
+    _feed(cosmetic, sorted(cosmetic_kwargs(kwargs).items()))
+    return data.hexdigest()+':'+cosmetic.hexdigest()
+
+
+def cosmetic_kwargs(kwargs):
+    '''The cosmetic arguments of kwargs, as stored in JSON (tuples become lists)'''
+    return json.loads(json.dumps({k: kwargs[k] for k in COSMETIC_KWARGS if kwargs.get(k) is not None}, default=str))
+
+
+def fingerprint_path(plotdir, plot_name):
+    '''
+    Name of the file storing the fingerprint of a plot in plotdir (eg. plots/.myplot.sha1),
+    which does not depend on the cosmetic arguments (eg. atlas_label)
+    '''
+    return os.path.join(plotdir or '.', '.'+plot_name+'.sha1')
+
+
+def read_fingerprint(plotdir, plot_name):
+    '''
+    Return the stored {'digest': ..., 'paths': [...], 'cosmetics': {...}} of a plot, or None
+    '''
+    try:
+        with open(fingerprint_path(plotdir, plot_name)) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def is_cached(digest, plotdir, plot_name, paths):
+    '''
+    True if the stored fingerprint is digest and all output files exist
+    '''
+    stored = read_fingerprint(plotdir, plot_name)
+    if not paths or not stored:
+        return False
+    return stored['digest'] == digest and all(os.path.isfile(p) for p in paths)
+
+
+def refreshable(digest, plotdir, plot_name, kwargs):
+    '''
+    If only cosmetic arguments changed since the stored rendering, return (root_path, changes)
+    where root_path is the ROOT output file holding the canvas and changes the arguments of
+    update_canvas; None otherwise.
+    '''
+    stored = read_fingerprint(plotdir, plot_name)
+    if not stored or stored['digest'].split(':')[0] != digest.split(':')[0]:
+        return None
+    roots = [p for p in stored['paths'] if p.endswith('.root') and os.path.isfile(p)]
+    changes = cosmetic_changes(stored['cosmetics'], kwargs)
+    if not roots or changes is None:
+        return None
+    return roots[0], changes
+
+
+def store_fingerprint(digest, plotdir, plot_name, paths, kwargs):
+    if paths:
+        with open(fingerprint_path(plotdir, plot_name), 'w') as f:
+            json.dump({'digest': digest, 'paths': list(paths), 'cosmetics': cosmetic_kwargs(kwargs)}, f)
+
+
+def remove_fingerprint(plotdir, plot_name):
+    path = fingerprint_path(plotdir, plot_name)
+    if os.path.isfile(path):
+        os.remove(path)
+
+
+def count(kind, n=1):
+    _stats[kind] += n
+
+
+def cache_stats():
+    '''
+    Return {'hits': ..., 'misses': ..., 'forced': ..., 'refreshed': ...} for this process
+    '''
+    return dict(_stats)
+
+
+def reset_cache_stats():
+    for k in _stats:
+        _stats[k] = 0
+
+
+def cache_report(stats=None):
+    '''
+    One-line summary of the render cache statistics
+    '''
+    stats = stats or _stats
+    n = stats['hits']+stats['misses']+stats['forced']+stats.get('refreshed', 0)
+    return 'render cache: {} plots, {} skipped (unchanged), {} refreshed (cosmetic changes), {} rendered, {} forced'.format(
+        n, stats['hits'], stats.get('refreshed', 0), stats['misses'], stats['forced'])
@@ -0,0 +1,253 @@
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import argparse
+import multiprocessing
+import itertools
+from collections import OrderedDict
+
+
+# Keys of a plot entry of the campaign which are not histogram pattern fields
+_PLOT_KEYS = ('name', 'kwargs')
+
+# Options of the 'run' section of the campaign (overridden by the command line)
+RUN_DEFAULTS = {'n_workers': None, 'chunksize': 1, 'max_plots_per_worker': None, 'use_cache': False,
+                'force_render': False, 'profile': False, 'booklet': None, 'booklet_pages': None}
+
+_provider = None
+
+
+def read_campaign(path):
+    '''
+    Read a campaign description from a JSON or YAML file (.yaml/.yml, needs PyYAML)
+    '''
+    with open(path) as f:
+        if os.path.splitext(path)[1] in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError('PyYAML is needed to read \'{}\' (pip install pyyaml, or use JSON)'.format(path))
+            campaign = yaml.safe_load(f)
+        else:
+            campaign = json.load(f, object_pairs_hook=OrderedDict)
+    for key in ('inputs', 'processes', 'plots'):
+        if key not in campaign:
+            raise NameError('campaign \'{}\' has no \'{}\' section'.format(path, key))
+    unknown = sorted(set(campaign.get('run', {}))-set(RUN_DEFAULTS))
+    if unknown:
+        raise NameError('unknown run option(s) {} (possible: {})'.format(', '.join(unknown), ', '.join(sorted(RUN_DEFAULTS))))
+    return campaign
+
+
+def expand_plots(campaign):
+    '''
+    List of (plot_name, fields, kwargs) of a campaign
+    =================================================
+
+    Each entry of campaign['plots'] gives the histogram pattern fields (eg. region, variable);
+    fields given as a list are expanded in all their combinations. The key-word arguments
+    of make_nice_canvas are merged in this order: campaign['defaults'], campaign['field_kwargs']
+    (eg. {'variable': {'met': {'xtitle': 'E_{T}^{miss} [GeV]'}}}) and the 'kwargs' of the entry.
+    The plot name is the 'name' template of the entry (eg. '{region}_{variable}'), or the field
+    values joined by '_'.
+
+    - Return:
+    . list of (plot_name [string], fields [dict], kwargs [dict]) in the order of the campaign
+    '''
+    defaults = campaign.get('defaults', {})
+    field_kwargs = campaign.get('field_kwargs', {})
+    plots, names = [], set()
+    for entry in campaign['plots']:
+        keys = [k for k in entry if k not in _PLOT_KEYS]
+        choices = [entry[k] if isinstance(entry[k], list) else [entry[k]] for k in keys]
+        for values in itertools.product(*choices):
+            fields = OrderedDict(zip(keys, values))
+            kwargs = dict(defaults)
+            for k, v in fields.items():
+                kwargs.update(field_kwargs.get(k, {}).get(str(v), {}))
+            kwargs.update(entry.get('kwargs', {}))
+            name = entry['name'].format(**fields) if 'name' in entry else '_'.join(str(v) for v in values)
+            if name in names:
+                raise NameError('plot \'{}\' is defined twice in the campaign'.format(name))
+            names.add(name)
+            plots.append((name, fields, kwargs))
+    return plots
+
+
+def parse_shard(shard):
+    '''(i, n) from a shard string 'i/n', with 0 <= i < n'''
+    m = re.match(r'^\s*(\d+)\s*/\s*(\d+)\s*$', shard or '0/1')
+    if not m or not int(m.group(1)) < int(m.group(2)):
+        raise NameError('shard must be \'i/n\' with 0 <= i < n, not \'{}\''.format(shard))
+    return int(m.group(1)), int(m.group(2))
+
+
+def in_shard(plot_name, i, n):
+    '''
+    True if the plot belongs to shard i of n. The split only depends on the plot name (crc32),
+    so it is the same on every node and adding plots to the campaign does not move the others.
+    '''
+    return zlib.crc32(plot_name.encode('utf-8')) % n == i
+
+
+def resolve_color(color):
+    '''ROOT color from an int or a string like 'kAzure+1' '''
+    if not isinstance(color, str):
+        return color
+    m = re.match(r'^\s*(k\w+)\s*(?:([+-])\s*(\d+))?\s*$', color)
+    if not m:
+        raise NameError('color \'{}\' is not a ROOT color (eg. kAzure+1)'.format(color))
+    from .root_setup import ROOT
+    value = int(getattr(ROOT, m.group(1)))
+    if m.group(2):
+        value += int(m.group(3))*(1 if m.group(2) == '+' else -1)
+    return value
+
+
+def load_inputs(inputs, processes, signals, data, syst, fields):
+    '''
+    Loader of make_many_canvases: (dictBkg, hTot, hData, dictSig) of a plot, read from the
+    campaign inputs (ROOT files, or a store made by build_store) with a HistoProvider (or
+    HistoStore) kept for all the plots of the process.
+    '''
+    global _provider
+    from .inputs import HistoProvider
+    from .store import HistoStore
+    if 'store' in inputs:
+        key = ('store', inputs['store'], inputs.get('as_th1', True))
+    else:
+        key = (tuple(inputs['files']), inputs.get('pattern', '{region}/{variable}/{process}'))
+    if _provider is None or _provider[0] != key:
+        _provider = (key, HistoStore(*key[1:]) if key[0] == 'store' else HistoProvider(*key))
+    provider = _provider[1]
+    processes = OrderedDict((p, [resolve_color(c), leg]) for p, (c, leg) in processes.items())
+    dictBkg, hTot, hData = provider.make_inputs(processes, data=data, syst=syst,
+                                                allow_missing=inputs.get('allow_missing', False), **fields)
+    signals = OrderedDict((p, [resolve_color(v[0])]+list(v[1:])) for p, v in signals.items())
+    dictSig = provider.make_signals(signals, **fields) if signals else None
+    return dictBkg, hTot, hData, dictSig
+
+
+def make_specs(campaign, plots):
+    '''Specifications of make_many_canvases for plots [list of (plot_name, fields, kwargs)]'''
+    inputs = campaign['inputs']
+    if isinstance(inputs.get('files'), str):
+        inputs = dict(inputs, files=[inputs['files']])
+    args = (inputs, campaign['processes'], campaign.get('signals', {}), campaign.get('data', 'data'),
+            campaign.get('syst', 0))
+    return [{'plot_name': name, 'loader': load_inputs, 'loader_args': args+(dict(fields),), 'kwargs': kwargs}
+            for name, fields, kwargs in plots]
+
+
+class Checkpoint(object):
+    '''
+    Names of the plots already done, appended to a text file as soon as each plot is done
+    (failed plots are not recorded, so that they are made again when the job is resumed)
+    '''
+
+    def __init__(self, path, restart=False):
+        self.path = path
+        self.done = set()
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        if restart and os.path.exists(path):
+            os.remove(path)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.done = set(l.strip() for l in f if l.strip())
+        self._file = open(path, 'a')
+
+    def add(self, result):
+        if result.ok:
+            self._file.write(result.plot_name+'\n')
+            self._file.flush()
+            self.done.add(result.plot_name)
+
+    def close(self):
+        self._file.close()
+
+
+def throughput_report(results, n_campaign, n_shard, n_skipped, elapsed, n_workers):
+    '''Summary of a campaign job: plot counts, wall time, plots per second and failures'''
+    n_ok = sum(r.ok for r in results)
+    n_cached = sum(r.cached for r in results)
+    n_refreshed = sum(r.refreshed for r in results)
+    busy = sum(r.elapsed for r in results)
+    lines = ['{} plots in the campaign, {} in this shard, {} already done'.format(n_campaign, n_shard, n_skipped),
+             '{}/{} plots done in {:.1f} s ({} unchanged, {} refreshed, {} failed)'.format(
+                 n_ok, len(results), elapsed, n_cached, n_refreshed, len(results)-n_ok)]
+    if results and elapsed > 0:
+        lines.append('throughput: {:.2f} plots/s, {:.3f} s/plot per worker, {} workers used at {:.0f}%'.format(
+            len(results)/elapsed, busy/len(results), n_workers, 100.*busy/(elapsed*n_workers)))
+    for r in results:
+        if not r.ok:
+            lines.append('FAILED {}: {}'.format(r.plot_name, r.error.strip().split('\n')[-1]))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    '''
+    hepplotting command: make the plots of a campaign described in a JSON or YAML file
+
+       hepplotting campaign.yaml --shard 3/10 --workers 8
+
+    Plots already done by a previous run of the same shard are skipped (see --restart).
+    Return the exit code: 0 if every plot was made, 1 otherwise.
+    '''
+    from .batch import make_many_canvases
+    from .profiling import profile_report
+
+    parser = argparse.ArgumentParser(prog='hepplotting', description='Make the plots of a campaign (JSON or YAML file)')
+    parser.add_argument('campaign', help='campaign description (.json, .yaml or .yml)')
+    parser.add_argument('--shard', default='0/1', help='make only the shard i/n of the plots, with 0 <= i < n (default: 0/1)')
+    parser.add_argument('--workers', type=int, help='number of processes (default: number of cores)')
+    parser.add_argument('--checkpoint', help='file of completed plots (default: <plotdir>/.<campaign>_<i>of<n>.done)')
+    parser.add_argument('--restart', action='store_true', help='ignore the plots completed by a previous run')
+    parser.add_argument('--use-cache', action='store_true', help='skip plots unchanged since their last rendering')
+    parser.add_argument('--force', action='store_true', help='render every plot even if found in the cache')
+    parser.add_argument('--profile', action='store_true', help='print the per-stage timing of the plots')
+    parser.add_argument('--booklet', help='path without extension of the booklets collecting the plots')
+    parser.add_argument('--list', action='store_true', help='only print the plots of the shard')
+    args = parser.parse_args(argv)
+
+    campaign = read_campaign(args.campaign)
+    i, n = parse_shard(args.shard)
+    plots = expand_plots(campaign)
+    shard = [p for p in plots if in_shard(p[0], i, n)]
+    if args.list:
+        for name, fields, kwargs in shard:
+            sys.stdout.write('{}  {}\n'.format(name, json.dumps(fields)))
+        return 0
+
+    run = dict(RUN_DEFAULTS, **campaign.get('run', {}))
+    for opt, value in (('n_workers', args.workers), ('use_cache', args.use_cache), ('force_render', args.force),
+                       ('profile', args.profile), ('booklet', args.booklet)):
+        if value:
+            run[opt] = value
+    plotdir = campaign.get('defaults', {}).get('plotdir', 'plots')
+    base = os.path.splitext(os.path.basename(args.campaign))[0]
+    checkpoint = Checkpoint(args.checkpoint or os.path.join(plotdir, '.{}_{}of{}.done'.format(base, i, n)),
+                            args.restart)
+    todo = [p for p in shard if p[0] not in checkpoint.done]
+    if run['booklet'] and n > 1:
+        run['booklet'] = '{}_{}of{}'.format(run['booklet'], i, n)
+
+    t0 = time.time()
+    try:
+        results = make_many_canvases(make_specs(campaign, todo), on_result=checkpoint.add, **run)
+    finally:
+        checkpoint.close()
+    n_workers = min(run['n_workers'] or multiprocessing.cpu_count(), max(len(todo), 1))
+    sys.stdout.write(throughput_report(results, len(plots), len(shard), len(shard)-len(todo),
+                                       time.time()-t0, n_workers)+'\n')
+    if run['profile']:
+        sys.stdout.write(profile_report([r.profile for r in results])+'\n')
+    return 0 if all(r.ok for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,347 @@
+import os
+import re
+import zipfile
+import multiprocessing
+from collections import OrderedDict
+import numpy as np
+
+from .histo import Histo
+
+
+_IDENTIFIER = re.compile(r'[A-Za-z_]\w*')
+
+
+def _binning(binning):
+    '''Bin edges from a tuple (nbins, xmin, xmax) or a list/array of edges'''
+    if isinstance(binning, tuple) and len(binning) == 3:
+        return np.linspace(binning[1], binning[2], int(binning[0])+1)
+    return np.asarray(binning, dtype=np.float64)
+
+
+def _variables(variables):
+    '''{name: (expression, edges)} from {name: (expression, binning)} or {name: binning}'''
+    res = OrderedDict()
+    for name, v in variables.items():
+        if len(v) == 2 and (isinstance(v[0], str) or callable(v[0])):
+            res[name] = (v[0], _binning(v[1]))
+        else:
+            res[name] = (name, _binning(v))
+    return res
+
+
+def _process(p):
+    '''{'source', 'weight', 'selection', 'scale'} from a process definition or a bare source'''
+    if not isinstance(p, dict) or 'source' not in p:
+        p = {'source': p}
+    p = dict({'weight': None, 'selection': None, 'scale': 1.0}, **p)
+    if isinstance(p['source'], (str, dict)) or hasattr(p['source'], 'iloc'):
+        p['source'] = [p['source']]
+    return p
+
+
+def _needed_columns(expressions):
+    '''
+    Names possibly used by the expressions (None if one is a callable: every column is read)
+    '''
+    names = set()
+    for e in expressions:
+        if callable(e):
+            return None
+        if isinstance(e, str):
+            names.update(_IDENTIFIER.findall(e))
+    return names
+
+
+def _npz_column(zfile, member):
+    '''
+    (stream, number of rows, dtype) of the 1D array member of an opened .npz file, the stream
+    being at its first element, so that the array is read by chunks without loading it
+    '''
+    f = zfile.open(member)
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+    if len(shape) != 1 or dtype.hasobject:
+        raise NameError('column \'{}\' of \'{}\' is not a 1D array of numbers'.format(member[:-4], zfile.filename))
+    return f, shape[0], dtype
+
+
+def _parts(source, chunksize):
+    '''
+    Split a source into independent (start, stop) parts: rows for arrays, DataFrames and
+    uncompressed .npz files, row groups for Parquet files, the whole file for CSV and
+    compressed .npz files (which can only be read sequentially)
+    '''
+    if isinstance(source, str) and source.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        n = pq.ParquetFile(source).num_row_groups
+        return [(i, i+1) for i in range(n)]
+    if isinstance(source, str) and source.endswith('.npy'):
+        n = len(np.load(source, mmap_mode='r'))
+    elif isinstance(source, str) and source.endswith('.npz'):
+        with zipfile.ZipFile(source) as z:
+            infos = [i for i in z.infolist() if i.filename.endswith('.npy')]
+            if not infos or any(i.compress_type != zipfile.ZIP_STORED for i in infos):
+                return [(0, None)]
+            n = _npz_column(z, infos[0].filename)[1]
+    elif isinstance(source, str):
+        return [(0, None)]
+    elif hasattr(source, 'iloc'):
+        n = len(source)
+    else:
+        n = len(next(iter(source.values())))
+    return [(i, min(i+chunksize, n)) for i in range(0, n, chunksize)] or [(0, 0)]
+
+
+def iter_chunks(source, columns=None, chunksize=500000, start=0, stop=None):
+    '''
+    Chunks of columnar data
+    =======================
+
+    Read source by chunks of at most chunksize rows, so that the memory does not depend on
+    its size (Parquet files are read by batches, .npy files are memory-mapped and the columns
+    of .npz files are streamed from the archive, compressed or not).
+
+    - Args:
+    . source [string or DataFrame or dict of arrays] a .parquet, .csv, .npy (structured array)
+      or .npz (1D array per column, eg. np.savez(path, **columns)) file, a pandas DataFrame or a
+      dictionary {column: array}
+    . columns [set of string] columns to read (None: all); names which are not columns are ignored
+    . start, stop [int] rows (row groups for Parquet files) to read
+
+    - Return:
+    . iterator over dictionaries {column: numpy array}
+    '''
+    def keep(names):
+        return [c for c in names if columns is None or c in columns]
+
+    if isinstance(source, str) and source.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        pfile = pq.ParquetFile(source)
+        groups = list(range(pfile.num_row_groups))[start:stop]
+        for batch in pfile.iter_batches(chunksize, groups, keep(pfile.schema_arrow.names)):
+            yield {c: batch.column(c).to_numpy(zero_copy_only=False) for c in batch.schema.names}
+    elif isinstance(source, str) and source.endswith('.csv'):
+        import pandas
+        usecols = None if columns is None else lambda c: c in columns
+        for df in pandas.read_csv(source, usecols=usecols, chunksize=chunksize):
+            yield {c: df[c].to_numpy() for c in df.columns}
+    elif isinstance(source, str) and source.endswith('.npy'):
+        data = np.load(source, mmap_mode='r')
+        stop = len(data) if stop is None else stop
+        for i in range(start, stop, chunksize):
+            chunk = data[i:min(i+chunksize, stop)]
+            yield {c: np.asarray(chunk[c]) for c in keep(data.dtype.names)}
+    elif isinstance(source, str) and source.endswith('.npz'):
+        with zipfile.ZipFile(source) as z:
+            names = keep([m[:-4] for m in z.namelist() if m.endswith('.npy')])
+            streams = OrderedDict((c, _npz_column(z, c+'.npy')) for c in names)
+            n = min([n for f, n, dtype in streams.values()] or [0])
+            stop = n if stop is None else min(stop, n)
+            for f, n, dtype in streams.values():
+                f.seek(f.tell()+start*dtype.itemsize)
+            for i in range(start, stop, chunksize):
+                size = min(chunksize, stop-i)
+                yield {c: np.frombuffer(f.read(size*dtype.itemsize), dtype, size) for c, (f, n, dtype) in streams.items()}
+            for f, n, dtype in streams.values():
+                f.close()
+    elif isinstance(source, str):
+        raise NameError('columnar files are only .parquet, .csv, .npy or .npz, but not \'{}\''.format(source))
+    else:
+        names = keep(source.columns if hasattr(source, 'iloc') else source.keys())
+        n = len(source) if hasattr(source, 'iloc') else len(source[names[0]]) if names else 0
+        stop = n if stop is None else stop
+        for i in range(start, stop, chunksize):
+            yield {c: np.asarray(source[c][i:min(i+chunksize, stop)]) for c in names}
+
+
+def evaluate(expr, chunk):
+    '''
+    Value of expr on a chunk: a column name, a numpy expression of the columns
+    (eg. \'met/1000\' or \'(njets >= 2) & (abs(eta) < 2.5)\'), a callable(chunk) or a number
+    '''
+    if callable(expr):
+        return expr(chunk)
+    if not isinstance(expr, str):
+        return expr
+    if expr in chunk:
+        return chunk[expr]
+    namespace = {'np': np, 'abs': np.abs, 'sqrt': np.sqrt, 'log': np.log, 'exp': np.exp,
+                 'cos': np.cos, 'sin': np.sin, 'where': np.where, 'minimum': np.minimum, 'maximum': np.maximum}
+    return eval(expr, {'__builtins__': {}}, dict(namespace, **chunk))
+
+
+def fill_arrays(x, w, edges):
+    '''
+    Return (contents, sumw2) of the histogram of x [array] with weights w [array] and bin
+    edges [array of nbins+1], including the underflow and overflow (same convention as TH1);
+    nan values are ignored.
+    '''
+    nbins = len(edges)-1
+    x, w = np.asarray(x, dtype=np.float64), np.broadcast_to(np.asarray(w, dtype=np.float64), np.shape(x))
+    ok = ~np.isnan(x)
+    if not ok.all():
+        x, w = x[ok], w[ok]
+    idx = np.searchsorted(edges, x, side='right')
+    return np.bincount(idx, w, nbins+2), np.bincount(idx, w*w, nbins+2)
+
+
+def _fill_task(task):
+    '''
+    Fill all the regions and variables of one process from one part of one source
+    '''
+    pname, source, start, stop, proc, variables, selections, chunksize, columns = task
+    res = OrderedDict(((r, v), [np.zeros(len(e)+1), np.zeros(len(e)+1)])
+                      for r in selections for v, (x, e) in variables.items())
+    for chunk in iter_chunks(source, columns, chunksize, start, stop):
+        n = len(next(iter(chunk.values()))) if chunk else 0
+        mask = np.ones(n, bool)
+        if proc['selection'] is not None:
+            mask &= np.asarray(evaluate(proc['selection'], chunk), bool)
+        w = np.broadcast_to(np.asarray(evaluate(proc['weight'], chunk) if proc['weight'] is not None else 1.0,
+                                       dtype=np.float64), (n,))*proc['scale']
+        values = {v: np.broadcast_to(evaluate(x, chunk), (n,)) for v, (x, e) in variables.items()}
+        for r, sel in selections.items():
+            m = mask if sel is None else mask & np.asarray(evaluate(sel, chunk), bool)
+            for v, (x, e) in variables.items():
+                c, s = fill_arrays(values[v][m], w[m], e)
+                res[(r, v)][0] += c
+                res[(r, v)][1] += s
+    return pname, res
+
+
+class FilledHistos(object):
+    '''
+    Histograms filled by fill_histograms, with the same interface as HistoProvider
+    . histos [dict {(region, variable, process): Histo}]
+    . as_th1 [bool] return TH1D (needed by the ROOT backend) instead of Histo
+    '''
+
+    def __init__(self, histos, as_th1=False):
+        self.histos = histos
+        self.as_th1 = as_th1
+
+    def find(self, **fields):
+        keys = [dict(zip(('region', 'variable', 'process'), k)) for k in self.histos]
+        return [k for k in keys if all(k[f] == v for f, v in fields.items())]
+
+    def values(self, field, **fields):
+        return sorted(set(str(d[field]) for d in self.find(**fields)))
+
+    def get(self, process, variable, region=None):
+        '''Copy of the histogram (TH1D if as_th1)'''
+        key = (region, variable, process)
+        if key not in self.histos:
+            raise KeyError('Histogram {} not filled'.format(key))
+        name = '_'.join(str(k) for k in key if k is not None)
+        h = self.histos[key].copy(name)
+        return h.to_th1() if self.as_th1 else h
+
+    def make_inputs(self, processes, data='data', syst=0, allow_missing=False, **fields):
+        '''
+        (dictBkg, hTot, hData) for make_nice_canvas (see HistoProvider.make_inputs)
+        '''
+        from .plot_maker import sum_histograms, add_flat_syst
+        dictBkg = OrderedDict()
+        for p, (color, legName) in processes.items():
+            try:
+                dictBkg[p] = [self.get(p, **fields), color, legName]
+            except KeyError:
+                if not allow_missing:
+                    raise
+        if not dictBkg:
+            raise KeyError('No background found for {}'.format(fields))
+        hBkg = [v[0] for v in dictBkg.values()]
+        if self.as_th1:
+            hTot = add_flat_syst(sum_histograms(hBkg, name='tot'), syst)
+        else:
+            contents = np.sum([h.contents for h in hBkg], axis=0)
+            sumw2 = np.sum([h.sumw2 for h in hBkg], axis=0)
+            sumw2[:-1] += (syst*contents[:-1])**2   # as add_flat_syst: not on the overflow
+            hTot = Histo(hBkg[0].edges, contents, sumw2, 'tot')
+        hData = self.get(data, **fields) if data else None
+        return dictBkg, hTot, hData
+
+    def make_signals(self, signals, **fields):
+        '''dictSig of make_nice_canvas from signals [dict {process: [color, norm, legName]}]'''
+        return OrderedDict((p, [self.get(p, **fields)]+list(v)) for p, v in signals.items())
+
+
+def fill_histograms(processes, variables, selections=None, chunksize=500000, n_workers=None,
+                    mp_context=None, as_th1=False):
+    '''
+    Fill histograms from columnar data
+    ==================================
+
+    Every source is read by chunks, and all the variables of all the regions are filled
+    from each chunk with numpy (no Python loop over events). The files are split in parts
+    (chunks of .npy and uncompressed .npz files, row groups of .parquet files, whole .csv and
+    compressed .npz files) filled in
+    parallel by a pool of processes; in-memory sources are filled in the current process.
+    The memory is bounded by chunksize rows per worker.
+
+    - Args:
+    . processes [dict {process: definition}] where definition is a source (see iter_chunks),
+      a list of sources, or a dictionary {\'source\': ..., \'weight\': ..., \'selection\': ..., \'scale\': ...}
+      with the event weight and selection as expressions (see evaluate) and a global scale factor
+    . variables [dict {name: (expression, binning)}] where binning is a tuple (nbins, xmin, xmax) or
+      a list (array) of bin edges; {name: binning} uses the column name
+    . selections [dict {region: expression}] regions filled at once (None: a single region None)
+    . chunksize [int] number of rows read at once
+    . n_workers [int] number of processes (default: number of cores, 1: current process only)
+    . mp_context [string] multiprocessing start method. Callable expressions must be picklable
+      (ie. defined at module level) to be sent to workers.
+    . as_th1 [bool] return TH1D instead of Histo (see FilledHistos)
+
+    - Return:
+    . FilledHistos, eg. fill_histograms(...).make_inputs(processes, variable=\'met\', region=\'SR\')
+
+    Usage:
+       histos = fill_histograms({'ttbar': {'source': 'ttbar.parquet', 'weight': 'weight*1.1'},
+                                 'data': 'data.parquet'},
+                                {'met': ('met/1000', (20, 0, 400)), 'njets': (10, 0, 10)},
+                                selections={'SR': 'njets >= 4', 'CR': 'njets < 4'})
+       dictBkg, hTot, hData = histos.make_inputs({'ttbar': [ROOT.kAzure, 't#bar{t}']}, region='SR', variable='met')
+    '''
+    variables = _variables(variables)
+    selections = OrderedDict([(None, None)]) if selections is None else OrderedDict(selections)
+    processes = OrderedDict((p, _process(d)) for p, d in processes.items())
+
+    local, remote = [], []
+    for pname, proc in processes.items():
+        columns = _needed_columns([proc['weight'], proc['selection']]+list(selections.values())
+                                  +[x for x, e in variables.values()])
+        pdef = {k: proc[k] for k in ('weight', 'selection', 'scale')}
+        for source in proc['source']:
+            if isinstance(source, str) and not os.path.isfile(source):
+                raise IOError('Cannot open columnar file \'{}\''.format(source))
+            for start, stop in _parts(source, chunksize):
+                task = (pname, source, start, stop, pdef, variables, selections, chunksize, columns)
+                (remote if isinstance(source, str) else local).append(task)
+
+    if n_workers is None:
+        n_workers = multiprocessing.cpu_count()
+    results = [_fill_task(t) for t in local]
+    if n_workers <= 1 or len(remote) <= 1:
+        results += [_fill_task(t) for t in remote]
+    else:
+        ctx = multiprocessing.get_context(mp_context)
+        pool = ctx.Pool(n_workers)
+        try:
+            results += pool.imap_unordered(_fill_task, remote)
+        finally:
+            pool.close()
+            pool.join()
+
+    histos = OrderedDict()
+    for pname in processes:
+        for r in selections:
+            for v, (x, e) in variables.items():
+                histos[(r, v, pname)] = Histo(e, name='_'.join(str(k) for k in (r, v, pname) if k is not None))
+    for pname, res in results:
+        for (r, v), (c, s) in res.items():
+            histos[(r, v, pname)].contents += c
+            histos[(r, v, pname)].sumw2 += s
+    return FilledHistos(histos, as_th1)
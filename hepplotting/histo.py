@@ -0,0 +1,147 @@
+import numpy as np
+
+
+# Storage type of the bin contents for each ROOT histogram class (1D, and 2D/3D for unroll)
+_TH1_DTYPES = {
+    'TH1C': np.int8,
+    'TH1S': np.int16,
+    'TH1I': np.int32,
+    'TH1F': np.float32,
+    'TH1D': np.float64,
+    'TH2C': np.int8,
+    'TH2S': np.int16,
+    'TH2I': np.int32,
+    'TH2F': np.float32,
+    'TH2D': np.float64,
+    'TH3C': np.int8,
+    'TH3S': np.int16,
+    'TH3I': np.int32,
+    'TH3F': np.float32,
+    'TH3D': np.float64,
+}
+
+
+def _buffer_view(buf, n, dtype):
+    '''
+    Numpy view (no copy) of n elements of a C++ array returned by PyROOT,
+    eg. TH1F::GetArray() or TArrayD::GetArray().
+    '''
+    if hasattr(buf, 'reshape'):
+        buf.reshape((n,))
+    elif hasattr(buf, 'SetSize'):
+        buf.SetSize(n)
+    return np.frombuffer(buf, dtype=dtype, count=n)
+
+
+def _th1_dtype(h):
+    for cls in _TH1_DTYPES:
+        if h.InheritsFrom(cls):
+            return _TH1_DTYPES[cls]
+    raise TypeError('Histogram of class {} is not supported'.format(h.ClassName()))
+
+
+def th1_views(h):
+    '''
+    Return (contents, sumw2) as numpy views on the internal buffers of h [TH1],
+    including underflow (index 0) and overflow (index nbins+1) bins.
+    Writing in these arrays directly modifies the histogram. The sum of
+    weights squared is allocated (TH1::Sumw2) if it was not already.
+    '''
+    n = h.GetNcells()
+    if h.GetSumw2N() == 0:
+        h.Sumw2()
+    contents = _buffer_view(h.GetArray(), n, _th1_dtype(h))
+    sumw2 = _buffer_view(h.GetSumw2().GetArray(), n, np.float64)
+    return contents, sumw2
+
+
+def th1_edges(h):
+    '''
+    Return the nbins+1 bin edges of h [TH1] as a numpy array.
+    '''
+    return axis_edges(h.GetXaxis())
+
+
+def axis_edges(axis):
+    '''
+    Return the nbins+1 bin edges of axis [TAxis] as a numpy array.
+    '''
+    nbins = axis.GetNbins()
+    xbins = axis.GetXbins()
+    if xbins.GetSize() > 0:
+        return np.array(_buffer_view(xbins.GetArray(), nbins+1, np.float64))
+    return np.linspace(axis.GetXmin(), axis.GetXmax(), nbins+1)
+
+
+class Histo(object):
+    '''
+    Compact 1D histogram made of contiguous numpy arrays
+    . edges [array of nbins+1 float] bin edges
+    . contents [array of nbins+2] bin contents, with underflow and overflow (same convention as TH1)
+    . sumw2 [array of nbins+2] sum of weights squared, with underflow and overflow
+    . name [string] the name of the histogram
+    '''
+
+    __slots__ = ('edges', 'contents', 'sumw2', 'name')
+
+    def __init__(self, edges, contents=None, sumw2=None, name='h'):
+        self.edges = np.ascontiguousarray(edges, dtype=np.float64)
+        n = len(self.edges)+1
+        if contents is None:
+            contents = np.zeros(n)
+        if sumw2 is None:
+            sumw2 = np.abs(contents)
+        self.contents = np.ascontiguousarray(contents)
+        self.sumw2 = np.ascontiguousarray(sumw2, dtype=np.float64)
+        self.name = name
+        if self.contents.shape != (n,) or self.sumw2.shape != (n,):
+            raise ValueError('Histo \'{}\': {} edges require {} contents and sumw2 (with under/overflow)'.format(name, n-1, n))
+
+    @classmethod
+    def from_th1(cls, h):
+        '''
+        Build a Histo from h [TH1] without copying the bin contents, nor the sum of weights
+        squared when allocated: modifying the Histo modifies the TH1 (and vice versa).
+        '''
+        n = h.GetNcells()
+        contents = _buffer_view(h.GetArray(), n, _th1_dtype(h))
+        if h.GetSumw2N() > 0:
+            sumw2 = _buffer_view(h.GetSumw2().GetArray(), n, np.float64)
+        else:
+            sumw2 = np.abs(contents, dtype=np.float64)
+        return cls(th1_edges(h), contents, sumw2, h.GetName())
+
+    def to_th1(self, name=None, title=''):
+        '''
+        Return a new TH1D with the same binning, contents and errors
+        '''
+        from .root_setup import ROOT
+        name = name or self.name
+        h = ROOT.TH1D(name, title, self.nbins, self.edges)
+        contents, sumw2 = th1_views(h)
+        contents[:] = self.contents
+        sumw2[:] = self.sumw2
+        h.SetEntries(self.contents[1:-1].sum())
+        return h
+
+    def copy(self, name=None):
+        return Histo(self.edges.copy(), self.contents.copy(), self.sumw2.copy(), name or self.name)
+
+    @property
+    def nbins(self):
+        return len(self.edges)-1
+
+    @property
+    def values(self):
+        '''Bin contents without underflow/overflow'''
+        return self.contents[1:-1]
+
+    @property
+    def errors(self):
+        '''Bin errors without underflow/overflow'''
+        return np.sqrt(self.sumw2[1:-1])
+
+    def integral(self, flow=True):
+        '''Return (integral, error) including (default) or not the under/overflow bins'''
+        sl = slice(None) if flow else slice(1, -1)
+        return float(self.contents[sl].sum()), float(np.sqrt(self.sumw2[sl].sum()))
@@ -0,0 +1,163 @@
+import re
+from collections import OrderedDict
+
+from .root_setup import ROOT
+from .plot_maker import sum_histograms, add_flat_syst
+
+
+def _pattern_regex(pattern):
+    '''
+    Regular expression matching a histogram path built from pattern, eg.
+    '{region}/{variable}/{process}' gives named groups region, variable and process.
+    '''
+    parts = re.split(r'\{(\w+)\}', pattern)
+    regex = ''
+    for i, p in enumerate(parts):
+        regex += '(?P<{}>[^/]+)'.format(p) if i % 2 else re.escape(p)
+    return re.compile('^'+regex+'$')
+
+
+class HistoProvider(object):
+    '''
+    Lazy access to histograms stored in ROOT files
+    ==============================================
+
+    The files are indexed once (histogram paths and types), histograms are only read
+    when requested and the last max_cached of them are kept in memory.
+
+    - Args:
+    . files [string or list of string] ROOT files. If a histogram path exists in
+      several files, the first file is used.
+    . pattern [string] path of the histograms inside the files, eg. '{region}/{variable}/{process}'
+    . max_cached [int] number of histograms kept in memory (default: 256)
+
+    Usage:
+       provider = HistoProvider(['bkg.root', 'data.root'], '{region}/{variable}/{process}')
+       dictBkg, hTot, hData = provider.make_inputs(processes, data='data', region='SR', variable='met')
+       make_nice_canvas(dictBkg, hTot, hData, plot_name='SR_met')
+    '''
+
+    def __init__(self, files, pattern='{region}/{variable}/{process}', max_cached=256):
+        if isinstance(files, str):
+            files = [files]
+        self.pattern = pattern
+        self.max_cached = max_cached
+        self._regex = _pattern_regex(pattern)
+        self._files = OrderedDict()
+        self._cache = OrderedDict()
+        self.index = OrderedDict()
+        for fname in files:
+            self._index_file(fname)
+
+    def _index_file(self, fname):
+        tfile = ROOT.TFile.Open(fname)
+        if not tfile or tfile.IsZombie():
+            raise IOError('Cannot open ROOT file \'{}\''.format(fname))
+        self._files[fname] = tfile
+
+        def walk(directory, prefix):
+            for key in directory.GetListOfKeys():
+                path = prefix+key.GetName()
+                cls = ROOT.TClass.GetClass(key.GetClassName())
+                if cls.InheritsFrom('TDirectory'):
+                    walk(key.ReadObj(), path+'/')
+                elif cls.InheritsFrom('TH1') and path not in self.index:
+                    self.index[path] = {'file': fname, 'class': key.GetClassName(), 'binning': None}
+        walk(tfile, '')
+
+    def path(self, **fields):
+        '''Histogram path for the given pattern fields'''
+        return self.pattern.format(**fields)
+
+    def find(self, **fields):
+        '''
+        Return the list of field dictionaries of indexed histograms matching the
+        given fields (eg. find(region='SR') lists every variable and process of SR)
+        '''
+        res = []
+        for path in self.index:
+            m = self._regex.match(path)
+            if m and all(m.group(k) == str(v) for k, v in fields.items()):
+                res.append(m.groupdict())
+        return res
+
+    def values(self, field, **fields):
+        '''Sorted distinct values of field among histograms matching fields'''
+        return sorted(set(d[field] for d in self.find(**fields)))
+
+    def _load(self, path):
+        if path in self._cache:
+            self._cache.move_to_end(path)
+            return self._cache[path]
+        if path not in self.index:
+            raise KeyError('Histogram \'{}\' not found (pattern \'{}\')'.format(path, self.pattern))
+        entry = self.index[path]
+        h = self._files[entry['file']].Get(path)
+        h.SetDirectory(0)
+        ax = h.GetXaxis()
+        entry['binning'] = (ax.GetNbins(), ax.GetXmin(), ax.GetXmax())
+        self._cache[path] = h
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+        return h
+
+    def get(self, name=None, **fields):
+        '''
+        Return a copy of the histogram given by the pattern fields (or by its full path
+        name), which can be freely modified (eg. by make_nice_canvas)
+        '''
+        path = name or self.path(**fields)
+        h = self._load(path).Clone(path.replace('/', '_'))
+        h.SetDirectory(0)
+        return h
+
+    def binning(self, **fields):
+        '''Return (nbins, xmin, xmax) of the histogram given by the pattern fields'''
+        path = self.path(**fields)
+        if path in self.index and self.index[path]['binning'] is None:
+            self._load(path)
+        return self.index[path]['binning']
+
+    def make_inputs(self, processes, data='data', syst=0, allow_missing=False, **fields):
+        '''
+        Build the inputs of make_nice_canvas
+        ====================================
+
+        - Args:
+        . processes [dict {process: [color, legName]}] backgrounds, in the order of the legend
+        . data [string] value of the process field for data (None: no data histogram)
+        . syst [float] flat relative systematic added to the total histogram (see add_flat_syst)
+        . allow_missing [bool] skip background processes not found instead of raising a KeyError
+        . fields: the other pattern fields (eg. region='SR', variable='met')
+
+        - Return:
+        . (dictBkg, hTot, hData)
+        '''
+        dictBkg = OrderedDict()
+        for p, (color, legName) in processes.items():
+            try:
+                dictBkg[p] = [self.get(process=p, **fields), color, legName]
+            except KeyError:
+                if not allow_missing:
+                    raise
+        if not dictBkg:
+            raise KeyError('No background found for {}'.format(fields))
+        hTot = add_flat_syst(sum_histograms([v[0] for v in dictBkg.values()], name='tot'), syst)
+        hData = self.get(process=data, **fields) if data else None
+        return dictBkg, hTot, hData
+
+    def make_signals(self, signals, **fields):
+        '''
+        Build dictSig of make_nice_canvas from signals [dict {process: [color, norm, legName]}]
+        '''
+        return OrderedDict((p, [self.get(process=p, **fields)]+list(v)) for p, v in signals.items())
+
+    def clear(self):
+        '''Release the cached histograms'''
+        self._cache.clear()
+
+    def close(self):
+        self.clear()
+        for tfile in self._files.values():
+            tfile.Close()
+        self._files.clear()
@@ -0,0 +1,160 @@
+import numpy as np
+
+
+# Coverage of a one sigma interval
+ONE_SIGMA = 0.6826894921370859
+
+# Error bars of data points (data_errors) and of the data/prediction ratio (ratio_errors)
+DATA_ERRORS = ('sqrt', 'poisson')
+RATIO_ERRORS = ('sqrt', 'poisson', 'toys')
+
+# Default number of pseudo-experiments of toy_ratio_interval
+N_TOYS = 1000
+
+# Maximum number of (bin x toy) values generated at once (a few arrays of 16 MB)
+_TOY_BLOCK = 2000000
+
+
+def _normal_quantile(p):
+    '''Quantile of the standard normal distribution (Acklam's approximation, relative error below 1.2e-9)'''
+    p = np.asarray(p, float)
+    a = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02, 1.383577518672690e+02,
+         -3.066479806614716e+01, 2.506628277459239e+00)
+    b = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02, 6.680131188771972e+01,
+         -1.328068155288572e+01)
+    c = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00, -2.549732539343734e+00,
+         4.374664141464968e+00, 2.938163982698783e+00)
+    d = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00)
+    q = np.minimum(p, 1-p)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.sqrt(-2*np.log(q))
+        tail = (((((c[0]*t+c[1])*t+c[2])*t+c[3])*t+c[4])*t+c[5])/((((d[0]*t+d[1])*t+d[2])*t+d[3])*t+1)
+        r = (p-0.5)**2
+        central = (p-0.5)*(((((a[0]*r+a[1])*r+a[2])*r+a[3])*r+a[4])*r+a[5])/(((((b[0]*r+b[1])*r+b[2])*r+b[3])*r+b[4])*r+1)
+    return np.where(q < 0.02425, np.where(p < 0.5, tail, -tail), central)
+
+
+def gamma_quantile(p, a):
+    '''
+    Quantile p of the Gamma(a, 1) distribution, element-wise on arrays (0 for a = 0).
+    Exact with scipy, otherwise given by the Wilson-Hilferty approximation (about 1%
+    precision for a = 1, better above), so that ROOT is never imported for it.
+    '''
+    p, a = np.broadcast_arrays(np.asarray(p, float), np.asarray(a, float))
+    res = np.zeros(a.shape)
+    pos = a > 0
+    try:
+        from scipy.special import gammaincinv
+        res[pos] = gammaincinv(a[pos], p[pos])
+        return res
+    except ImportError:
+        pass
+    z = _normal_quantile(p[pos])
+    ap = a[pos]
+    res[pos] = ap*np.maximum(1-1/(9*ap)+z/(3*np.sqrt(ap)), 0)**3
+    return res
+
+
+def garwood_interval(n, cl=ONE_SIGMA):
+    '''
+    Garwood (frequentist, central) confidence interval of a Poisson mean
+    =====================================================================
+
+    The whole array (eg. all bins of many plots stacked along leading axes) is done at once.
+
+    - Args:
+    . n [array] observed counts
+    . cl [float] confidence level (default: one sigma, 68.3%)
+
+    - Return:
+    . (err_down, err_up) [arrays] positive distances from n to the interval bounds
+      (n=0 gives err_down=0 and err_up=1.84 at one sigma)
+    '''
+    n = np.maximum(np.asarray(n, float), 0)
+    alpha = 1-cl
+    lower = gamma_quantile(alpha/2, n)
+    upper = gamma_quantile(1-alpha/2, n+1)
+    return n-lower, upper-n
+
+
+def toy_ratio_interval(n, pred, pred_err, n_toys=N_TOYS, cl=ONE_SIGMA, seed=0):
+    '''
+    Data / prediction ratio with pseudo-experiments
+    ===============================================
+
+    Interval of n/pred including the Poisson uncertainty of the data and the (Gaussian)
+    uncertainty of the prediction: the bounds are quantiles of the toy ratios, with the
+    data drawn from the Gamma distributions giving the Garwood bounds (Gamma(n) below,
+    Gamma(n+1) above), and the prediction from a Gaussian truncated at 0. Without prediction
+    uncertainty, this is the Garwood interval divided by pred (computed without toys). All
+    bins (and plots stacked along leading axes) are done in a few numpy operations, by blocks
+    of bins x toys of at most _TOY_BLOCK values; about 0.1 s per 1000 bins with 1000 toys.
+
+    - Args:
+    . n [array] observed counts, pred [array] predictions, pred_err [array] uncertainties on pred
+    . n_toys [int] number of pseudo-experiments (default: 1000, ie. quantiles known to about 1%
+      of the interval)
+    . cl [float] confidence level (default: one sigma)
+    . seed [int] seed of the random generator, so that plots are reproducible
+
+    - Return:
+    . (ratio, err_down, err_up) [arrays] with ratio=0 and errors 0 where pred <= 0
+    '''
+    n, pred, pred_err = np.broadcast_arrays(np.maximum(np.asarray(n, float), 0), np.asarray(pred, float),
+                                            np.abs(np.asarray(pred_err, float)))
+    shape = n.shape
+    n, pred, pred_err = n.ravel(), pred.ravel(), pred_err.ravel()
+    ok = pred > 0
+    ratio, lo, hi = np.zeros(n.size), np.zeros(n.size), np.zeros(n.size)
+    ratio[ok] = n[ok]/pred[ok]
+    alpha = 1-cl
+    exact = ok & (pred_err == 0)
+    lo[exact] = gamma_quantile(alpha/2, n[exact])/pred[exact]
+    hi[exact] = gamma_quantile(1-alpha/2, n[exact]+1)/pred[exact]
+    rng = np.random.default_rng(seed)
+    k_lo, k_hi = int(round(alpha/2*(n_toys-1))), int(round((1-alpha/2)*(n_toys-1)))
+    idx = np.flatnonzero(ok & ~exact)
+    step = max(1, _TOY_BLOCK//n_toys)
+    for start in range(0, len(idx), step):
+        sel = idx[start:start+step]
+        shape_toys = (len(sel), n_toys)
+        p = pred[sel, None]+pred_err[sel, None]*rng.standard_normal(shape_toys)
+        inv = 1/np.maximum(p, 1e-3*pred[sel, None])
+        g = rng.standard_gamma(np.broadcast_to(n[sel, None], shape_toys))
+        # Quantiles as order statistics: partition is much faster than np.quantile
+        lo[sel] = np.partition(g*inv, k_lo, axis=1)[:, k_lo]
+        g += rng.standard_exponential(shape_toys)    # Gamma(n+1) = Gamma(n) + Exp(1)
+        hi[sel] = np.partition(g*inv, k_hi, axis=1)[:, k_hi]
+    return (ratio.reshape(shape), np.maximum(ratio-lo, 0).reshape(shape), np.maximum(hi-ratio, 0).reshape(shape))
+
+
+def data_intervals(data, tot, data_errors='sqrt', ratio_errors='sqrt', n_toys=N_TOYS, pred_err=None):
+    '''
+    Error bars of the data points and of the data/prediction ratio drawn by make_nice_canvas
+    from data and tot [Histo] (bins without under/overflow), the uncertainty of the prediction
+    being pred_err [array] or the errors of tot
+
+    - Return:
+    . ((err_down, err_up), (ratio, err_down, err_up)) where the ratio is 0 for an empty prediction
+    '''
+    if data_errors not in DATA_ERRORS:
+        raise NameError('data_errors is only {}, but not \'{}\''.format(', '.join(DATA_ERRORS), data_errors))
+    if ratio_errors not in RATIO_ERRORS:
+        raise NameError('ratio_errors is only {}, but not \'{}\''.format(', '.join(RATIO_ERRORS), ratio_errors))
+    n, pred = data.values, tot.values
+    if data_errors == 'poisson':
+        derr = garwood_interval(n)
+    else:
+        derr = (data.errors, data.errors)
+    filled = pred >= 0.001
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rel = np.where(filled, 1./pred, 0.)
+    if ratio_errors == 'toys':
+        ratio, rlo, rhi = toy_ratio_interval(np.where(filled, n, 0), np.where(filled, pred, 0),
+                                              tot.errors if pred_err is None else pred_err, n_toys)
+    elif ratio_errors == 'poisson':
+        ratio, (rlo, rhi) = n*rel, garwood_interval(n)
+        rlo, rhi = rlo*rel, rhi*rel
+    else:
+        ratio, rlo, rhi = n*rel, data.errors*rel, data.errors*rel
+    return derr, (ratio, rlo, rhi)
@@ -0,0 +1,170 @@
+import re
+import numpy as np
+
+from .histo import Histo
+
+
+# Margins (left, right, bottom, top) of the upper pad, with and without ratio panel
+PAD_MARGINS = {True: (0.12, 0.05, 0.0, 0.08), False: (0.16, 0.05, 0.16, 0.05)}
+
+# Position (x0, y0, dy, text size, ATLAS text size) of the labels drawn by make_nice_canvas
+LABEL_POS = {True: (0.15, 0.84, 0.07, 0.052, 0.068), False: (0.19, 0.87, 0.06, 0.043, 0.052)}
+
+# Free space kept between the drawn content and the top of the frame or a text box
+HEADROOM = 0.05
+
+
+def text_width(text, size, aspect):
+    '''
+    Approximate width in NDC of a TLatex text of the given size (fraction of the pad height),
+    with aspect the pad height/width ratio (commands like #sqrt are not counted)
+    '''
+    plain = re.sub(r'#\w+|[{}^_]', '', text)
+    return 0.5*size*aspect*len(plain)
+
+
+def _to_frame(box, margins):
+    '''NDC box (x1, y1, x2, y2) in fractions of the frame'''
+    left, right, bottom, top = margins
+    x1, y1, x2, y2 = box
+    return ((x1-left)/(1-left-right), (y1-bottom)/(1-bottom-top),
+            (x2-left)/(1-left-right), (y2-bottom)/(1-bottom-top))
+
+
+def _limits(boxes, lo, hi):
+    '''
+    Highest fraction of the frame height available to the content of each bin (bin edges
+    lo and hi in frame fractions), given the text boxes in frame fractions
+    '''
+    limit = np.full(lo.shape, 1-HEADROOM)
+    for fx1, fy1, fx2, fy2 in boxes:
+        under = (hi > fx1) & (lo < fx2)
+        limit[under] = np.minimum(limit[under], fy1-HEADROOM)
+    return np.clip(limit, 0.05, None)
+
+
+def _needed_ymax(tops, limit, ymin, is_logy):
+    '''Smallest ymax keeping each bin content below its limit (fraction of the frame height)'''
+    if is_logy:
+        shown = tops > ymin
+        if not shown.any():
+            return 10*ymin
+        lmin = np.log(ymin)
+        return float(np.exp(np.max(lmin+(np.log(tops[shown])-lmin)/limit[shown])))
+    return float(np.max(ymin+np.maximum(tops-ymin, 0)/limit))
+
+
+def log_ymin(bkg):
+    '''Lower y value in log scale: half of the smallest positive background, rounded down to a power of 10'''
+    positive = bkg[bkg > 0]
+    if not len(positive):
+        return 0.02
+    return 10**np.floor(np.log10(0.5*max(positive.min(), 1e-7*positive.max())))
+
+
+def auto_layout(tops, bkg, edges, legend_texts, label_texts, plot_ratio=True, leg_ncols=1, textsize=0.045,
+                is_logy=False, ymin=None, xmin=None, xmax=None, canvas_size=(900, 800)):
+    '''
+    Y-range and legend position
+    ===========================
+
+    The legend is placed among a few candidate positions (top right, below the labels, top middle),
+    and the y-range is chosen such that the content of every bin stays below the labels and the
+    legend; the top right position is kept unless another one needs a clearly smaller y-range.
+    The required y-range of all bins is computed at once with numpy.
+
+    - Args:
+    . tops [array (histo, bin)] highest drawn value (content+error) of each histogram and bin
+    . bkg [array bin] total background (to choose ymin in log scale)
+    . edges [array bin+1] bin edges
+    . legend_texts [list of string] legend entries, label_texts [list of string] the labels
+      drawn below the ATLAS label (luminosity and plot_labels)
+    . plot_ratio, leg_ncols, textsize, is_logy, ymin, xmin, xmax: as in make_nice_canvas
+    . canvas_size [(int, int)] width and height of the canvas
+
+    - Return:
+    . dict with \'ymin\', \'ymax\' and \'leg_pos\' [x1, y1, x2, y2] (NDC)
+    '''
+    margins = PAD_MARGINS[bool(plot_ratio)]
+    left, right, bottom, top = margins
+    x0, y0, dy, size, atlas_size = LABEL_POS[bool(plot_ratio)]
+    aspect = canvas_size[1]*(0.7 if plot_ratio else 1.)/canvas_size[0]
+
+    xmin = edges[0] if xmin is None else xmin
+    xmax = edges[-1] if xmax is None else xmax
+    lo, hi = (edges[:-1]-xmin)/(xmax-xmin), (edges[1:]-xmin)/(xmax-xmin)
+    visible = (hi > 0) & (lo < 1)
+    lo, hi = lo[visible], hi[visible]
+    tops = np.max(np.atleast_2d(tops)[:, visible], axis=0)
+    if ymin is None:
+        ymin = log_ymin(np.asarray(bkg)[visible]) if is_logy else 0.
+
+    # Labels: ATLAS label and the lines below
+    label_width = max([text_width('ATLAS Preliminary', atlas_size, aspect)]+[text_width(t, size, aspect) for t in label_texts])
+    labels = (x0, y0-len(label_texts)*dy-0.3*size, x0+label_width, y0+atlas_size)
+
+    # Legend: symbol on the first quarter of each column, rows of 1.4 text size
+    nrows = -(-len(legend_texts)//leg_ncols)
+    width = leg_ncols*max(text_width(t, textsize, aspect) for t in legend_texts)/0.75
+    width = min(width, 1-left-right-0.04)
+    height = 1.4*textsize*nrows
+    xr, yt = 1-right-0.02, 1-top-0.02
+    candidates = [(xr-width, yt-height, xr, yt),
+                  (x0, labels[1]-0.01-height, x0+width, labels[1]-0.01),
+                  (max(labels[2]+0.02, 0.5*(left+1-right-width)), yt-height,
+                   max(labels[2]+0.02, 0.5*(left+1-right-width))+width, yt)]
+    best = None
+    for i, box in enumerate(candidates):
+        if i and (box[0] < left or box[2] > 1-right or box[1] < bottom+0.1):
+            continue
+        limit = _limits([_to_frame(labels, margins), _to_frame(box, margins)], lo, hi)
+        ymax = _needed_ymax(tops, limit, ymin, is_logy)
+        # Keep the first candidates (top right) unless another one is clearly better
+        if best is None or ymax < 0.9*best[0]:
+            best = (ymax, box)
+    ymax, box = best
+    return {'ymin': ymin, 'ymax': ymax, 'leg_pos': [round(float(b), 4) for b in box]}
+
+
+def plot_layout(dictBkg, hTot, hData, kwargs):
+    '''
+    auto_layout from the inputs and key-word arguments of make_nice_canvas (TH1 or Histo);
+    return the values of ymin, ymax and leg_pos which are not given in kwargs
+    '''
+    from .plot_maker import leg_name_with_yield
+    from .scene import lumi_text
+
+    def given(k):
+        return None if kwargs.get(k) == 'auto' else kwargs.get(k)
+
+    dictSig = kwargs.get('dictSig') or {}
+    plot_ratio = kwargs.get('plot_ratio', True)
+    histos = [v[0] for v in dictBkg.values()]+[hTot, hData]+[v[0] for v in dictSig.values()]
+    histos = [h if isinstance(h, Histo) else Histo.from_th1(h) for h in histos]
+    tops = np.array([h.values+h.errors for h in histos])
+    for i, v in enumerate(dictSig.values()):
+        h, norm = histos[len(dictBkg)+2+i], v[2]
+        if norm and h.values.sum() > 0:
+            tops[len(dictBkg)+2+i] *= norm/h.contents.sum()
+
+    entries = ['Data']+[v[2] for v in dictBkg.values()]+[v[3] for v in dictSig.values()]
+    entries.append(kwargs.get('unc_leg', 'Total bkg w/ unc.'))
+    if kwargs.get('leg_put_nevts'):
+        n = len(dictBkg)
+        ordered = [histos[n+1]]+histos[:n]+histos[n+2:]+[histos[n]]
+        entries = [leg_name_with_yield(e, *h.integral()) for e, h in zip(entries, ordered)]
+    textsize = 0.045 if plot_ratio else 0.038
+    if kwargs.get('leg_ncols', 1) == 2 and not plot_ratio:
+        textsize = 0.034
+    if kwargs.get('leg_put_nevts'):
+        textsize = 0.03
+    textsize = kwargs.get('leg_textsize') or textsize
+
+    cwidth, chigh = (900, 800) if plot_ratio else (1000, 800)
+    if kwargs.get('can_ratio'):
+        cwidth = cwidth/kwargs['can_ratio']
+    layout = auto_layout(tops, histos[len(dictBkg)].values, histos[0].edges, entries,
+                         [lumi_text(kwargs.get('lumi', 1.0))]+list(kwargs.get('plot_labels') or []),
+                         plot_ratio, kwargs.get('leg_ncols', 1), textsize, kwargs.get('is_logy'),
+                         given('ymin'), kwargs.get('xmin'), kwargs.get('xmax'), (cwidth, chigh))
+    return {k: v for k, v in layout.items() if given(k) is None}
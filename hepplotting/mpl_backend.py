@@ -0,0 +1,374 @@
+'''
+Matplotlib rendering of the make_nice_canvas layout, without ROOT.
+
+Selected with make_nice_canvas(..., backend='mpl'). Histograms can be Histo
+objects (no ROOT import at all) or TH1. Colors are ROOT color indices (exact
+when ROOT is already loaded, approximated from the ROOT color wheel otherwise)
+or any matplotlib color.
+'''
+import io
+import re
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.ticker import MaxNLocator, NullLocator
+from matplotlib.patches import StepPatch, PathPatch
+from matplotlib.path import Path
+from matplotlib.collections import LineCollection
+from matplotlib.container import ErrorbarContainer
+import matplotlib
+
+from .histo import Histo
+from .root_setup import root_loaded, load_root
+from .significance import SIGNIF_TITLES, significance_array, save_significance
+from .plot_maker import leg_name_with_yield
+from .intervals import data_intervals, N_TOYS
+from .writers import png_variants, save_pil_png, check_png_compression
+from .unroll import thin_labels, MAX_GROUP_LABELS
+from .layout import text_width
+
+
+# Base colors of the ROOT color wheel, and the range of their offsets
+_WHEEL = {
+    632: ((1.0, 0.0, 0.0), 4),   # kRed
+    616: ((1.0, 0.0, 1.0), 4),   # kMagenta
+    600: ((0.0, 0.0, 1.0), 4),   # kBlue
+    432: ((0.0, 1.0, 1.0), 4),   # kCyan
+    416: ((0.0, 1.0, 0.0), 4),   # kGreen
+    400: ((1.0, 1.0, 0.0), 4),   # kYellow
+    800: ((1.0, 0.6, 0.0), 10),  # kOrange
+    820: ((0.6, 1.0, 0.0), 10),  # kSpring
+    840: ((0.0, 1.0, 0.6), 10),  # kTeal
+    860: ((0.0, 0.6, 1.0), 10),  # kAzure
+    880: ((0.6, 0.0, 1.0), 10),  # kViolet
+    900: ((1.0, 0.0, 0.6), 10),  # kPink
+}
+_BASE = [(1, 1, 1), (0, 0, 0), (1, 0, 0), (0, 1, 0), (0, 0, 1), (1, 1, 0), (1, 0, 1), (0, 1, 1),
+         (0.35, 0.83, 0.33), (0.35, 0.33, 0.85)]
+
+
+def root_color(color, alpha=None):
+    '''
+    Matplotlib RGB(A) tuple of a ROOT color index (other colors are returned unchanged)
+    '''
+    if not isinstance(color, (int, np.integer)):
+        return color
+    rgb = None
+    if root_loaded():
+        c = load_root().gROOT.GetColor(int(color))
+        if c:
+            rgb = (c.GetRed(), c.GetGreen(), c.GetBlue())
+    if rgb is None:
+        if 0 <= color < len(_BASE):
+            rgb = _BASE[color]
+        elif 920 <= color <= 923:
+            rgb = (0.8-0.2*(color-920),)*3
+        else:
+            rgb = (0.5, 0.5, 0.5)
+            for base, (brgb, maxoff) in _WHEEL.items():
+                off = color-base
+                if -10 <= off <= maxoff:
+                    # circle wheels (kRed...) get lighter for negative offsets and darker for
+                    # positive ones, rectangle wheels (kAzure...) the other way around
+                    if maxoff == 10:
+                        off = -off
+                    if off < 0:
+                        rgb = tuple(c+(1-c)*(-off)/12. for c in brgb)
+                    else:
+                        rgb = tuple(c*(1-off/(maxoff+2.)) for c in brgb)
+                    break
+    rgb = tuple(float(c) for c in rgb)
+    return rgb if alpha is None else rgb+(alpha,)
+
+
+def root_latex(text):
+    '''
+    Matplotlib mathtext equivalent of a ROOT TLatex string (eg. '#sqrt{s} = 13 TeV, 1.0 fb^{-1}')
+    '''
+    if not text or not re.search(r'[#^_]', text):
+        return text
+    text = text.replace('#', '\\').replace(' ', '\\ ')
+    return '$'+text+'$'
+
+
+def _as_histo(h):
+    return h if isinstance(h, Histo) else Histo.from_th1(h)
+
+
+def _fig_coords(pad, x, y):
+    '''Figure coordinates of a point given in NDC of pad = (x0, y0, x1, y1) in figure coordinates'''
+    return pad[0]+x*(pad[2]-pad[0]), pad[1]+y*(pad[3]-pad[1])
+
+
+def _stairs(ax, values, edges, baseline=0, fill=False, color=None, **kwargs):
+    '''
+    Same as ax.stairs, without the update of the data limits vertex by vertex (slow for thousands
+    of bins): the axis ranges are always set by make_mpl_canvas
+    '''
+    kwargs.setdefault('edgecolor', color)
+    kwargs.setdefault('facecolor', color if fill else 'none')
+    if fill:
+        kwargs.setdefault('linewidth', 0)
+    patch = StepPatch(values, edges, baseline=baseline, fill=fill, **kwargs)
+    ax.add_artist(patch)
+    return patch
+
+
+def _points(ax, x, y, err_lo, err_hi, xerr=None, markersize=6.):
+    '''
+    Same as ax.errorbar(x, y, yerr=[err_lo, err_hi], xerr=xerr, fmt='o', color='k'), with all the
+    bars in one path made from a numpy array (ax.errorbar is slow above a few thousand points); the
+    LineCollection of the returned container only gives the style of the legend entry
+    '''
+    segs = np.empty((len(x), 2, 2))
+    segs[:, :, 0] = x[:, None]
+    segs[:, 0, 1], segs[:, 1, 1] = y-err_lo, y+err_hi
+    if xerr is not None:
+        hsegs = np.empty((len(x), 2, 2))
+        hsegs[:, 0, 0], hsegs[:, 1, 0] = x-xerr, x+xerr
+        hsegs[:, :, 1] = y[:, None]
+        segs = np.concatenate([segs, hsegs])
+    codes = np.tile([Path.MOVETO, Path.LINETO], len(segs)).astype(Path.code_type)
+    ax.add_artist(PathPatch(Path(segs.reshape(-1, 2), codes), fill=False, edgecolor='k', linewidth=1.5))
+    line, = ax.plot(x, y, 'o', color='k', markersize=markersize, linestyle='none', scalex=False, scaley=False)
+    bars = LineCollection([], colors='k', linewidths=1.5)
+    return ErrorbarContainer((line, (), (bars,)), has_xerr=xerr is not None, has_yerr=True)
+
+
+def make_mpl_canvas(dictBkg, hTot, hData, paths, dictSig=None, sig_line_style=1, xtitle=None, ytitle=None,
+                    is_logy=False, bin_label=None, bin_groups=None, xticksInt=False, xmin=None, xmax=None, ymin=None, ymax=None,
+                    r_ymin=None, r_ymax=None, leg_pos=None, unc_leg='Total bkg w/ unc.', leg_ncols=1,
+                    leg_put_nevts=False, leg_textsize=None, m_size=None, error_alpha=0.3, histo_border=0,
+                    plot_labels=None, atlas_label='Internal', lumi=1.0, can_ratio=None, can_scale=1.0,
+                    plot_ratio=True, ratio_type='ratio', ratio_signals=None, signif_file=None,
+                    tot_graph=None, data_errors='sqrt', ratio_errors='sqrt', n_toys=N_TOYS, png_sizes=None,
+                    png_compression=None, **kwargs):
+    '''
+    Same layout as make_nice_canvas, drawn with matplotlib into the files paths
+    (pdf, png, svg or eps). Arguments are the ones of make_nice_canvas; the ROOT-only
+    ones (canvas, session, writer...) are ignored. The PNG file is rendered once, and
+    its reduced copies of png_sizes are resampled from it (see save_pil_png).
+    Return the matplotlib Figure.
+    '''
+    if tot_graph:
+        raise NameError('tot_graph is not supported by the matplotlib backend')
+    check_png_compression(png_compression)
+    for p in paths:
+        if p.endswith('.root'):
+            raise NameError('the matplotlib backend cannot write \'{}\''.format(p))
+
+    hBkg = [(_as_histo(v[0]), v[1], v[2]) for v in dictBkg.values()]
+    tot, data = _as_histo(hTot), _as_histo(hData)
+    sigs = []
+    if dictSig:
+        for n, (h, color, norm, legName) in dictSig.items():
+            h = _as_histo(h).copy()
+            if norm:
+                integral = h.contents.sum()
+                scale = norm/integral if integral > 0 else 0.
+                h.contents, h.sumw2 = h.contents*scale, h.sumw2*scale**2
+            sigs.append((n, h, color, legName))
+    edges = data.edges
+    centers, nbins = 0.5*(edges[1:]+edges[:-1]), data.nbins
+
+    # Canvas and pads, with the same size and margins as make_nice_canvas
+    cwidth, chigh = int(1000*can_scale), int(800*can_scale)
+    if plot_ratio:
+        cwidth, chigh = int(900*can_scale), int(800*can_scale)
+    if can_ratio:
+        cwidth = int(cwidth/can_ratio)
+    dpi = 100.
+    fig = Figure(figsize=(cwidth/dpi, chigh/dpi), dpi=dpi)
+    FigureCanvasAgg(fig)
+    if plot_ratio:
+        padhigh, padlow = (0., 0.3, 1., 1.), (0., 0., 1., 0.3)
+        ax = fig.add_axes([0.12, 0.3, 0.83, 0.7*0.92])
+        rax = fig.add_axes([0.12, 0.3*0.45, 0.83, 0.3*0.55], sharex=ax)
+    else:
+        padhigh = (0., 0., 1., 1.)
+        ax = fig.add_axes([0.16, 0.16, 0.79, 0.79])
+
+    def pt(size, pad):
+        '''ROOT text size (fraction of the smallest pad dimension) in points'''
+        return size*min((pad[2]-pad[0])*cwidth, (pad[3]-pad[1])*chigh)*72./dpi
+
+    fonts = {'mathtext.default': 'regular', 'font.family': 'sans-serif',
+             'font.sans-serif': ['Helvetica', 'Arial', 'Liberation Sans', 'DejaVu Sans']}
+    with matplotlib.rc_context(fonts):
+        # Stack (first background on top, as in make_nice_canvas), uncertainty, signals and data
+        bottom = np.zeros(nbins)
+        handles = []
+        for h, color, legName in hBkg[::-1]:
+            top = bottom+h.values
+            art = _stairs(ax, top, edges, baseline=bottom, fill=True, color=root_color(color),
+                            edgecolor=(0, 0, 0, 0.3), linewidth=histo_border)
+            handles.insert(0, (art, h, legName))
+            bottom = top
+        err = tot.errors
+        band = _stairs(ax, tot.values+err, edges, baseline=tot.values-err, fill=True, facecolor='none',
+                         edgecolor=(0, 0, 0, max(error_alpha, 0.3)), hatch='////', linewidth=0)
+        sig_handles = []
+        for n, h, color, legName in sigs:
+            art = _stairs(ax, h.values, edges, color=root_color(color), linewidth=2.5,
+                            linestyle={1: '-', 2: '--', 3: ':', 4: '-.'}.get(sig_line_style, '-'))
+            sig_handles.append((art, h, legName))
+        msize = m_size or (1.7 if plot_ratio else 2.0)*can_scale
+        (derr_lo, derr_hi), (ratio, rerr_lo, rerr_hi) = data_intervals(data, tot, data_errors, ratio_errors, n_toys)
+        shown = (data.values > 0) | (data_errors != 'sqrt')
+        dots = _points(ax, centers[shown], data.values[shown], derr_lo[shown], derr_hi[shown],
+                       xerr=0.5*np.diff(edges)[shown], markersize=3.5*msize)
+
+        # Axis ranges and titles
+        if not ymax:
+            all_histos = [h for h, c, l in hBkg]+[data, tot]+[h for n, h, c, l in sigs]
+            ymax_auto = 1.6*max(np.max(h.values+h.errors) for h in all_histos)
+        ax.set_xlim(xmin if xmin else edges[0], xmax if xmax else edges[-1])
+        if is_logy:
+            ax.set_yscale('log')
+            ax.set_ylim(ymin if ymin else 0.02, ymax if ymax else 20*ymax_auto)
+        else:
+            ax.set_ylim(ymin if ymin else 0, ymax if ymax else ymax_auto)
+        if not ytitle and np.ptp(np.diff(edges)) > 1e-9*(edges[-1]-edges[0]):
+            ytitle = 'Events / bin'
+        elif not ytitle:
+            ytitle = 'Events / {:.0f} GeV'.format((edges[-1]-edges[0])/nbins)
+        ax.set_ylabel(root_latex(ytitle), fontsize=pt(0.055 if plot_ratio else 0.045, padhigh), loc='top')
+        ax.tick_params(which='both', direction='in', top=True, right=True, labelsize=pt(0.045, padhigh))
+        ax.minorticks_on()
+        xaxis = rax if plot_ratio else ax
+        xaxis.set_xlabel(root_latex(xtitle or ''), loc='right',
+                         fontsize=pt(0.15, padlow) if plot_ratio else pt(0.045, padhigh))
+        if bin_label:
+            shown_labels = thin_labels(bin_label[:nbins], 0.12 if plot_ratio else 0.045,
+                                       chigh*(0.3 if plot_ratio else 1.)/cwidth, ax.get_position().width)
+            xaxis.set_xticks(centers[[i for i, b in shown_labels]])
+            xaxis.set_xticklabels([root_latex(b) for i, b in shown_labels])
+            xaxis.xaxis.set_minor_locator(NullLocator())
+        elif xticksInt:
+            xaxis.xaxis.set_major_locator(MaxNLocator(integer=True))
+        if plot_ratio:
+            ax.tick_params(axis='x', labelbottom=False)
+
+        # Groups of bins: one line collection per panel, labels above the frame (see draw_bin_groups)
+        if bin_groups:
+            x0_frame, x1_frame = ax.get_xlim()
+            seps = np.array([lo for l, lo, hi in bin_groups[1:] if x0_frame < lo < x1_frame])
+            for a in [ax, rax] if plot_ratio else [ax]:
+                lines = LineCollection(np.stack([np.column_stack([seps, np.zeros_like(seps)]),
+                                                 np.column_stack([seps, np.ones_like(seps)])], axis=1),
+                                       transform=a.get_xaxis_transform(), colors=[root_color(922)],
+                                       linestyles='--', linewidths=1)
+                a.add_collection(lines, autolim=False)
+            if len(bin_groups) <= MAX_GROUP_LABELS:
+                frame = ax.get_position().width
+                aspect = chigh*(0.7 if plot_ratio else 1.)/cwidth
+                for label, lo, hi in bin_groups:
+                    lo, hi = max(lo, x0_frame), min(hi, x1_frame)
+                    if hi <= lo or not label:
+                        continue
+                    width = 0.9*frame*(hi-lo)/(x1_frame-x0_frame)
+                    size = min(0.03, 0.03*width/text_width(label, 0.03, aspect))
+                    ax.text(0.5*(lo+hi), 1.005, root_latex(label), transform=ax.get_xaxis_transform(),
+                            ha='center', va='bottom', fontsize=pt(size, padhigh))
+
+        # Legend, with the same default positions as make_nice_canvas
+        if plot_ratio:
+            x1, y1, x2, y2, textsize = 0.61, 0.3, 0.92, 0.90, 0.045
+            if leg_ncols == 2:
+                x1, y1, x2, y2 = 0.43, 0.55, 0.94, 0.90
+        else:
+            x1, y1, x2, y2, textsize = 0.61, 0.5, 0.98, 0.93, 0.038
+            if leg_ncols == 2:
+                x1, y1, x2, y2, textsize = 0.48, 0.65, 0.94, 0.93, 0.034
+        if leg_pos:
+            x1, y1, x2, y2 = leg_pos
+        if leg_put_nevts:
+            textsize = 0.03
+        if leg_textsize:
+            textsize = leg_textsize
+
+        def leg_name(h, name):
+            if leg_put_nevts:
+                return root_latex(leg_name_with_yield(name, *h.integral()))
+            return root_latex(name)
+        entries = [(dots, leg_name(data, 'Data'))]
+        entries += [(art, leg_name(h, n)) for art, h, n in handles+sig_handles]
+        entries.append((band, leg_name(tot, unc_leg)))
+        fx1, fy1 = _fig_coords(padhigh, x1, y1)
+        fx2, fy2 = _fig_coords(padhigh, x2, y2)
+        fig.legend([e[0] for e in entries], [e[1] for e in entries], ncol=leg_ncols, frameon=False,
+                   loc='upper left', bbox_to_anchor=(fx1, fy1, fx2-fx1, fy2-fy1), mode='expand',
+                   fontsize=pt(textsize, padhigh), borderaxespad=0.)
+
+        # ATLAS label, luminosity and plot labels (ATLASLabel and stampText conventions)
+        if plot_ratio:
+            x0, y0, dy, txt_size = 0.15, 0.84, 0.07, 0.052
+        else:
+            x0, y0, dy, txt_size = 0.19, 0.87, 0.06, 0.043
+        delx, size = 0.132*(can_ratio or 1.), 0.068 if plot_ratio else 0.052
+        atlas = fig.text(*_fig_coords(padhigh, x0, y0), s='ATLAS', fontsize=pt(size, padhigh),
+                         fontweight='bold', fontstyle='italic')
+        if atlas_label != 'ATLAS':
+            # Fonts differ from ROOT ones: never overlap the ATLAS word
+            atlas_end = atlas.get_window_extent(fig.canvas.get_renderer()).x1/cwidth+0.01
+            x_label = max(_fig_coords(padhigh, x0+delx, y0)[0], atlas_end)
+            fig.text(x_label, _fig_coords(padhigh, x0, y0)[1], s=atlas_label, fontsize=pt(size, padhigh))
+        labels = ['#sqrt{s} = 13 TeV, '+'{:.1f} '.format(lumi)+'fb^{-1}']+list(plot_labels or [])
+        for i, label in enumerate(labels):
+            fig.text(*_fig_coords(padhigh, x0, y0-(i+1)*dy), s=root_latex(label), fontsize=pt(txt_size, padhigh))
+
+        # Bottom panel
+        if plot_ratio:
+            if ratio_type == 'ratio':
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    filled = tot.values >= 0.001
+                    rel_err = np.where(filled, err/tot.values, 0.)
+                _stairs(rax, np.where(filled, 1+rel_err, 1), edges, baseline=np.where(filled, 1-rel_err, 1),
+                           fill=True, facecolor='none', edgecolor=(0, 0, 0, max(error_alpha, 0.3)),
+                           hatch='////', linewidth=0)
+                shown = filled & ((ratio >= 0.01) | (ratio_errors != 'sqrt'))
+                _points(rax, centers[shown], ratio[shown], rerr_lo[shown], rerr_hi[shown], markersize=3.5*msize)
+                rax.axhline(1, color='k', linewidth=1)
+                rax.set_ylim(r_ymin if r_ymin else 0., r_ymax if r_ymax else 2.)
+                rax.set_ylabel('Data / Pred.', fontsize=pt(0.12, padlow))
+            elif ratio_type in SIGNIF_TITLES:
+                if not dictSig:
+                    raise NameError('ratio_type \'{}\' is not supported when no signal is specified'.format(ratio_type))
+                sig_dict = {n: [h, c, None, l] for n, h, c, l in sigs}
+                if ratio_signals == 'all':
+                    ratio_signals = list(sig_dict.keys())
+                elif not ratio_signals:
+                    ratio_signals = list(sig_dict.keys())[:1]
+                names, zvals = significance_array(sig_dict, tot, ratio_type, ratio_signals)
+                if signif_file:
+                    save_significance(signif_file, names, edges, zvals, ratio_type)
+                for n, z in zip(names, zvals):
+                    _stairs(rax, z[1:-1], edges, color=root_color(sig_dict[n][1]), linewidth=2)
+                rax.axhline(3, color='k', linewidth=1)
+                rax.set_ylim(r_ymin if r_ymin else 0., r_ymax if r_ymax else 1.5)
+                rax.set_ylabel(root_latex(SIGNIF_TITLES[ratio_type]), fontsize=pt(0.12, padlow))
+            else:
+                err = 'ratio_type is only \'ratio\', {}, but not \'{}\''.format(', '.join(sorted(SIGNIF_TITLES)), ratio_type)
+                raise NameError(err)
+            rax.tick_params(which='both', direction='in', top=True, right=True, labelsize=pt(0.12, padlow))
+            rax.yaxis.set_major_locator(MaxNLocator(4))
+            rax.minorticks_on()
+            if bin_label:
+                rax.xaxis.set_minor_locator(NullLocator())
+
+        variants = set(v for p in paths if p.endswith('.png') for v, size in png_variants(p, png_sizes))
+        image = None
+        for path in paths:
+            if path in variants:
+                continue
+            if not path.endswith('.png'):
+                fig.savefig(path)
+                continue
+            if image is None:
+                from PIL import Image
+                buf = io.BytesIO()
+                fig.savefig(buf, format='png')
+                image = Image.open(buf)
+                image.load()
+            save_pil_png(image, path, png_variants(path, png_sizes), png_compression)
+    return fig
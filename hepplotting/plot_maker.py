@@ -1,19 +1,25 @@
-import ROOT
 import numpy as np
-import pandas as pd
-import math
-import sys
 import os
-
-ROOT.gROOT.LoadMacro(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AtlasStyle.C'))
-ROOT.SetAtlasStyle()
-ROOT.gStyle.SetOptStat(0)
-ROOT.gStyle.SetOptTitle(0)
+import functools
+
+from .root_setup import ROOT
+from .histo import Histo, th1_views, th1_edges
+from .significance import SIGNIF_TITLES, significance_array, save_significance
+from .writers import parse_outputs, default_writer, png_variants, save_canvas, check_png_compression
+from .systematics import asym_graph, graph_arrays
+from .rebinning import rebin_inputs
+from .unroll import unroll_inputs, thin_labels, MAX_GROUP_LABELS
+from .yields import format_yield
+from .scene import lumi_text, refresh_plot
+from .layout import plot_layout, text_width
+from .profiling import StageTimer, NullTimer
+from .preview import Preview, preview_session
+from .intervals import data_intervals, N_TOYS
+from .cache import fingerprint, is_cached, refreshable, store_fingerprint, remove_fingerprint, count
 
 
 def ATLASLabel(x, y, text, withRatio=True, rsize=None):
     txt = ROOT.TLatex()
-    ROOT.SetOwnership(txt, False)
     txt.SetNDC()
     delx, size = 0.132, 0.052
     if rsize:
@@ -22,19 +28,49 @@ def ATLASLabel(x, y, text, withRatio=True, rsize=None):
         size = 0.068
     txt.SetTextSize(size)
     txt.SetTextFont(72)
-    txt.DrawLatex(x, y, 'ATLAS')
+    atlas = txt.DrawLatex(x, y, 'ATLAS')
     txt.SetTextFont(42)
-    txt.DrawLatex(x+delx, y, text)
+    return atlas, txt.DrawLatex(x+delx, y, text)
 
 
 def stampText(text, x, y, size):
     txt = ROOT.TLatex()
-    ROOT.SetOwnership(txt, False)
     txt.SetNDC()
     txt.SetTextFont(42)
     txt.SetTextColor(1)
     txt.SetTextSize(size)
-    txt.DrawLatex(x, y, text)
+    return txt.DrawLatex(x, y, text)
+
+
+def draw_bin_groups(pad, bin_groups, xmin, xmax, aspect, labels=True, size=0.03):
+    '''
+    Draw dashed lines between the groups of bins of bin_groups [list of (label, xlo, xhi)] over the
+    frame of pad, and the group labels above the frame (if labels and at most MAX_GROUP_LABELS
+    groups), reduced from size to fit in their group (aspect is the pad height/width ratio).
+    One object is drawn per group, whatever the number of bins.
+    '''
+    pad.cd()
+    pad.Update()
+    ylo, yhi = pad.PadtoY(pad.GetUymin()), pad.PadtoY(pad.GetUymax())
+    line = ROOT.TLine()
+    line.SetLineStyle(2)
+    line.SetLineColor(ROOT.kGray+2)
+    for label, xlo, xhi in bin_groups[1:]:
+        if xmin < xlo < xmax:
+            line.DrawLine(xlo, ylo, xlo, yhi)
+    if not labels or len(bin_groups) > MAX_GROUP_LABELS:
+        return
+    left, frame = pad.GetLeftMargin(), 1-pad.GetLeftMargin()-pad.GetRightMargin()
+    y = 1-pad.GetTopMargin()+0.01
+    for label, xlo, xhi in bin_groups:
+        lo, hi = max(xlo, xmin), min(xhi, xmax)
+        if hi <= lo or not label:
+            continue
+        width = 0.9*frame*(hi-lo)/(xmax-xmin)
+        txt = stampText(label, left+frame*(0.5*(lo+hi)-xmin)/(xmax-xmin), y,
+                        min(size, size*width/text_width(label, size, aspect)))
+        txt.SetTextAlign(21)
+        txt.SetName('bin_group_label')
 
 
 def sum_histograms(hBkg, name='tot'):
@@ -46,15 +82,14 @@ def sum_histograms(hBkg, name='tot'):
     . "hBkg" [list of TH1] is a list of histograms to be summed up
 
     - Return:
-    . TH1 being the summed histogram
+    . TH1 being the summed histogram, owned by Python (deleted once it is not used anymore)
     '''
-    for i, h in enumerate(hBkg):
-        if i == 0:
-            hTot = h.Clone(h.GetName()+'_'+name)
-            ROOT.SetOwnership(hTot, False)
-        else:
-            hTot.Add(h)
-    return hTot.Clone(name)
+    hBkg = list(hBkg)
+    hTot = hBkg[0].Clone(name)
+    ROOT.SetOwnership(hTot, True)
+    for h in hBkg[1:]:
+        hTot.Add(h)
+    return hTot
 
 
 def add_flat_syst(h, s=0, name='wsyst'):
@@ -70,11 +105,9 @@ def add_flat_syst(h, s=0, name='wsyst'):
     if s == 0:
         return hres
     else:
-        for i in range(0, h.GetNbinsX()+1):
-            val, err = h.GetBinContent(i), h.GetBinError(i)
-            new_err = math.sqrt(err**2 + (val*s)**2)
-            hres.SetBinContent(i, val)
-            hres.SetBinError(i, new_err)
+        contents, sumw2 = th1_views(hres)
+        sl = slice(0, h.GetNbinsX()+1)
+        sumw2[sl] += (contents[sl].astype(np.float64)*s)**2
     return hres
 
 
@@ -87,15 +120,14 @@ def scale_xaxis(h, scale, addOverflow=False):
     xmin = h.GetBinLowEdge(1)
     xmax = h.GetBinLowEdge(nbins)+h.GetBinWidth(nbins)
     hres = ROOT.TH1F(h.GetName()+'_goodbin', h.GetTitle(), nbins, xmin*scale, xmax*scale)
-    for i in xrange(0, nbins+2):
-        hres.SetBinContent(i, h.GetBinContent(i))
-        hres.SetBinError(i, h.GetBinError(i))
+    src = Histo.from_th1(h)
+    contents, sumw2 = th1_views(hres)
+    contents[:] = src.contents
+    sumw2[:] = src.sumw2
     if addOverflow:
-        Nlb, Elb = hres.GetBinContent(nbins), hres.GetBinError(nbins)
-        Nof, Eof = hres.GetBinContent(nbins+1), hres.GetBinError(nbins+1)
-        hres.SetBinContent(nbins, Nlb+Nof)
-        hres.SetBinError(nbins, np.sqrt(Elb**2+Eof**2))
-        hres.SetBinContent(nbins+1, 0), hres.SetBinError(nbins+1, 0)
+        contents[nbins] += contents[nbins+1]
+        sumw2[nbins] += sumw2[nbins+1]
+        contents[nbins+1], sumw2[nbins+1] = 0, 0
     return hres
 
 
@@ -104,13 +136,71 @@ def remove_0entry_data(hdata, th=0.5):
     Set bin content and error to a not visible values for data histogram \'hdata\' [TH1].
     The threshold can be tuned (e.g. ratio to data wher undesirable values are not only <0.5).
     '''
-    for i in xrange(1, hdata.GetNbinsX()+2):
-        if hdata.GetBinContent(i) < th:
-            hdata.SetBinContent(i, -1e5)
-            hdata.SetBinError(i, 0.0)
+    contents, sumw2 = th1_views(hdata)
+    empty = contents[1:] < th
+    contents[1:][empty] = -1e5
+    sumw2[1:][empty] = 0.0
     return hdata
 
 
+def leg_name_with_yield(name, Ntot, Etot):
+    '''
+    Legend name followed by the yield and its uncertainty, eg. 'ttbar (1234 #pm 56)',
+    with one decimal below 100 events, and only the yield for data
+    '''
+    return '{} ({})'.format(name, format_yield(Ntot, Etot, name in ('Data', 'data', 'DATA')))
+
+
+def output_paths(plot_name, plotdir='plots', atlas_label='Internal', outputs=None, png_sizes=None):
+    '''
+    Return the list of files written by make_nice_canvas for a given plot,
+    ie plotdir/plot_name_atlas_label.{pdf,png,root} for the default outputs,
+    and the reduced PNG files of png_sizes (see png_variants)
+    '''
+    if plotdir:
+        full_path_plot = plotdir+'/'+plot_name
+    else:
+        full_path_plot = plot_name
+    paths = []
+    for ext in parse_outputs(outputs):
+        paths.append(full_path_plot+'_{}.{}'.format(atlas_label, ext))
+        if ext == 'png':
+            paths += [v[0] for v in png_variants(paths[-1], png_sizes)]
+    return paths
+
+
+def make_ratio_pads(canv):
+    '''
+    Draw the upper (70%) and lower (30%) pads of a plot with ratio panel on canv,
+    and return them as (padhigh, padlow)
+    '''
+    canv.cd()
+    padhigh = ROOT.TPad('padhigh', 'padhigh', 0., 0.3, 1., 1.0, 0, 0, 0)
+    padlow = ROOT.TPad('padlow', 'padlow', 0., 0.0, 1., 0.3, 0, 0, 0)
+    padhigh.Draw()
+    padhigh.cd()
+    padhigh.SetTopMargin(0.08)
+    padhigh.SetBottomMargin(0.0)
+    padhigh.SetLeftMargin(0.12)
+    padhigh.SetRightMargin(0.05)
+    padhigh.SetFrameBorderMode(0)
+    canv.cd()
+    padlow.Draw()
+    padlow.cd()
+    padlow.SetTopMargin(0.0)
+    padlow.SetBottomMargin(0.45)
+    padlow.SetLeftMargin(0.12)
+    padlow.SetRightMargin(0.05)
+    padlow.SetFrameBorderMode(0)
+    return padhigh, padlow
+
+
+def _report_profile(timer, profile):
+    stats = timer.stop()
+    if stats and callable(profile):
+        profile(stats)
+
+
 def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
     '''
     Produce a canvas with stacked histograms for background, data and ratio plots.
@@ -127,6 +217,29 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
     Key-word arguments
     ==================
     . plotdir [string] is a directory where the plots will be stored (default: 'plots')
+    . outputs [list of string] formats to be written among \'pdf\', \'png\', \'svg\', \'eps\', \'root\'
+      (default: [\'pdf\', \'png\', \'root\']), or \'none\' to write nothing
+    . writer [OutputWriter] write the files in background processes (see OutputWriter.wait())
+    . async_outputs [bool] write the files with a shared background writer (see wait_outputs())
+    . png_sizes [dict {name: size}] reduced copies of the PNG file, plot_name_atlas_label_<name>.png, made
+      from the same rendering, size being a scale factor (<= 1) or a width in pixels (> 1),
+      eg. {'reduced': 0.5, 'thumb': 200}
+    . png_compression [int] compression level of the PNG files, from 0 (none) to 9 (smallest files)
+    . booklet [Booklet] add the plot as a page of a multi-page PDF and to a ROOT file of all canvases;
+      no individual file is written unless outputs is given
+    . use_cache [bool] skip the plot (and return None) if its inputs and options are identical to the
+      previous rendering, whose fingerprint is stored in plotdir, and all output files exist (default: False).
+      If only cosmetic options changed (atlas_label, lumi, plot_labels, leg_pos, ymin, ymax, r_ymin, r_ymax,
+      xtitle, ytitle), the canvas is read from the previous ROOT output file, updated and saved again
+      (see update_canvas) instead of being rebuilt
+    . force_render [bool] render the plot even if it is found in the cache (default: False)
+    . profile [bool or callable] record the wall time of each stage and the number of created
+      objects; the profile dictionary is given to profile if callable, and by last_profile()
+    . preview [bool or string] draw the plot at reduced size and return a Preview holding its image,
+      displayed inline in notebooks: True or 'png' (made in memory), or 'svg'. Nothing is written
+      (outputs, cache, booklet and signif_file are ignored) and, without canvas or session, the same
+      canvas is reused from one preview to the next
+    . preview_scale [float] size of the preview relative to the full plot (default: 0.5)
 
     AXIS properties
     ---------------
@@ -135,21 +248,34 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
     . dictSig [dict {sigName: [TH1, color, norm, legName]}] is dictionnary with name [string], histo [TH1],
      color [int], norm [float] and legName [string] of several signals
     . is_logy [boolean] to plot in log scale or not
-    . bin_label [list of string] to name bins (e.g plots with one region yield per bin)
+    . bin_label [list of string] to name bins (e.g plots with one region yield per bin); above 60 bins,
+      only one label every k bins is drawn
+    . bin_groups [list of (label, xlo, xhi)] groups of bins (e.g. the bins of an unrolled 2D histogram
+      for one bin of y, or the regions of a channel), separated by dashed lines and labelled above the
+      frame (labels are not drawn above 40 groups)
+    . unroll [bool or dict] hData, hTot and the histograms of dictBkg and dictSig are TH2 or TH3,
+      drawn unrolled in 1D with one group of bins per bin of y (and z); a dict gives the options
+      flow and titles of unroll_inputs (bin_groups are then made from the y and z axes)
     . xlabel_size [float] size of the x-axis bin labels
     . xlabel_offset [float] offset of the x-axis bin labels
     . xticksInt [bool] keep only integer values for x-axis ticks
+    . rebin [bool or dict] merge adjacent bins of all histograms (backgrounds, total, data and signals)
+      until the thresholds given as dictionary are met, eg. {'max_rel_error': 0.2, 'min_data': 5},
+      True for the default ones (see find_binning); the under/overflow bins are folded in the first/last bins
     . xmin [float] lower x-axis value
     . xmax [float] lower x-axis value
     . ymin [float] lower y-axis value
-    . ymax [float] higher y-axis value
+    . ymax [float or 'auto'] higher y-axis value ('auto': see auto_layout)
     . r_ymin [float] lower y-axis value on the ratio plot
     . r_ymax [float] higher y-axis value on the ratio plot
 
     LEGEND properties
     -----------------
-    . leg_pos [list of float] specify the legend position via bottom left (x1,y1)
-     and top right (x2,y2) using [x1,y1,x2,y2]
+    . leg_pos [list of float or 'auto'] specify the legend position via bottom left (x1,y1)
+     and top right (x2,y2) using [x1,y1,x2,y2] ('auto': see auto_layout)
+    . auto_layout [bool] choose the legend position and the y-axis range (linear or log) from the bin
+      contents, such that the drawn histograms do not overlap the legend and labels; the ymin, ymax
+      and leg_pos given explicitly are kept (default: False)
     . unc_leg [string] to tune the name of uncertainty (eg. stat-only)
     . leg_ncols [int] number of columns used for the legend
     . leg_put_nevts [bool] to print events yields in the legend (default: False)
@@ -161,6 +287,14 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
     . error_fill [int] is the filling style for the uncertainty band
     . error_alpha [float] is the transparency for the uncertainty band (in [0,1])
     . histo_border [int] is the border size of background histograms in the stacks
+    . tot_graph [TGraphAsymmErrors] total background with asymmetric uncertainties (see build_total),
+      drawn as uncertainty band instead of the hTot errors in both panels
+    . data_errors [string] error bars of data: 'sqrt' (default, errors of hData) or 'poisson' (asymmetric
+      Garwood intervals, see garwood_interval)
+    . ratio_errors [string] error bars of Data / Pred.: 'sqrt' (default, errors of hData), 'poisson' (Garwood
+      intervals divided by the prediction) or 'toys' (pseudo-experiments including the uncertainty of the
+      prediction, see toy_ratio_interval); asymmetric errors are drawn as TGraphAsymmErrors
+    . n_toys [int] number of pseudo-experiments for ratio_errors='toys' (default: 1000)
 
     LABELS properties
     -----------------
@@ -171,10 +305,19 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
     CANVAS properties
     -----------------
     . canvas [TCanvas] on which the plot will be made
+    . backend [string] \'root\' (default) or \'mpl\' to draw the same layout with matplotlib, from Histo
+      (or TH1) inputs and without importing ROOT; a matplotlib Figure is then returned and the
+      default outputs are pdf and png
+    . session [PlotSession] reuse the canvas, pads and legend of the session, and delete the objects of
+      the previous plot of the session (the returned canvas is only valid until the next plot)
     . can_ratio [float] specify the canvas size such as width=900/ratio and height=800
     . can_scale [float] scale the whole canvas without changin its ratio
     . plot_ratio [boolean] to plot or not the ratio panel
-    . ratio_type [string] to choose what to plot in the bottom plot (\'ratio\' [default], \'SoverB\', \'signif\')
+    . ratio_type [string] to choose what to plot in the bottom plot (\'ratio\' [default], \'SoverB\', \'signif\',
+      \'signif_stat\' (Z_A without background uncertainty), \'signif_cumul\' (Z_A of the cut x > bin low edge))
+    . ratio_signals [list of string or \'all\'] signals drawn in the bottom plot for ratio_type other than \'ratio\'
+      (default: the first signal of dictSig)
+    . signif_file [string] path of a .npz file where the (signal x bin) array of the bottom plot is saved
     '''
 
     plotdir, dictSig, sig_line_style, xtitle_arg, ytitle_arg = 'plots', None, 1, None, None
@@ -183,7 +326,14 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
     r_ymin, r_ymax, can_ratio, can_scale, m_size = None, None, None, 1.0, None
     canvas, error_fill, error_alpha, histo_border, plot_labels = None, 3356, 0.3, 0, None
     plot_ratio, atlas_label, unc_leg, ratio_type = True, 'Internal', 'Total bkg w/ unc.', 'ratio'
-    leg_put_nevts, leg_ncols, leg_textsize = False, 1, None
+    leg_put_nevts, leg_ncols, leg_textsize, auto_layout = False, 1, None, False
+    ratio_signals, signif_file, tot_graph, rebin = None, None, None, None
+    unroll, bin_groups = False, None
+    outputs, writer, async_outputs, booklet = None, None, False, None
+    png_sizes, png_compression = None, None
+    use_cache, force_render, profile, session, backend = False, False, False, None, 'root'
+    preview, preview_scale = False, 0.5
+    data_errors, ratio_errors, n_toys = 'sqrt', 'sqrt', N_TOYS
     if 'lumi' in kwargs:
         lumi = kwargs['lumi']
     if 'dictSig' in kwargs:
@@ -192,6 +342,24 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
         sig_line_style = kwargs['sig_line_style']
     if 'plotdir' in kwargs:
         plotdir = kwargs['plotdir']
+    if 'outputs' in kwargs:
+        outputs = kwargs['outputs']
+    if 'writer' in kwargs:
+        writer = kwargs['writer']
+    if 'async_outputs' in kwargs:
+        async_outputs = kwargs['async_outputs']
+    if 'png_sizes' in kwargs:
+        png_sizes = kwargs['png_sizes']
+    if 'png_compression' in kwargs:
+        png_compression = check_png_compression(kwargs['png_compression'])
+    if 'booklet' in kwargs:
+        booklet = kwargs['booklet']
+    if 'use_cache' in kwargs:
+        use_cache = kwargs['use_cache']
+    if 'force_render' in kwargs:
+        force_render = kwargs['force_render']
+    if 'profile' in kwargs:
+        profile = kwargs['profile']
     if 'xtitle' in kwargs:
         xtitle_arg = kwargs['xtitle']
     if 'ytitle' in kwargs:
@@ -208,6 +376,12 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
         xlabel_offset = kwargs['xlabel_offset']
     if 'xticksInt' in kwargs:
         xticksInt = kwargs['xticksInt']
+    if 'rebin' in kwargs:
+        rebin = kwargs['rebin']
+    if 'unroll' in kwargs:
+        unroll = kwargs['unroll']
+    if 'bin_groups' in kwargs:
+        bin_groups = kwargs['bin_groups']
     if 'xmin' in kwargs:
         xmin_arg = kwargs['xmin']
     if 'xmax' in kwargs:
@@ -222,12 +396,18 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
         r_ymax = kwargs['r_ymax']
     if 'canvas' in kwargs:
         canvas = kwargs['canvas']
+    if 'session' in kwargs:
+        session = kwargs['session']
+    if 'backend' in kwargs:
+        backend = kwargs['backend']
     if 'can_ratio' in kwargs:
         can_ratio = kwargs['can_ratio']
     if 'can_scale' in kwargs:
         can_scale = kwargs['can_scale']
     if 'leg_pos' in kwargs:
         leg_pos = kwargs['leg_pos']
+    if 'auto_layout' in kwargs:
+        auto_layout = kwargs['auto_layout']
     if 'leg_ncols' in kwargs:
         leg_ncols = kwargs['leg_ncols']
     if 'leg_put_nevts' in kwargs:
@@ -246,15 +426,143 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
         error_fill = kwargs['error_fill']
     if 'error_alpha' in kwargs:
         error_alpha = kwargs['error_alpha']
+    if 'tot_graph' in kwargs:
+        tot_graph = kwargs['tot_graph']
     if 'histo_border' in kwargs:
         histo_border = kwargs['histo_border']
     if 'plot_ratio' in kwargs:
         plot_ratio = kwargs['plot_ratio']
     if 'ratio_type' in kwargs:
         ratio_type = kwargs['ratio_type']
+    if 'ratio_signals' in kwargs:
+        ratio_signals = kwargs['ratio_signals']
+    if 'signif_file' in kwargs:
+        signif_file = kwargs['signif_file']
+    if 'data_errors' in kwargs:
+        data_errors = kwargs['data_errors']
+    if 'ratio_errors' in kwargs:
+        ratio_errors = kwargs['ratio_errors']
+    if 'n_toys' in kwargs:
+        n_toys = kwargs['n_toys']
+    if 'preview' in kwargs:
+        preview = kwargs['preview']
+    if 'preview_scale' in kwargs:
+        preview_scale = kwargs['preview_scale']
+
+    # Previews are drawn smaller, in memory and on a reused canvas
+    if preview:
+        preview = 'png' if preview is True else preview
+        outputs, writer, async_outputs, booklet, use_cache, signif_file = 'none', None, False, None, False, None
+        can_scale *= preview_scale
+        kwargs = dict(kwargs, outputs='none', signif_file=None, can_scale=can_scale)
+        if backend == 'root' and not (session or canvas):
+            session = preview_session()
+
+    timer = StageTimer(plot_name) if profile else NullTimer()
+
+    def keep(obj):
+        '''Objects made for this plot: deleted at the next plot of a session, never otherwise'''
+        if session:
+            return session.own(obj)
+        ROOT.SetOwnership(obj, False)
+        return obj
+
+    def keep_input(h):
+        if not session:
+            ROOT.SetOwnership(h, False)
+
+    def get_line(value):
+        if session:
+            return session.get_line(value)
+        return keep(ROOT.TF1('cline', str(value), -100, 5000))
+
+    # Skip plots whose inputs and outputs did not change since the last rendering
+    timer.start('cache')
+    if booklet and outputs is None:
+        outputs = 'none'
+    if backend == 'mpl' and outputs is None:
+        outputs = ['pdf', 'png']
+    paths = output_paths(plot_name, plotdir, atlas_label, outputs, png_sizes)
+    digest = None
+    if use_cache:
+        digest = fingerprint(dictBkg, hTot, hData, plot_name, kwargs)
+        if force_render:
+            count('forced')
+        elif is_cached(digest, plotdir, plot_name, paths):
+            count('hits')
+            timer.count('cache_hits')
+            _report_profile(timer, profile)
+            return None
+        elif backend == 'root' and refreshable(digest, plotdir, plot_name, kwargs):
+            # Only cosmetic changes: update the previous canvas instead of rebuilding it
+            count('refreshed')
+            timer.count('cache_refreshed')
+            timer.start('save')
+            canv = refresh_plot(*refreshable(digest, plotdir, plot_name, kwargs), paths=paths,
+                                png_sizes=png_sizes, png_compression=png_compression)
+            store_fingerprint(digest, plotdir, plot_name, paths, kwargs)
+            if booklet:
+                booklet.add(canv, plot_name)
+            _report_profile(timer, profile)
+            return canv
+        else:
+            count('misses')
+        remove_fingerprint(plotdir, plot_name)
+
+    # 2D or 3D histograms laid out in 1D, one group of bins per bin of the other axes
+    if unroll:
+        timer.start('unroll')
+        if rebin or tot_graph:
+            raise NameError('unroll cannot be used with rebin nor tot_graph: unroll the inputs and variations with unroll_inputs first')
+        options = unroll if isinstance(unroll, dict) else {}
+        dictBkg, hTot, hData, dictSig, _, groups = unroll_inputs(dictBkg, hTot, hData, dictSig,
+                                                                 as_th1=backend == 'root', **options)
+        bin_groups = bin_groups or groups
+        ytitle_arg = ytitle_arg or 'Events / bin'
+        kwargs = dict(kwargs, dictSig=dictSig, bin_groups=bin_groups, ytitle=ytitle_arg)
+        if backend == 'root':
+            for h in [hTot, hData]+[v[0] for v in list(dictBkg.values())+list((dictSig or {}).values())]:
+                keep(h)
+
+    # Same statistics-driven binning for all histograms
+    if rebin:
+        timer.start('rebin')
+        if tot_graph:
+            raise NameError('rebin cannot be used with tot_graph: rebin the variations with rebin_inputs before build_total')
+        thresholds = rebin if isinstance(rebin, dict) else {}
+        dictBkg, hTot, hData, dictSig, _, _ = rebin_inputs(dictBkg, hTot, hData, dictSig, **thresholds)
+        kwargs = dict(kwargs, dictSig=dictSig) if dictSig else kwargs
+        if backend == 'root':
+            for h in [hTot, hData]+[v[0] for v in list(dictBkg.values())+list((dictSig or {}).values())]:
+                keep(h)
+
+    # Legend position and y-range avoiding overlaps
+    if auto_layout or 'auto' in (leg_pos, ymax_arg):
+        timer.start('layout')
+        kwargs = dict(kwargs, **plot_layout(dictBkg, hTot, hData, dict(kwargs, dictSig=dictSig)))
+        ymin_arg, ymax_arg, leg_pos = kwargs.get('ymin'), kwargs.get('ymax'), kwargs.get('leg_pos')
+
+    if backend == 'mpl':
+        from .mpl_backend import make_mpl_canvas
+        timer.start('draw')
+        if paths and plotdir and not os.path.isdir(plotdir):
+            os.makedirs(plotdir)
+        fig = make_mpl_canvas(dictBkg, hTot, hData, paths, **kwargs)
+        if preview:
+            _report_profile(timer, profile)
+            return Preview(fig, preview)
+        if booklet:
+            booklet.add(fig, plot_name)
+        if digest:
+            store_fingerprint(digest, plotdir, plot_name, paths, kwargs)
+        _report_profile(timer, profile)
+        return fig
+    elif backend != 'root':
+        raise NameError('backend is only \'root\' or \'mpl\', but not \'{}\''.format(backend))
 
     # Get color and names for bkg histograms
-    bkg_name = dictBkg.keys()
+    timer.start('cosmetics')
+    bkg_name = list(dictBkg.keys())
     hBkg = {n: v[0] for n, v in dictBkg.items()}
     bkg_color = {n: v[1] for n, v in dictBkg.items()}
     bkg_legname = {n: v[2] for n, v in dictBkg.items()}
@@ -263,7 +571,7 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
     if dictSig:
         for n, sig in dictSig.items():
             h, color, norm, legName = sig
-            ROOT.SetOwnership(h, False)
+            keep_input(h)
             h.SetTitle('')
             h.SetFillColor(0)
             h.SetLineColor(color)
@@ -277,7 +585,7 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
                     h.Scale(0.)
             h.SetFillColor(0)
     for b in bkg_name:
-        ROOT.SetOwnership(hBkg[b], False)
+        keep_input(hBkg[b])
         hBkg[b].SetTitle('')
         hBkg[b].SetLineWidth(histo_border)
         hBkg[b].SetMarkerSize(0)
@@ -285,22 +593,26 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
         hBkg[b].SetLineColorAlpha(1, 0.3)
         hBkg[b].SetMarkerColor(bkg_color[b])
 
-    ROOT.SetOwnership(hTot, False)
+    keep_input(hTot)
     hTot.SetLineWidth(0)
 
     # Preparing the stack
-    hstack = ROOT.THStack()
-    ROOT.SetOwnership(hstack, False)
+    timer.start('stack')
+    timer.count('backgrounds', len(bkg_name))
+    timer.count('signals', len(dictSig) if dictSig else 0)
+    hstack = keep(ROOT.THStack())
     for b in bkg_name[::-1]:
         hstack.Add(hBkg[b])
 
     # Manage axis scaling and label involving numbers
-    ROOT.SetOwnership(hData, False)
+    keep_input(hData)
     nbins = hData.GetNbinsX()
     xmin = hData.GetBinLowEdge(1)
     xmax = hData.GetBinLowEdge(nbins)+hData.GetBinWidth(nbins)
     if ytitle_arg:
         ytitle = ytitle_arg
+    elif hData.GetXaxis().IsVariableBinSize():
+        ytitle = 'Events / bin'
     else:
         ytitle = 'Events / {:.0f} GeV'.format((xmax-xmin)/(nbins))
     if xtitle_arg:
@@ -317,6 +629,8 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
     else:
         xmax = hData.GetBinLowEdge(nbins)+hData.GetBinWidth(nbins)
 
+    timer.start('ymax')
+    timer.count('bins', nbins)
     if ymax_arg:
         ymax = ymax_arg
     else:
@@ -326,9 +640,10 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
             for n, sig in dictSig.items():
                 all_histos.append(sig[0])
         all_histos.append(hTot)
-        ymax = 1.6 * np.max([h.GetBinContent(i)+h.GetBinError(i)
-                             for i in range(1, h.GetNbinsX()+1)
-                             for h in all_histos])
+        ymax = 1.6 * max(np.max(hh.values+hh.errors) for hh in map(Histo.from_th1, all_histos))
+        if tot_graph:
+            y, eyl, eyh = graph_arrays(tot_graph)
+            ymax = max(ymax, 1.6 * np.max(y+eyh))
     if ymin_arg:
         ymin = ymin_arg
     else:
@@ -339,39 +654,26 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
     hData.GetXaxis().SetRangeUser(xmin, xmax)
     hTot.GetXaxis().SetRangeUser(xmin, xmax)
 
+    timer.start('canvas')
     cwidth, chigh = int(1000*can_scale), int(800*can_scale)
     if plot_ratio:
         cwidth, chigh = int(900*can_scale), int(800*can_scale)
     if can_ratio:
         cwidth, chigh = int(cwidth/can_ratio), chigh
-    if canvas:
-        canv = canvas
-        canv.SetWindowSize(cwidth, chigh)
-    else:
-        canv = ROOT.TCanvas(plot_name, plot_name, cwidth, chigh)
-    ROOT.SetOwnership(canv, False)
-    canv.SetTitle('')
-
-    if plot_ratio:
-        padhigh = ROOT.TPad('padhigh', 'padhigh', 0., 0.3, 1., 1.0, 0, 0, 0)
-        padlow = ROOT.TPad('padlow', 'padlow', 0., 0.0, 1., 0.3, 0, 0, 0)
-        padhigh.Draw()
-        padhigh.cd()
-        padhigh.SetTopMargin(0.08)
-        padhigh.SetBottomMargin(0.0)
-        padhigh.SetLeftMargin(0.12)
-        padhigh.SetRightMargin(0.05)
-        padhigh.SetFrameBorderMode(0)
-        canv.cd()
-        padlow.Draw()
-        padlow.cd()
-        padlow.SetTopMargin(0.0)
-        padlow.SetBottomMargin(0.45)
-        padlow.SetLeftMargin(0.12)
-        padlow.SetRightMargin(0.05)
-        padlow.SetFrameBorderMode(0)
+    if session:
+        canv, padhigh, padlow = session.new_plot(plot_name, cwidth, chigh, plot_ratio)
     else:
-        padhigh = canv
+        if canvas:
+            canv = canvas
+            canv.SetWindowSize(cwidth, chigh)
+        else:
+            canv = ROOT.TCanvas(plot_name, plot_name, cwidth, chigh)
+        ROOT.SetOwnership(canv, False)
+        canv.SetTitle('')
+        if plot_ratio:
+            padhigh, padlow = make_ratio_pads(canv)
+        else:
+            padhigh = canv
 
     padhigh.cd()
     if plot_ratio:
@@ -389,22 +691,21 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
     if leg_textsize:
         textsize = leg_textsize
 
+    timer.start('legend')
+
     def make_leg_name(histo, name):
+        timer.count('legend_entries')
         if leg_put_nevts:
-            Etot = ROOT.Double(0.0)
-            Ntot = histo.IntegralAndError(-999, 999, Etot)
-            str_template = '{} ({:.0f} #pm {:.0f})'
-            if Ntot<100:
-                str_template = '{} ({:.1f} #pm {:.1f})'
-            if name in ('Data', 'data', 'DATA'):
-                return '{} ({:.0f})'.format(name, Ntot)
-            else:
-                return str_template.format(name, Ntot, Etot)
+            timer.count('integrals')
+            Ntot, Etot = Histo.from_th1(histo).integral()
+            return leg_name_with_yield(name, Ntot, Etot)
         else:
             return name
 
-    leg = ROOT.TLegend(x1, y1, x2, y2)
-    ROOT.SetOwnership(leg, False)
+    if session:
+        leg = session.get_legend(x1, y1, x2, y2)
+    else:
+        leg = keep(ROOT.TLegend(x1, y1, x2, y2))
     leg.SetNColumns(leg_ncols)
     leg.SetTextFont(42)
     leg.SetFillStyle(0)
@@ -421,6 +722,7 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
     leg.AddEntry(hTot, make_leg_name(hTot, unc_leg), 'f')
 
 
+    timer.start('draw')
     hData.SetMarkerStyle(20)
     if plot_ratio:
         hData.SetMarkerSize(1.7*can_scale)
@@ -449,18 +751,47 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
     hTot.GetYaxis().SetLabelSize(0.045)
     if xticksInt:
         hTot.GetXaxis().SetNdivisions(hTot.GetNbinsX(), 0, 0, True)
-    hTot.Draw('E2')
+
+    # Asymmetric error bars of data and ratio points
+    gdata, gdataovermc = None, None
+    if data_errors != 'sqrt' or ratio_errors != 'sqrt':
+        pred_err = None
+        if tot_graph:
+            y, eyl, eyh = graph_arrays(tot_graph)
+            pred_err = 0.5*(eyl+eyh)
+        derr, rerr = data_intervals(Histo.from_th1(hData), Histo.from_th1(hTot), data_errors, ratio_errors,
+                                    n_toys, pred_err)
+        if data_errors != 'sqrt':
+            gdata = keep(asym_graph(th1_edges(hData), Histo.from_th1(hData).values, derr[0], derr[1], 'gdata'))
+            gdata.SetMarkerStyle(hData.GetMarkerStyle())
+            gdata.SetMarkerSize(hData.GetMarkerSize())
+            gdata.SetLineWidth(hData.GetLineWidth())
+    data_obj, data_opt = (gdata, 'P same') if gdata else (hData, 'Esame')
+
+    if tot_graph:
+        tot_graph.SetFillColorAlpha(1, error_alpha)
+        tot_graph.SetFillStyle(error_fill)
+        tot_graph.SetLineWidth(0)
+        tot_graph.SetMarkerSize(0)
+        hTot.Draw('AXIS')
+    else:
+        hTot.Draw('E2')
     hstack.Draw('hist same')
-    hData.Draw('Esame')
-    hTot.Draw('E2same')
+    data_obj.Draw(data_opt)
+    if tot_graph:
+        tot_graph.Draw('2 same')
+    else:
+        hTot.Draw('E2same')
     leg.Draw('same')
     if dictSig:
         for n, sig in dictSig.items():
             sig[0].Draw("hist same")
-    hData.Draw("esame")
+    data_obj.Draw(data_opt)
     if bin_label:
-        for i, r in enumerate(bin_label):
-            hTot.GetXaxis().SetBinLabel(i+1, bin_label[i])
+        label_size = (xlabel_size or 0.12) if plot_ratio else 0.045
+        aspect = chigh*(0.3 if plot_ratio else 1.)/cwidth
+        for i, r in thin_labels(bin_label, label_size, aspect, 1-padhigh.GetLeftMargin()-padhigh.GetRightMargin()):
+            hTot.GetXaxis().SetBinLabel(i+1, r)
         hTot.GetXaxis().SetLabelSize(0.0)
     hTot.GetXaxis().SetTitle(xtitle)
     hTot.GetYaxis().SetTitle(ytitle)
@@ -471,101 +802,106 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
             hTot.SetMaximum(ymax)
         else:
             hTot.SetMaximum(ymax*20)
-        hTot.SetMinimum(0.02)
+        hTot.SetMinimum(ymin_arg if ymin_arg else 0.02)
 
+    timer.start('labels')
     x0, y0, dy, txt_size = 0, 0, 0, 0
     if plot_ratio:
         x0, y0, dy, txt_size = 0.15, 0.84, 0.07, 0.052
     else:
         x0, y0, dy, txt_size = 0.19, 0.87, 0.06, 0.043
+    # Labels are named to be found by update_canvas
     if atlas_label == 'ATLAS':
-        ATLASLabel(x0, y0, '', plot_ratio, can_ratio)
+        labels = ATLASLabel(x0, y0, '', plot_ratio, can_ratio)
     else:
-        ATLASLabel(x0, y0, atlas_label, plot_ratio, can_ratio)
-    stampText('#sqrt{s} = 13 TeV, '+'{:.1f} '.format(lumi)+'fb^{-1}', x0, y0-dy, txt_size)
+        labels = ATLASLabel(x0, y0, atlas_label, plot_ratio, can_ratio)
+    labels[0].SetName('atlas_label')
+    labels[1].SetName('atlas_text')
+    stampText(lumi_text(lumi), x0, y0-dy, txt_size).SetName('lumi_label')
     if plot_labels:
         for i, l in enumerate(plot_labels):
-            stampText(l, x0, y0-(i+2)*dy, txt_size)
+            stampText(l, x0, y0-(i+2)*dy, txt_size).SetName('plot_label_{}'.format(i))
+
+    if bin_groups:
+        aspect = chigh*(0.7 if plot_ratio else 1.)/cwidth
+        draw_bin_groups(padhigh, bin_groups, xmin, xmax, aspect)
+        padhigh.cd()
 
     ROOT.gPad.RedrawAxis()
 
+    timer.start('ratio')
     if plot_ratio:
 
-        if (ratio_type == 'SoverB' or ratio_type == 'signif'):
+        if ratio_type in SIGNIF_TITLES:
             if not dictSig:
-                raise NameError('ratio_type \'SoverB\' is not supported when no signal is specified')
-            hmc_err = hTot.Clone("hmc_err")
-            ROOT.SetOwnership(hmc_err, False)
-            hsig, color, norm, legName = list(dictSig.values())[0]
-            hmc_err.SetFillStyle(0)
-            hmc_err.SetLineColor(color)
-            hmc_err.SetLineWidth(3)
-            for ii in range(1, hmc_err.GetNbinsX()+1):
-                s, b, berr = hsig.GetBinContent(ii), hmc_err.GetBinContent(ii), hmc_err.GetBinError(ii)
-                berr2 = berr**2
-                if ratio_type == 'SoverB':
-                    hmc_err.GetYaxis().SetTitle('S/#sqrt{B}')
-                    if b+berr**2 > 0:
-                        SoverB = s/np.sqrt(b+berr**2)
-                    else:
-                        SoverB = 0
-                    if np.isnan(SoverB) or np.isinf(SoverB):
-                        hmc_err.SetBinContent(ii, 0.0)
-                    else:
-                        hmc_err.SetBinContent(ii, SoverB)
-                elif ratio_type == 'signif':
-                    hmc_err.GetYaxis().SetTitle('Z_{A}')
-                    try:
-                        term1 = (s+b)*np.log((s+b)*(b+berr2)/(b**2+(s+b)*berr2))
-                    except ZeroDivisionError:
-                        term1 = 0
-                    try:
-                        term2 = b**2/berr2*np.log(1+berr2*s/b/(b+berr2))
-                    except ZeroDivisionError:
-                        term2 = 0
-                    sig2  = 2*(term1-term2)
-                    if np.isnan(sig2) or np.isinf(sig2) or sig2<0:
-                        hmc_err.SetBinContent(ii, 0.0)
-                    else:
-                        hmc_err.SetBinContent(ii, np.sqrt(sig2))
-                else:
-                    err = 'ratio_type is only \'SoverB\', \'ratio\' or \'signif\', but not \'{}\''.format(ratio_type)
-                    raise NameError(err)
-
-                hmc_err.SetMinimum(0.0)
-                hmc_err.SetMaximum(1.5)
-                cline = ROOT.TF1('cline', '3', -100, 5000)
-                ROOT.SetOwnership(cline, False)
-                cline.SetLineWidth(1)
+                raise NameError('ratio_type \'{}\' is not supported when no signal is specified'.format(ratio_type))
+            if ratio_signals == 'all':
+                ratio_signals = list(dictSig.keys())
+            elif not ratio_signals:
+                ratio_signals = list(dictSig.keys())[:1]
+            sig_names, zvals = significance_array(dictSig, hTot, ratio_type, ratio_signals)
+            if signif_file:
+                save_significance(signif_file, sig_names, th1_edges(hTot), zvals, ratio_type)
+            hsig_curves = []
+            for n, z in zip(sig_names, zvals):
+                hz = keep(hTot.Clone('hmc_err_'+n))
+                timer.count('clones')
+                contents, sumw2 = th1_views(hz)
+                contents[:], sumw2[:] = z, 0.0
+                hz.SetFillStyle(0)
+                hz.SetLineColor(dictSig[n][1])
+                hz.SetLineWidth(3)
+                hsig_curves.append(hz)
+            hmc_err = hsig_curves[0]
+            hmc_err.GetYaxis().SetTitle(SIGNIF_TITLES[ratio_type])
+            hmc_err.SetMinimum(0.0)
+            hmc_err.SetMaximum(1.5)
+            cline = get_line(3)
+            cline.SetLineWidth(1)
 
         elif ratio_type == 'ratio':
-            hdataovermc = hData.Clone()
-            ROOT.SetOwnership(hdataovermc, False)
+            hdataovermc = keep(hData.Clone())
+            timer.count('clones', 2)
             hdataovermc.Divide(hTot)
             hdataovermc = remove_0entry_data(hdataovermc, 0.01)
-            hmc_err = hTot.Clone("hmc_err")
-            ROOT.SetOwnership(hmc_err, False)
-            for ii in range(1, hmc_err.GetNbinsX()+1):
-                if hmc_err.GetBinContent(ii) < 0.001:
-                    hmc_err.SetBinError(ii, 0.)
-                    hdataovermc.SetBinError(ii, 0)
-                else:
-                    hmc_err.SetBinContent(ii, 1.0)
-                    hmc_err.SetBinError(ii, hmc_err.GetBinError(ii)/hTot.GetBinContent(ii))
-                    hdataovermc.SetBinError(ii, hData.GetBinError(ii)/hTot.GetBinContent(ii))
+            hmc_err = keep(hTot.Clone("hmc_err"))
+            tot, data = Histo.from_th1(hTot), Histo.from_th1(hData)
+            err_c, err_w2 = th1_views(hmc_err)
+            rat_c, rat_w2 = th1_views(hdataovermc)
+            sl = slice(1, hmc_err.GetNbinsX()+1)
+            empty = tot.contents[sl] < 0.001
+            with np.errstate(divide='ignore', invalid='ignore'):
+                err_c[sl] = np.where(empty, err_c[sl], 1.0)
+                err_w2[sl] = np.where(empty, 0., tot.sumw2[sl]/tot.contents[sl]**2)
+                rat_w2[sl] = np.where(empty, 0., data.sumw2[sl]/tot.contents[sl]**2)
+            if tot_graph:
+                y, eyl, eyh = graph_arrays(tot_graph)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    rel = np.where(empty, 0., 1./tot.contents[sl])
+                gratio = keep(asym_graph(th1_edges(hTot), np.ones_like(y), eyl*rel, eyh*rel, 'gratio'))
+                gratio.SetFillColorAlpha(1, error_alpha)
+                gratio.SetFillStyle(error_fill)
+                gratio.SetLineWidth(0)
+                gratio.SetMarkerSize(0)
+                err_w2[sl] = 0.
             hmc_err.SetFillStyle(error_fill)
             hTot.SetFillColorAlpha(1, error_alpha)
             hdataovermc.SetMarkerStyle(20)
             hdataovermc.SetLineWidth(2)
+            if ratio_errors != 'sqrt':
+                ratio, rlo, rhi = rerr
+                gdataovermc = keep(asym_graph(th1_edges(hTot), ratio, rlo, rhi, 'gdataovermc', mask=~empty))
+                gdataovermc.SetMarkerStyle(20)
+                gdataovermc.SetMarkerSize(hdataovermc.GetMarkerSize())
+                gdataovermc.SetLineWidth(2)
             hmc_err.SetMinimum(0.0)
             hmc_err.SetMaximum(2.0)
             hmc_err.GetYaxis().SetTitle("Data / Pred.")
-            cline = ROOT.TF1('cline', '1', -100, 5000)
-            ROOT.SetOwnership(cline, False)
+            cline = get_line(1)
             cline.SetLineWidth(1)
 
         else:
-            err = 'ratio_type is only \'SoverB\', \'ratio\' or \'signif\', but not \'{}\''.format(ratio_type)
+            err = 'ratio_type is only \'ratio\', {}, but not \'{}\''.format(', '.join(sorted(SIGNIF_TITLES)), ratio_type)
             raise NameError(err)
 
         padlow.cd()
@@ -586,25 +922,45 @@ def make_nice_canvas(dictBkg, hTot, hData, plot_name, **kwargs):
         hmc_err.GetYaxis().SetNdivisions(504)
         if ratio_type == 'ratio':
             hmc_err.Draw('E2')
-            hdataovermc.Draw('E0 same')
-        elif ratio_type == 'SoverB' or ratio_type == 'signif':
-            hmc_err.Draw('hist')
+            if tot_graph:
+                gratio.Draw('2 same')
+            if gdataovermc:
+                gdataovermc.Draw('P same')
+            else:
+                hdataovermc.Draw('E0 same')
         else:
-            err = 'ratio_type is only \'SoverB\' or \'ratio\', but not \'{}\''.format(ratio_type)
-            raise NameError(err)
+            hmc_err.Draw('hist')
+            for hz in hsig_curves[1:]:
+                hz.Draw('hist same')
+        cline.SetRange(xmin, xmax)
         cline.Draw('same')
+        if bin_groups:
+            draw_bin_groups(padlow, bin_groups, xmin, xmax, 1., labels=False)
 
 
-    if plotdir:
-        import os
-        full_path_plot = plotdir+'/'+plot_name
-        if not os.path.isdir(plotdir):
-            os.makedirs(plotdir)
-    else:
-        full_path_plot = plot_name
+    timer.start('save')
+    if preview:
+        canv.Update()
+        _report_profile(timer, profile)
+        return Preview(canv, preview)
+    timer.count('files', len(paths))
+    if paths and plotdir and not os.path.isdir(plotdir):
+        os.makedirs(plotdir)
 
     canv.Update()
-    canv.SaveAs(full_path_plot+'_{}.pdf' .format(atlas_label))
-    canv.SaveAs(full_path_plot+'_{}.png' .format(atlas_label))
-    canv.SaveAs(full_path_plot+'_{}.root'.format(atlas_label))
+    on_saved = None
+    if digest:
+        on_saved = functools.partial(store_fingerprint, digest, plotdir, plot_name, paths, kwargs)
+    if async_outputs and not writer:
+        writer = default_writer()
+    if writer:
+        writer.submit(canv, paths, on_saved, png_sizes, png_compression)
+    else:
+        save_canvas(canv, paths, png_sizes, png_compression)
+        if on_saved:
+            on_saved()
+    if booklet:
+        timer.count('pages')
+        booklet.add(canv, plot_name)
+    _report_profile(timer, profile)
     return canv
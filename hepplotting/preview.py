@@ -0,0 +1,128 @@
+'''
+In-memory previews of make_nice_canvas, for interactive work in notebooks.
+
+make_nice_canvas(..., preview=True) draws the plot at reduced size on a canvas
+reused from one preview to the next, and returns a Preview holding the PNG (or
+SVG) image, displayed inline by Jupyter. Nothing is written to disk.
+'''
+import os
+import tempfile
+import numpy as np
+
+from .root_setup import ROOT
+
+
+PREVIEW_FORMATS = ('png', 'svg')
+
+_session = None
+_png_helper = False
+
+
+def preview_session():
+    '''PlotSession shared by all ROOT previews, so that the canvas and pads are only made once'''
+    global _session
+    if _session is None:
+        from .session import PlotSession
+        _session = PlotSession('hepplotting_preview')
+    return _session
+
+
+def _declare_png_helper():
+    '''
+    TImage::GetImageBuffer returns a malloc-ed char** buffer, which Python cannot receive
+    directly: the image is kept in a C++ vector and copied into a numpy array.
+    '''
+    global _png_helper
+    if not _png_helper:
+        ROOT.gInterpreter.Declare('''
+        #include "TImage.h"
+        #include "TVirtualPad.h"
+        #include <vector>
+        #include <algorithm>
+        #include <cstdlib>
+        namespace hepplotting_preview {
+            std::vector<char> buffer;
+            int render_png(TVirtualPad* pad) {
+                TImage* img = TImage::Create();
+                img->FromPad(pad);
+                char* buf = 0;
+                int size = 0;
+                img->GetImageBuffer(&buf, &size, TImage::kPng);
+                buffer.assign(buf, buf+size);
+                free(buf);
+                delete img;
+                return size;
+            }
+            void copy_png(unsigned char* out) { std::copy(buffer.begin(), buffer.end(), out); }
+        }''')
+        _png_helper = True
+    return ROOT.hepplotting_preview
+
+
+def canvas_png(canv):
+    '''PNG image [bytes] of a ROOT canvas, made in memory'''
+    helper = _declare_png_helper()
+    canv.Update()
+    size = helper.render_png(canv)
+    out = np.empty(size, dtype=np.uint8)
+    if size:
+        helper.copy_png(out)
+    return out.tobytes()
+
+
+def canvas_svg(canv):
+    '''
+    SVG image [string] of a ROOT canvas. ROOT only writes SVG into files: it goes
+    through a temporary file, removed at once.
+    '''
+    fd, path = tempfile.mkstemp(suffix='.svg')
+    os.close(fd)
+    try:
+        canv.SaveAs(path)
+        with open(path) as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+def figure_image(fig, fmt='png'):
+    '''PNG [bytes] or SVG [string] image of a matplotlib figure, made in memory'''
+    import io
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt)
+    return buf.getvalue().decode('utf-8') if fmt == 'svg' else buf.getvalue()
+
+
+class Preview(object):
+    '''
+    Image of a plot returned by make_nice_canvas(..., preview=True)
+    ===============================================================
+
+    Displayed inline by Jupyter (PNG or SVG). The drawn canvas (or matplotlib figure) is
+    kept as .canvas; for ROOT it is reused, and changed, by the next preview.
+
+    - Args:
+    . canvas [TCanvas or matplotlib Figure] the drawn plot
+    . fmt [string] \'png\' or \'svg\'
+    '''
+
+    def __init__(self, canvas, fmt='png'):
+        if fmt not in PREVIEW_FORMATS:
+            raise NameError('preview is only {}, but not \'{}\''.format(', '.join(PREVIEW_FORMATS), fmt))
+        self.canvas = canvas
+        self.format = fmt
+        if hasattr(canvas, 'savefig'):
+            self.data = figure_image(canvas, fmt)
+        else:
+            self.data = canvas_png(canvas) if fmt == 'png' else canvas_svg(canvas)
+
+    def _repr_png_(self):
+        return self.data if self.format == 'png' else None
+
+    def _repr_svg_(self):
+        return self.data if self.format == 'svg' else None
+
+    def save(self, path):
+        '''Write the image to path'''
+        with open(path, 'wb' if self.format == 'png' else 'w') as f:
+            f.write(self.data)
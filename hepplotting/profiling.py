@@ -0,0 +1,106 @@
+import time
+from collections import OrderedDict
+
+
+# Stages of make_nice_canvas, in order of execution
+STAGES = ('cache', 'unroll', 'rebin', 'layout', 'cosmetics', 'stack', 'ymax', 'canvas', 'legend', 'draw', 'labels', 'ratio', 'save')
+
+_last_profile = None
+
+
+class StageTimer(object):
+    '''
+    Wall time of the successive stages of one make_nice_canvas call, and counters
+    of the objects created (clones, legend entries, integrals, files...)
+    '''
+
+    def __init__(self, plot_name):
+        self.plot_name = plot_name
+        self.stages = OrderedDict()
+        self.counts = OrderedDict()
+        self._stage, self._t0 = None, None
+        self._start = time.perf_counter()
+
+    def start(self, stage):
+        '''Close the current stage and start a new one'''
+        now = time.perf_counter()
+        if self._stage:
+            self.stages[self._stage] = self.stages.get(self._stage, 0.)+now-self._t0
+        self._stage, self._t0 = stage, now
+
+    def count(self, what, n=1):
+        self.counts[what] = self.counts.get(what, 0)+n
+
+    def stop(self):
+        '''Close the current stage and return the profile as a dictionary'''
+        global _last_profile
+        self.start(None)
+        _last_profile = {'plot_name': self.plot_name, 'total': time.perf_counter()-self._start,
+                         'stages': dict(self.stages), 'counts': dict(self.counts)}
+        return _last_profile
+
+
+class NullTimer(object):
+    '''Timer doing nothing, used when profiling is off'''
+
+    def start(self, stage):
+        pass
+
+    def count(self, what, n=1):
+        pass
+
+    def stop(self):
+        return None
+
+
+def last_profile():
+    '''
+    Profile of the last make_nice_canvas(..., profile=True) call of this process, ie.
+    {'plot_name': ..., 'total': ..., 'stages': {stage: seconds}, 'counts': {object: number}}
+    '''
+    return _last_profile
+
+
+def summarize_profiles(profiles):
+    '''
+    Aggregate the profiles of many plots
+    ====================================
+
+    - Args:
+    . profiles [list of dict] as given by last_profile() or PlotResult.profile (None are ignored)
+
+    - Return:
+    . dict with the number of plots, the total time and, for each stage, the total,
+      mean and max times and the fraction of the total, and the summed counters
+    '''
+    profiles = [p for p in profiles if p]
+    total = sum(p['total'] for p in profiles)
+    stages = OrderedDict()
+    extra = sorted(set(s for p in profiles for s in p['stages'] if s not in STAGES))
+    for s in list(STAGES)+extra:
+        times = [p['stages'].get(s, 0.) for p in profiles]
+        if any(times):
+            stages[s] = {'total': sum(times), 'mean': sum(times)/len(times), 'max': max(times),
+                         'fraction': sum(times)/total if total else 0.}
+    counts = OrderedDict()
+    for p in profiles:
+        for k, n in p['counts'].items():
+            counts[k] = counts.get(k, 0)+n
+    slowest = sorted(profiles, key=lambda p: p['total'], reverse=True)[:5]
+    return {'n_plots': len(profiles), 'total': total, 'stages': stages, 'counts': counts,
+            'slowest': [(p['plot_name'], p['total']) for p in slowest]}
+
+
+def profile_report(profiles):
+    '''
+    Text table of summarize_profiles(profiles)
+    '''
+    summary = summarize_profiles(profiles)
+    lines = ['{} plots, {:.2f} s in make_nice_canvas'.format(summary['n_plots'], summary['total']),
+             '{:<10} {:>10} {:>10} {:>10} {:>7}'.format('stage', 'total [s]', 'mean [ms]', 'max [ms]', 'frac')]
+    for s, t in summary['stages'].items():
+        lines.append('{:<10} {:>10.2f} {:>10.2f} {:>10.2f} {:>6.1f}%'.format(
+            s, t['total'], 1e3*t['mean'], 1e3*t['max'], 100*t['fraction']))
+    lines.append('objects: '+', '.join('{}={}'.format(k, n) for k, n in summary['counts'].items()))
+    lines.append('slowest: '+', '.join('{} ({:.0f} ms)'.format(n, 1e3*t) for n, t in summary['slowest']))
+    return '\n'.join(lines)
@@ -0,0 +1,146 @@
+import numpy as np
+
+from .histo import Histo, th1_views
+
+
+def fold_flow(contents):
+    '''
+    Add the underflow (overflow) cells into the first (last) bin and empty them,
+    in place, for arrays (..., nbins+2) of contents or sumw2.
+    '''
+    contents[..., 1] += contents[..., 0]
+    contents[..., -2] += contents[..., -1]
+    contents[..., 0] = 0
+    contents[..., -1] = 0
+    return contents
+
+
+def merge_bins(contents, bounds):
+    '''
+    Sum the cells of contents [array (..., nbins+2), with under/overflow] within the new
+    bins defined by bounds [array of int], the indices of the kept edges among the nbins+1
+    original ones. Return an array (..., len(bounds)+1) with the same flow cells.
+    '''
+    contents = np.asarray(contents)
+    bounds = np.asarray(bounds)
+    inner = np.add.reduceat(contents[..., 1:-1], bounds[:-1], axis=-1)
+    under = contents[..., :1]+contents[..., 1:bounds[0]+1].sum(axis=-1, keepdims=True)
+    over = contents[..., -1:]+contents[..., bounds[-1]+1:-1].sum(axis=-1, keepdims=True)
+    return np.concatenate([under, inner, over], axis=-1)
+
+
+def find_binning(bkg, bkg_sumw2, data=None, max_rel_error=0.3, min_bkg=0., min_data=0,
+                 flow=True, from_right=True):
+    '''
+    Statistics-driven binning
+    =========================
+
+    Adjacent bins are merged, starting from one end of the axis, until each new bin
+    satisfies all the thresholds. Each new bin is found with one numpy pass over the
+    remaining bins (cumulative sums), so the cost grows with the number of new bins.
+    If the last bins cannot satisfy the thresholds, they are merged into their neighbour.
+
+    - Args:
+    . bkg [array nbins+2] total background yields (with under/overflow)
+    . bkg_sumw2 [array nbins+2] total background sum of weights squared
+    . data [array nbins+2] data counts (None: no data threshold)
+    . max_rel_error [float] maximum relative MC statistical error of the total background (None: no threshold)
+    . min_bkg [float] minimum total background yield
+    . min_data [float] minimum data count
+    . flow [bool] count the underflow (overflow) in the first (last) bin
+    . from_right [bool] merge from the highest bins (usually the least populated tail)
+
+    - Return:
+    . array of int: indices of the kept edges among the nbins+1 original ones
+    '''
+    arrays = [np.array(bkg, dtype=float), np.array(bkg_sumw2, dtype=float)]
+    if data is not None:
+        arrays.append(np.array(data, dtype=float))
+    nbins = len(arrays[0])-2
+    arrays = np.array(arrays)
+    if flow:
+        fold_flow(arrays)
+    arrays = arrays[:, 1:-1]
+    if from_right:
+        arrays = arrays[:, ::-1]
+    cumul = np.concatenate([np.zeros((len(arrays), 1)), np.cumsum(arrays, axis=1)], axis=1)
+
+    bounds, i = [0], 0
+    while i < nbins:
+        s, w = cumul[0, i+1:]-cumul[0, i], cumul[1, i+1:]-cumul[1, i]
+        ok = s >= min_bkg
+        if max_rel_error is not None:
+            ok &= (s > 0) & (w <= (max_rel_error*s)**2)
+        if data is not None:
+            ok &= cumul[2, i+1:]-cumul[2, i] >= min_data
+        if not ok.any():
+            if len(bounds) > 1:
+                bounds.pop()
+            break
+        i += int(np.argmax(ok))+1
+        bounds.append(i)
+    bounds.append(nbins)
+    bounds = np.unique(bounds)
+    if from_right:
+        bounds = nbins-bounds[::-1]
+    return bounds
+
+
+def rebin(h, bounds, flow=True, name=None):
+    '''
+    Rebin h [TH1 or Histo] keeping the edges of index bounds (see find_binning),
+    and possibly fold its under/overflow. Return a new object of the same type.
+    '''
+    if isinstance(h, Histo):
+        new = Histo(h.edges[bounds], merge_bins(h.contents, bounds),
+                    merge_bins(h.sumw2, bounds), name or h.name)
+        arrays = (new.contents, new.sumw2)
+    else:
+        if h.GetSumw2N() == 0:
+            h.Sumw2()
+        edges = np.array([h.GetXaxis().GetBinLowEdge(int(b)+1) for b in bounds], dtype=float)
+        new = h.Rebin(len(bounds)-1, name or h.GetName()+'_rebin', edges)
+        arrays = th1_views(new)
+    if flow:
+        for a in arrays:
+            fold_flow(a)
+    return new
+
+
+def rebin_inputs(dictBkg, hTot, hData=None, dictSig=None, variations=None, bounds=None,
+                 flow=True, **thresholds):
+    '''
+    Rebin all the inputs of a plot consistently
+    ===========================================
+
+    The binning is found from hTot and hData (see find_binning) and applied to the
+    backgrounds, total, data, signals and systematic variations.
+
+    - Args:
+    . dictBkg, hTot, hData, dictSig: as given to make_nice_canvas (TH1 or Histo)
+    . variations [dict {systName: {bkgName: (up, down)}}] as given to build_total
+    . bounds [array of int] a given binning (skip the search)
+    . flow [bool] fold the under/overflow in the first/last bins
+    . thresholds: max_rel_error, min_bkg, min_data, from_right (see find_binning)
+
+    - Return:
+    . (dictBkg, hTot, hData, dictSig, variations, bounds) with new histograms (the
+      colors and legend names are kept); hData, dictSig and variations are None if not given
+    '''
+    if bounds is None:
+        tot = hTot if isinstance(hTot, Histo) else Histo.from_th1(hTot)
+        data = None
+        if hData is not None:
+            data = (hData if isinstance(hData, Histo) else Histo.from_th1(hData)).contents
+        bounds = find_binning(tot.contents, tot.sumw2, data, flow=flow, **thresholds)
+
+    def rb(h):
+        return None if h is None else rebin(h, bounds, flow)
+
+    dictBkg = {n: [rb(v[0])]+list(v[1:]) for n, v in dictBkg.items()}
+    if dictSig:
+        dictSig = {n: [rb(v[0])]+list(v[1:]) for n, v in dictSig.items()}
+    if variations:
+        variations = {s: {p: tuple(rb(h) for h in v) for p, v in syst.items()}
+                      for s, syst in variations.items()}
+    return dictBkg, rb(hTot), rb(hData), dictSig, variations, bounds
@@ -0,0 +1,102 @@
+'''
+Deferred ROOT import and ATLAS style definition.
+
+ROOT is only imported (and the style applied) the first time one of its
+attributes is used, so that importing hepplotting stays cheap for tools that
+only need the numpy histogram helpers.
+'''
+
+_ROOT = None
+
+
+def atlas_style(ROOT):
+    '''
+    Return the ATLAS TStyle, ie. the Python translation of AtlasStyle.C
+    (no macro needs to be interpreted by Cling).
+    '''
+    style = ROOT.TStyle('ATLAS', 'Atlas style')
+
+    # use plain black on white colors
+    icol = 0
+    style.SetFrameBorderMode(icol)
+    style.SetFrameFillColor(icol)
+    style.SetCanvasBorderMode(icol)
+    style.SetCanvasColor(icol)
+    style.SetPadBorderMode(icol)
+    style.SetPadColor(icol)
+    style.SetStatColor(icol)
+
+    # set the paper & margin sizes
+    style.SetPaperSize(20, 26)
+    style.SetPadTopMargin(0.05)
+    style.SetPadRightMargin(0.05)
+    style.SetPadBottomMargin(0.16)
+    style.SetPadLeftMargin(0.16)
+
+    # set title offsets (for axis label)
+    style.SetTitleXOffset(1.4)
+    style.SetTitleYOffset(1.4)
+
+    # use large fonts (42 is Helvetica)
+    font, tsize = 42, 0.05
+    style.SetTextFont(font)
+    style.SetTextSize(tsize)
+    for axis in ('x', 'y', 'z'):
+        style.SetLabelFont(font, axis)
+        style.SetTitleFont(font, axis)
+        style.SetLabelSize(tsize, axis)
+        style.SetTitleSize(tsize, axis)
+
+    # use bold lines and markers
+    style.SetMarkerStyle(20)
+    style.SetMarkerSize(1.2)
+    style.SetHistLineWidth(2)
+    style.SetLineStyleString(2, '[12 12]')
+
+    # get the X error bars to have area for error, without caps
+    style.SetErrorX(0.5)
+    style.SetEndErrorSize(0.)
+
+    # do not display any of the standard histogram decorations
+    style.SetOptTitle(0)
+    style.SetOptStat(0)
+    style.SetOptFit(0)
+
+    # put tick marks on top and RHS of plots
+    style.SetPadTickX(1)
+    style.SetPadTickY(1)
+    return style
+
+
+def load_root():
+    '''
+    Import ROOT and apply the ATLAS style, only once per process.
+    '''
+    global _ROOT
+    if _ROOT is None:
+        import ROOT
+        style = atlas_style(ROOT)
+        ROOT.SetOwnership(style, False)
+        ROOT.gROOT.SetStyle('ATLAS')
+        ROOT.gROOT.ForceStyle()
+        ROOT.gStyle.SetOptStat(0)
+        ROOT.gStyle.SetOptTitle(0)
+        _ROOT = ROOT
+    return _ROOT
+
+
+def root_loaded():
+    '''True if ROOT was already imported by hepplotting'''
+    return _ROOT is not None
+
+
+class _LazyROOT(object):
+    '''
+    Stand-in for the ROOT module: ROOT.X triggers load_root() on first use.
+    '''
+
+    def __getattr__(self, name):
+        return getattr(load_root(), name)
+
+
+ROOT = _LazyROOT()
@@ -0,0 +1,152 @@
+from .root_setup import ROOT
+
+
+# make_nice_canvas arguments which can be changed on a drawn plot (see update_canvas)
+COSMETIC_KWARGS = ('atlas_label', 'lumi', 'plot_labels', 'leg_pos', 'ymin', 'ymax', 'r_ymin', 'r_ymax',
+                   'xtitle', 'ytitle')
+
+# Values restored when a cosmetic argument is dropped (the others depend on the histograms)
+COSMETIC_DEFAULTS = {'atlas_label': 'Internal', 'lumi': 1.0, 'plot_labels': []}
+
+
+def lumi_text(lumi):
+    return '#sqrt{s} = 13 TeV, '+'{:.1f} '.format(lumi)+'fb^{-1}'
+
+
+def _pads(canv):
+    '''(padhigh, padlow) of a canvas made by make_nice_canvas, padlow being None without ratio panel'''
+    padhigh = canv.GetPrimitive('padhigh')
+    if not padhigh:
+        return canv, None
+    return padhigh, canv.GetPrimitive('padlow')
+
+
+def _first(pad, cls):
+    for obj in pad.GetListOfPrimitives():
+        if obj.InheritsFrom(cls):
+            return obj
+    return None
+
+
+def _stretch_lines(pad):
+    '''Make the separators of bin groups (the only TLine drawn by make_nice_canvas) span the y-range of pad'''
+    ylo, yhi = pad.PadtoY(pad.GetUymin()), pad.PadtoY(pad.GetUymax())
+    for obj in pad.GetListOfPrimitives():
+        if obj.InheritsFrom('TLine'):
+            obj.SetY1(ylo)
+            obj.SetY2(yhi)
+    pad.Modified()
+
+
+def update_canvas(canv, **kwargs):
+    '''
+    Cosmetic update of a plot
+    =========================
+
+    Modify in place the labels, legend position, axis ranges and titles of canv [TCanvas]
+    made by make_nice_canvas (or read from its ROOT output file), without touching the
+    histograms nor the ratio panel. The files are not written (see refresh_plot).
+
+    - Args:
+    . kwargs: the new values of make_nice_canvas arguments among COSMETIC_KWARGS
+      (None for ymin, ymax, r_ymin or r_ymax keeps the current range)
+
+    - Return:
+    . canv
+    '''
+    unknown = sorted(set(kwargs)-set(COSMETIC_KWARGS))
+    if unknown:
+        raise NameError('{} cannot be updated on a drawn plot (only {})'.format(', '.join(unknown), ', '.join(COSMETIC_KWARGS)))
+    padhigh, padlow = _pads(canv)
+    prims = padhigh.GetListOfPrimitives()
+    frame = _first(padhigh, 'TH1')
+    atlas, lumi = prims.FindObject('atlas_text'), prims.FindObject('lumi_label')
+    if not (atlas and lumi) and set(kwargs) & {'atlas_label', 'lumi', 'plot_labels'}:
+        raise NameError('canvas \'{}\' has no label to update'.format(canv.GetName()))
+
+    if 'atlas_label' in kwargs:
+        atlas.SetTitle('' if kwargs['atlas_label'] == 'ATLAS' else kwargs['atlas_label'])
+    if 'lumi' in kwargs:
+        lumi.SetTitle(lumi_text(kwargs['lumi']))
+    if 'plot_labels' in kwargs:
+        from .plot_maker import stampText
+        for obj in [o for o in prims if o.GetName().startswith('plot_label_')]:
+            prims.Remove(obj)
+        padhigh.cd()
+        dy = prims.FindObject('atlas_label').GetY()-lumi.GetY()
+        for i, l in enumerate(kwargs['plot_labels'] or []):
+            txt = stampText(l, lumi.GetX(), lumi.GetY()-(i+1)*dy, lumi.GetTextSize())
+            txt.SetName('plot_label_{}'.format(i))
+    if 'leg_pos' in kwargs and kwargs['leg_pos']:
+        leg = _first(padhigh, 'TLegend')
+        x1, y1, x2, y2 = kwargs['leg_pos']
+        leg.SetX1NDC(x1)
+        leg.SetY1NDC(y1)
+        leg.SetX2NDC(x2)
+        leg.SetY2NDC(y2)
+    if kwargs.get('ymin') is not None:
+        frame.SetMinimum(kwargs['ymin'])
+    if kwargs.get('ymax') is not None:
+        frame.SetMaximum(kwargs['ymax'])
+    if kwargs.get('ytitle') is not None:
+        frame.GetYaxis().SetTitle(kwargs['ytitle'])
+    rframe = _first(padlow, 'TH1') if padlow else None
+    if kwargs.get('xtitle') is not None:
+        for h in (frame, rframe):
+            if h:
+                h.GetXaxis().SetTitle(kwargs['xtitle'])
+    if rframe and kwargs.get('r_ymin') is not None:
+        rframe.SetMinimum(kwargs['r_ymin'])
+    if rframe and kwargs.get('r_ymax') is not None:
+        rframe.SetMaximum(kwargs['r_ymax'])
+
+    for pad in (padhigh, padlow):
+        if pad:
+            pad.Modified()
+    canv.Update()
+    if set(kwargs) & {'ymin', 'ymax', 'r_ymin', 'r_ymax'}:
+        for pad in (padhigh, padlow):
+            if pad:
+                _stretch_lines(pad)
+        canv.Update()
+    return canv
+
+
+def cosmetic_changes(previous, kwargs):
+    '''
+    Cosmetic arguments to apply on a plot drawn with the cosmetic arguments previous [dict]
+    to get the ones of kwargs, or None if the change cannot be made in place
+    '''
+    changes = {}
+    for k in COSMETIC_KWARGS:
+        old, new = previous.get(k), kwargs.get(k)
+        if old == new or (isinstance(new, tuple) and old == list(new)):    # previous is read from JSON
+            continue
+        if (new is None and k not in COSMETIC_DEFAULTS) or new == 'auto':
+            return None
+        changes[k] = COSMETIC_DEFAULTS[k] if new is None else new
+    return changes
+
+
+def refresh_plot(root_path, changes, paths, png_sizes=None, png_compression=None):
+    '''
+    Read the canvas of a plot from its ROOT output file root_path, apply the cosmetic
+    changes [dict] (see update_canvas) and save it in paths [list of string] (with png_sizes
+    and png_compression, see save_canvas). Return the canvas.
+    '''
+    from .writers import save_canvas
+    tfile = ROOT.TFile.Open(root_path)
+    if not tfile or tfile.IsZombie():
+        raise IOError('Cannot open ROOT file \'{}\''.format(root_path))
+    canv = None
+    for key in tfile.GetListOfKeys():
+        if key.GetClassName() == 'TCanvas':
+            canv = key.ReadObj()
+            break
+    tfile.Close()
+    if canv is None:
+        raise IOError('No canvas in \'{}\''.format(root_path))
+    canv.Draw()
+    update_canvas(canv, **changes)
+    save_canvas(canv, paths, png_sizes, png_compression)
+    return canv
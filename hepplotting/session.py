@@ -0,0 +1,102 @@
+from .root_setup import ROOT
+
+
+class PlotSession(object):
+    '''
+    Bounded-memory plotting session
+    ===============================
+
+    Keeps one canvas, one legend and the horizontal lines of the bottom panel, which are
+    reused by every make_nice_canvas(..., session=session) call. The pads and the other
+    objects created for a plot (stack, clones for the bottom panel...) are owned by the
+    canvas or the session and deleted when the next plot starts, and the input histograms
+    are left to Python (they are freed once the caller drops them), so that the memory
+    stays flat over long campaigns.
+
+    Usage:
+       with PlotSession() as session:
+           for ...:
+               make_nice_canvas(dictBkg, hTot, hData, plot_name=name, session=session)
+    '''
+
+    def __init__(self, name='hepplotting_session'):
+        self.name = name
+        self.canvas, self.padhigh, self.padlow, self.legend = None, None, None, None
+        self.n_plots = 0
+        self._lines = {}
+        self._owned = []
+        self._decorations = (0, 0)
+
+    def own(self, obj):
+        '''Keep obj alive until the next plot of the session, when it is deleted'''
+        # Objects returned by ROOT (eg. Clone) are not owned by Python unless told so
+        ROOT.SetOwnership(obj, True)
+        self._owned.append(obj)
+        return obj
+
+    def release(self):
+        '''Delete the objects of the previous plot'''
+        if self.legend:
+            self.legend.Clear()
+        if self.canvas:
+            # Also deletes the pads of the previous plot, which belong to the canvas
+            self.canvas.Clear()
+            self.canvas.SetLogy(0)
+        self.padhigh, self.padlow = None, None
+        while self._owned:
+            self._owned.pop()
+
+    def new_plot(self, plot_name, cwidth, chigh, plot_ratio):
+        '''
+        Release the previous plot and return (canvas, padhigh, padlow) for a new one,
+        where padhigh is the canvas and padlow is None without ratio panel.
+        '''
+        from .plot_maker import make_ratio_pads
+        self.release()
+        if self.canvas is None:
+            self.canvas = ROOT.TCanvas(self.name, self.name, cwidth, chigh)
+            # TCanvas sizes are window sizes: keep the decorations so that every plot has the size of a new canvas
+            self._decorations = (cwidth-self.canvas.GetWw(), chigh-self.canvas.GetWh())
+        else:
+            self.canvas.SetCanvasSize(cwidth-self._decorations[0], chigh-self._decorations[1])
+        # The canvas name is the key of the plot in the ROOT output file
+        self.canvas.SetName(plot_name)
+        self.canvas.SetTitle('')
+        self.n_plots += 1
+        if not plot_ratio:
+            return self.canvas, self.canvas, None
+        self.padhigh, self.padlow = make_ratio_pads(self.canvas)
+        for pad in (self.padhigh, self.padlow):
+            ROOT.SetOwnership(pad, False)
+        return self.canvas, self.padhigh, self.padlow
+
+    def get_legend(self, x1, y1, x2, y2):
+        '''Return the (emptied) session legend placed at x1, y1, x2, y2 (NDC)'''
+        if self.legend is None:
+            self.legend = ROOT.TLegend(x1, y1, x2, y2)
+        else:
+            self.legend.Clear()
+            self.legend.SetX1NDC(x1)
+            self.legend.SetY1NDC(y1)
+            self.legend.SetX2NDC(x2)
+            self.legend.SetY2NDC(y2)
+        return self.legend
+
+    def get_line(self, value):
+        '''Horizontal line at y=value for the bottom panel'''
+        if value not in self._lines:
+            self._lines[value] = ROOT.TF1('cline_{}'.format(value), str(value), -100, 5000)
+        return self._lines[value]
+
+    def close(self):
+        self.release()
+        if self.canvas:
+            self.canvas.Close()
+        self.canvas, self.padhigh, self.padlow, self.legend = None, None, None, None
+        self._lines.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,117 @@
+import numpy as np
+
+from .histo import Histo
+
+
+# Quantities available for the bottom panel, with their y-axis title
+SIGNIF_TITLES = {
+    'SoverB': 'S/#sqrt{B}',
+    'signif': 'Z_{A}',
+    'signif_stat': 'Z_{A} (no unc.)',
+    'signif_cumul': 'Z_{A} (x > cut)',
+}
+
+
+def _clean(z):
+    '''Replace nan, inf and negative values by 0'''
+    z = np.where(np.isfinite(z), z, 0.0)
+    return np.where(z > 0, z, 0.0)
+
+
+def s_over_sqrt_b(s, b, berr2=0.0):
+    '''
+    S/sqrt(B+dB^2) computed element-wise on arrays (broadcasting rules apply,
+    eg. s of shape (nsig, nbins) and b of shape (nbins,))
+    '''
+    s, b, berr2 = np.asarray(s, float), np.asarray(b, float), np.asarray(berr2, float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _clean(s/np.sqrt(b+berr2))
+
+
+def asimov_z(s, b, berr2=None):
+    '''
+    Asimov significance Z_A computed element-wise on arrays, with (berr2 being
+    the squared absolute uncertainty on b) or without (berr2=None) background uncertainty.
+    Bins with b<=0 or undefined results get 0.
+    '''
+    s, b = np.asarray(s, float), np.asarray(b, float)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        z2_stat = 2*((s+b)*np.log1p(s/b)-s)
+        if berr2 is None:
+            return _clean(np.sqrt(_clean(z2_stat)))
+        berr2 = np.broadcast_to(np.asarray(berr2, float), np.broadcast(s, b).shape)
+        term1 = (s+b)*np.log((s+b)*(b+berr2)/(b**2+(s+b)*berr2))
+        term2 = b**2/berr2*np.log1p(berr2*s/b/(b+berr2))
+        z2 = np.where(berr2 > 0, 2*(term1-term2), z2_stat)
+        return _clean(np.sqrt(_clean(z2)))
+
+
+def cumulative_significance(s, b, berr2=None):
+    '''
+    Asimov significance of the cut x > low edge of each bin, ie. s, b and berr2
+    are summed from each bin up to the last one (uncertainties added in quadrature).
+    '''
+    s_cum = np.cumsum(np.asarray(s, float)[..., ::-1], axis=-1)[..., ::-1]
+    b_cum = np.cumsum(np.asarray(b, float)[..., ::-1], axis=-1)[..., ::-1]
+    if berr2 is not None:
+        berr2 = np.cumsum(np.asarray(berr2, float)[..., ::-1], axis=-1)[..., ::-1]
+    return asimov_z(s_cum, b_cum, berr2)
+
+
+def optimal_cut(s, b, berr2=None):
+    '''
+    Return (ibin, Z) with, for every signal, the bin index whose low edge gives
+    the largest cumulative significance, and the corresponding significance.
+    '''
+    z = cumulative_significance(s, b, berr2)
+    ibin = np.argmax(z, axis=-1)
+    return ibin, np.take_along_axis(z, np.expand_dims(ibin, -1), axis=-1)[..., 0]
+
+
+def significance(s, b, berr2, kind='signif'):
+    '''
+    Compute the quantity kind (see SIGNIF_TITLES) for signal yields s (nsig x nbins),
+    background yields b (nbins) and squared background uncertainties berr2 (nbins).
+    '''
+    if kind == 'SoverB':
+        return s_over_sqrt_b(s, b, berr2)
+    elif kind == 'signif':
+        return asimov_z(s, b, berr2)
+    elif kind == 'signif_stat':
+        return asimov_z(s, b)
+    elif kind == 'signif_cumul':
+        return cumulative_significance(s, b, berr2)
+    else:
+        err = 'significance kind is only {}, but not \'{}\''.format(', '.join(sorted(SIGNIF_TITLES)), kind)
+        raise NameError(err)
+
+
+def significance_array(dictSig, hTot, kind='signif', signals=None):
+    '''
+    Significance of many signals at once
+    ====================================
+
+    - Args:
+    . dictSig [dict {sigName: [TH1 or Histo, ...]}] signals, as given to make_nice_canvas
+    . hTot [TH1 or Histo] total background with its uncertainty
+    . kind [string] 'SoverB', 'signif', 'signif_stat' or 'signif_cumul'
+    . signals [list of string] signal names to consider (default: all)
+
+    - Return:
+    . (names, z) where z is a (signal x bin) array, including underflow and overflow bins
+    '''
+    def as_histo(h):
+        return h if isinstance(h, Histo) else Histo.from_th1(h)
+    if signals is None:
+        signals = list(dictSig.keys())
+    tot = as_histo(hTot)
+    s = np.array([as_histo(dictSig[n][0]).contents for n in signals], dtype=float)
+    return list(signals), significance(s, tot.contents, tot.sumw2, kind)
+
+
+def save_significance(path, names, edges, z, kind):
+    '''
+    Dump a (signal x bin) significance array into a numpy .npz file with
+    keys names, edges, values (without under/overflow) and kind.
+    '''
+    np.savez(path, names=np.array(names), edges=edges, values=np.asarray(z)[..., 1:-1], kind=kind)
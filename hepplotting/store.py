@@ -0,0 +1,212 @@
+import os
+import json
+import numpy as np
+from collections import OrderedDict
+
+from .histo import Histo
+from .inputs import _pattern_regex
+
+
+STORE_VERSION = 1
+
+# Process name of the stored total background histograms
+TOTAL = '__total__'
+
+
+def _paths(path):
+    '''(array file, index file) of a store, path being given without extension'''
+    return path+'.hist', path+'.json'
+
+
+def _source_histos(source, pattern):
+    '''
+    (pattern, iterator of (name, Histo)) from ROOT files, a HistoProvider, a FilledHistos
+    or a dictionary {name: Histo or TH1}
+    '''
+    from .inputs import HistoProvider
+    from .filling import FilledHistos
+    if isinstance(source, FilledHistos):
+        keys = ('region', 'variable', 'process')
+        return pattern, ((pattern.format(**dict(zip(keys, k))), h) for k, h in source.histos.items())
+    if isinstance(source, dict):
+        return pattern, ((k, h if isinstance(h, Histo) else Histo.from_th1(h)) for k, h in source.items())
+    provider = source if isinstance(source, HistoProvider) else HistoProvider(source, pattern)
+
+    def read():
+        for name in provider.index:
+            yield name, Histo.from_th1(provider._load(name))
+        provider.clear()
+    return provider.pattern, read()
+
+
+def build_store(source, path, pattern='{region}/{variable}/{process}', totals=None, syst=0.):
+    '''
+    Histogram store
+    ===============
+
+    Write every histogram of ROOT files in one contiguous array file (path.hist: edges,
+    contents and sumw2 of each histogram, as float64) with a JSON index (path.json: histogram
+    name -> offset and number of bins). The store is then opened by HistoStore, which maps
+    the file in memory instead of reading the ROOT files again.
+
+    - Args:
+    . source [string or list of string] the ROOT files, or a HistoProvider, a FilledHistos (see
+      fill_histograms) or a dictionary {name: Histo or TH1}
+    . path [string] path of the store without extension
+    . pattern [string] path of the histograms in the files, and the names of the histograms
+      of a FilledHistos (ignored for a HistoProvider)
+    . totals [list of string] background processes whose sum (with the flat systematic syst, see
+      add_flat_syst) is also stored for every other fields, so that hTot is mapped as well
+    . syst [float] flat relative systematic of the stored totals
+
+    - Return:
+    . the number of stored histograms
+    '''
+    pattern, histos = _source_histos(source, pattern)
+    hist_path, index_path = _paths(path)
+    directory = os.path.dirname(hist_path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    index, offset = OrderedDict(), 0
+    with open(hist_path, 'wb') as f:
+        def write(name, edges, contents, sumw2):
+            block = np.concatenate([edges, contents, sumw2]).astype('<f8')
+            f.write(block.tobytes())
+            index[name] = [offset, len(edges)-1]
+            return offset+block.size
+
+        for name, h in histos:
+            offset = write(name, h.edges, h.contents, h.sumw2)
+
+        if totals:
+            f.flush()
+            data = np.memmap(hist_path, dtype='<f8', mode='r') if offset else None
+            regex = _pattern_regex(pattern)
+            groups = OrderedDict()
+            for name in list(index):
+                m = regex.match(name)
+                if m and m.groupdict().get('process') in totals:
+                    fields = m.groupdict()
+                    fields.pop('process')
+                    groups.setdefault(tuple(sorted(fields.items())), []).append(name)
+            for fields, names in groups.items():
+                o, n = index[names[0]]
+                contents = np.sum([data[index[k][0]+n+1:index[k][0]+2*n+3] for k in names], axis=0)
+                sumw2 = np.sum([data[index[k][0]+2*n+3:index[k][0]+3*n+5] for k in names], axis=0)
+                sumw2[:n+1] += (contents[:n+1]*syst)**2
+                total = pattern.format(process=TOTAL, **dict(fields))
+                offset = write(total, data[o:o+n+1], contents, sumw2)
+            del data
+
+    with open(index_path, 'w') as f:
+        json.dump({'version': STORE_VERSION, 'pattern': pattern, 'size': offset,
+                   'totals': {'processes': sorted(totals or []), 'syst': syst}, 'histos': index}, f)
+    return len(index)
+
+
+class HistoStore(object):
+    '''
+    Memory-mapped histograms
+    ========================
+
+    Histograms written by build_store, with the same interface as HistoProvider. The array
+    file is mapped in memory (copy-on-write): histograms are Histo whose arrays are views of
+    the mapped file, so that no data is read nor copied until bins are used, and the pages
+    are shared by all the processes using the store. Modifying a histogram only modifies the
+    memory of the current process.
+
+    - Args:
+    . path [string] path of the store without extension
+    . as_th1 [bool] return TH1D (needed by the ROOT backend) instead of Histo; ROOT histograms own
+      their buffers, so the bins are then copied
+
+    Usage:
+       plt.build_store(['bkg.root', 'data.root'], 'store/campaign', totals=['ttbar', 'wjets'])  # once
+       store = plt.HistoStore('store/campaign')
+       dictBkg, hTot, hData = store.make_inputs(processes, data='data', region='SR', variable='met')
+       make_nice_canvas(dictBkg, hTot, hData, plot_name='SR_met', backend='mpl')
+    '''
+
+    def __init__(self, path, as_th1=False):
+        hist_path, index_path = _paths(path)
+        with open(index_path) as f:
+            meta = json.load(f, object_pairs_hook=OrderedDict)
+        if meta.get('version') != STORE_VERSION:
+            raise IOError('store \'{}\' has version {} instead of {}'.format(path, meta.get('version'), STORE_VERSION))
+        self.path = path
+        self.pattern = meta['pattern']
+        self.index = meta['histos']
+        self.totals = meta['totals']
+        self.as_th1 = as_th1
+        self._regex = _pattern_regex(self.pattern)
+        self._data = np.memmap(hist_path, dtype='<f8', mode='c') if meta['size'] else np.zeros(0)
+        if self._data.size != meta['size']:
+            raise IOError('store \'{}\' has {} values instead of {}'.format(path, self._data.size, meta['size']))
+
+    def path_of(self, **fields):
+        '''Histogram name for the given pattern fields'''
+        return self.pattern.format(**fields)
+
+    def find(self, **fields):
+        '''Field dictionaries of the stored histograms matching fields (totals excluded)'''
+        res = []
+        for name in self.index:
+            m = self._regex.match(name)
+            if m and m.groupdict().get('process') != TOTAL and all(m.group(k) == str(v) for k, v in fields.items()):
+                res.append(m.groupdict())
+        return res
+
+    def values(self, field, **fields):
+        '''Sorted distinct values of field among histograms matching fields'''
+        return sorted(set(d[field] for d in self.find(**fields)))
+
+    def histo(self, name):
+        '''Histo of the stored histogram name, with arrays mapped from the store (no copy)'''
+        if name not in self.index:
+            raise KeyError('Histogram \'{}\' not in store \'{}\''.format(name, self.path))
+        o, n = self.index[name]
+        d = self._data
+        return Histo(d[o:o+n+1], d[o+n+1:o+2*n+3], d[o+2*n+3:o+3*n+5], name.replace('/', '_'))
+
+    def get(self, name=None, **fields):
+        '''Histogram given by the pattern fields (or by its full name): Histo, or a TH1D copy if as_th1'''
+        h = self.histo(name or self.path_of(**fields))
+        return h.to_th1() if self.as_th1 else h
+
+    def make_inputs(self, processes, data='data', syst=0, allow_missing=False, **fields):
+        '''
+        (dictBkg, hTot, hData) for make_nice_canvas (see HistoProvider.make_inputs); hTot is
+        mapped from the store when it was built with the same processes and syst
+        '''
+        dictBkg = OrderedDict()
+        for p, (color, legName) in processes.items():
+            try:
+                dictBkg[p] = [self.get(process=p, **fields), color, legName]
+            except KeyError:
+                if not allow_missing:
+                    raise
+        if not dictBkg:
+            raise KeyError('No background found for {}'.format(fields))
+        total = self.path_of(process=TOTAL, **fields)
+        if (total in self.index and sorted(processes) == self.totals['processes']
+                and syst == self.totals['syst'] and len(dictBkg) == len(processes)):
+            hTot = self.histo(total)
+            hTot.name = 'tot'
+            hTot = hTot.to_th1() if self.as_th1 else hTot
+        else:
+            hBkg = [self.histo(self.path_of(process=p, **fields)) for p in dictBkg]
+            contents = np.sum([h.contents for h in hBkg], axis=0)
+            sumw2 = np.sum([h.sumw2 for h in hBkg], axis=0)
+            sumw2[:-1] += (contents[:-1]*syst)**2
+            hTot = Histo(hBkg[0].edges, contents, sumw2, 'tot')
+            hTot = hTot.to_th1() if self.as_th1 else hTot
+        hData = self.get(process=data, **fields) if data else None
+        return dictBkg, hTot, hData
+
+    def make_signals(self, signals, **fields):
+        '''dictSig of make_nice_canvas from signals [dict {process: [color, norm, legName]}]'''
+        return OrderedDict((p, [self.get(process=p, **fields)]+list(v)) for p, v in signals.items())
+
+    def close(self):
+        self._data = None
@@ -0,0 +1,143 @@
+import numpy as np
+
+from .root_setup import ROOT
+from .histo import Histo, th1_views, th1_edges, _buffer_view
+
+
+def _correlation_matrix(correlation, nproc):
+    '''
+    Process x process correlation matrix from True (fully correlated),
+    False (uncorrelated) or a given matrix.
+    '''
+    if correlation is True:
+        return np.ones((nproc, nproc))
+    if correlation is False:
+        return np.eye(nproc)
+    corr = np.asarray(correlation, float)
+    if corr.shape != (nproc, nproc):
+        raise ValueError('correlation matrix must be {0}x{0}, not {1}'.format(nproc, corr.shape))
+    return corr
+
+
+def _combine_processes(shift, corr):
+    '''
+    Squared uncertainty per nuisance parameter and bin from the shifts (..., syst, proc, bin)
+    of every process, ie. shift^T corr shift for each bin.
+    '''
+    return np.einsum('...pb,pq,...qb->...b', shift, corr, shift)
+
+
+def combine_systematics(nominal, up, down=None, method='symmetrize', correlation=True, stat2=None):
+    '''
+    Combination of systematic variations
+    ====================================
+
+    All nuisance parameters, processes and bins (and possibly many plots, with the
+    same binning, stacked along leading axes) are combined in one numpy computation.
+
+    - Args:
+    . nominal [array (..., proc, bin)] nominal yields of each process
+    . up [array (..., syst, proc, bin)] up variations
+    . down [array (..., syst, proc, bin)] down variations (None: mirror of up around nominal)
+    . method [string] 'symmetrize' (half the up-down difference, same error up and down) or
+      'envelope' (largest upward and downward shifts of each nuisance parameter)
+    . correlation [bool or array (proc, proc)] correlation of a given nuisance parameter across processes:
+      True (default, shifts are added linearly), False (added in quadrature) or a correlation matrix.
+      Different nuisance parameters are always added in quadrature.
+    . stat2 [array (..., bin)] squared statistical uncertainty added in quadrature (eg. sumw2 of the total)
+
+    - Return:
+    . (total, err_down, err_up) arrays of shape (..., bin), with positive uncertainties
+    '''
+    nominal, up = np.asarray(nominal, float), np.asarray(up, float)
+    d_up = up-nominal[..., np.newaxis, :, :]
+    if down is None:
+        d_dn = -d_up
+    else:
+        d_dn = np.asarray(down, float)-nominal[..., np.newaxis, :, :]
+    corr = _correlation_matrix(correlation, nominal.shape[-2])
+
+    if method == 'symmetrize':
+        var_up = var_dn = _combine_processes((d_up-d_dn)/2, corr).sum(axis=-2)
+    elif method == 'envelope':
+        var_up = _combine_processes(np.maximum(np.maximum(d_up, d_dn), 0), corr).sum(axis=-2)
+        var_dn = _combine_processes(np.minimum(np.minimum(d_up, d_dn), 0), corr).sum(axis=-2)
+    else:
+        raise NameError('method is only \'symmetrize\' or \'envelope\', but not \'{}\''.format(method))
+
+    if stat2 is not None:
+        var_up, var_dn = var_up+stat2, var_dn+stat2
+    total = nominal.sum(axis=-2)
+    return total, np.sqrt(np.maximum(var_dn, 0)), np.sqrt(np.maximum(var_up, 0))
+
+
+def asym_graph(edges, total, err_down, err_up, name='gTot', mask=None):
+    '''
+    TGraphAsymmErrors with one point per bin (arrays without under/overflow), or only for
+    the bins where mask [array of bool] is True
+    '''
+    edges = np.asarray(edges, float)
+    x = 0.5*(edges[1:]+edges[:-1])
+    ex = 0.5*(edges[1:]-edges[:-1])
+    y, eyl, eyh = (np.asarray(a, float) for a in (total, err_down, err_up))
+    if mask is not None:
+        x, ex, y, eyl, eyh = (np.ascontiguousarray(a[mask]) for a in (x, ex, y, eyl, eyh))
+    g = ROOT.TGraphAsymmErrors(len(x), x, y, ex, ex, eyl, eyh)
+    g.SetName(name)
+    return g
+
+
+def graph_arrays(g):
+    '''
+    Return (y, eylow, eyhigh) numpy views on the points of g [TGraphAsymmErrors]
+    '''
+    n = g.GetN()
+    return (_buffer_view(g.GetY(), n, np.float64),
+            _buffer_view(g.GetEYlow(), n, np.float64),
+            _buffer_view(g.GetEYhigh(), n, np.float64))
+
+
+def build_total(dictBkg, variations, method='symmetrize', correlation=True, stat=True, name='tot'):
+    '''
+    Total background with systematic uncertainties
+    ===============================================
+
+    - Args:
+    . dictBkg [dict {bkgName: [TH1, color, legName]}] as given to make_nice_canvas
+    . variations [dict {systName: {bkgName: (TH1 up, TH1 down)}}] systematic variations;
+      processes missing for a nuisance parameter are not affected by it, and a None down
+      variation is taken as the mirror of the up one
+    . method, correlation: see combine_systematics
+    . stat [bool] add the MC statistical uncertainty
+
+    - Return:
+    . (hTot, gTot) where hTot [TH1] is the total with the average of the up and down
+      uncertainties, and gTot [TGraphAsymmErrors] the total with asymmetric uncertainties,
+      to be given to make_nice_canvas(..., tot_graph=gTot)
+    '''
+    procs = list(dictBkg.keys())
+    hnom = [Histo.from_th1(dictBkg[p][0]) for p in procs]
+    nominal = np.array([h.contents for h in hnom], dtype=float)
+    up = np.repeat(nominal[np.newaxis], len(variations), axis=0)
+    down = up.copy()
+    for i, syst in enumerate(variations.values()):
+        for j, p in enumerate(procs):
+            if p not in syst:
+                continue
+            hup, hdown = syst[p]
+            up[i, j] = Histo.from_th1(hup).contents
+            if hdown is not None:
+                down[i, j] = Histo.from_th1(hdown).contents
+            else:
+                down[i, j] = 2*nominal[j]-up[i, j]
+    stat2 = np.sum([h.sumw2 for h in hnom], axis=0) if stat else None
+    total, err_dn, err_up = combine_systematics(nominal, up, down, method, correlation, stat2)
+
+    hTot = dictBkg[procs[0]][0].Clone(name)
+    ROOT.SetOwnership(hTot, False)
+    contents, sumw2 = th1_views(hTot)
+    contents[:] = total
+    sumw2[:] = (0.5*(err_dn+err_up))**2
+    gTot = asym_graph(th1_edges(hTot), total[1:-1], err_dn[1:-1], err_up[1:-1], name+'_graph')
+    ROOT.SetOwnership(gTot, False)
+    return hTot, gTot
@@ -0,0 +1,139 @@
+import numpy as np
+
+from .histo import Histo, _buffer_view, _th1_dtype, axis_edges
+from .layout import text_width
+
+
+# Above these numbers, bin labels are thinned and group labels are not drawn (separators are)
+MAX_BIN_LABELS = 60
+MAX_GROUP_LABELS = 40
+
+
+def histo_arrays(h):
+    '''
+    (contents, sumw2, edges) of h [TH1, TH2 or TH3]: contents and sumw2 are numpy views
+    (no copy) indexed [x, y, z] with under/overflow, edges the list of the bin edges of
+    each axis. sumw2 is abs(contents) if not allocated.
+    '''
+    n = h.GetNcells()
+    axes = [h.GetXaxis(), h.GetYaxis(), h.GetZaxis()][:h.GetDimension()]
+    shape = tuple(a.GetNbins()+2 for a in axes)
+    contents = _buffer_view(h.GetArray(), n, _th1_dtype(h))
+    if h.GetSumw2N() > 0:
+        sumw2 = _buffer_view(h.GetSumw2().GetArray(), n, np.float64)
+    else:
+        sumw2 = np.abs(contents, dtype=np.float64)
+    # ROOT stores x fastest: the C-ordered array of shape (z, y, x) is transposed to [x, y, z]
+    return contents.reshape(shape[::-1]).T, sumw2.reshape(shape[::-1]).T, [axis_edges(a) for a in axes]
+
+
+def _group_label(title, lo, hi):
+    if title:
+        return '{:g} < {} < {:g}'.format(lo, title, hi)
+    return '[{:g}, {:g}]'.format(lo, hi)
+
+
+def unroll_arrays(contents, sumw2, edges, titles=None, flow=False, name='unrolled'):
+    '''
+    Unrolled 1D histogram of 2D or 3D arrays
+    ========================================
+
+    The bins of x are laid side by side for each bin of y (and z): the bin (ix, iy, iz) is the
+    bin ix + nx*(iy + ny*iz) of the unrolled histogram, whose edges are the bin numbers 0..N.
+    All bins are moved at once by numpy.
+
+    - Args:
+    . contents, sumw2 [arrays of shape (nx+2, ny+2) or (nx+2, ny+2, nz+2)] with under/overflow
+    . edges [list of arrays] bin edges of each axis
+    . titles [list of string] titles of the y (and z) axes, used in the group labels
+    . flow [bool] fold the under/overflow in the first/last bins of each axis (dropped otherwise)
+    . name [string] name of the unrolled histogram
+
+    - Return:
+    . (Histo, groups) with groups [list of (label, xlo, xhi)] one per bin of y (and z), as
+      given to make_nice_canvas(..., bin_groups=groups)
+    '''
+    contents = np.array(contents, dtype=np.float64)
+    sumw2 = np.array(sumw2, dtype=np.float64)
+    if contents.ndim not in (2, 3) or len(edges) != contents.ndim:
+        raise ValueError('unroll needs 2D or 3D arrays with the edges of each axis, not {} arrays and {} axes'.format(
+            contents.ndim, len(edges)))
+    for axis in range(contents.ndim):
+        for a in (contents, sumw2):
+            a = np.moveaxis(a, axis, 0)
+            if flow:
+                a[1] += a[0]
+                a[-2] += a[-1]
+    inner = tuple(slice(1, -1) for _ in range(contents.ndim))
+    values = contents[inner].ravel(order='F')
+    w2 = sumw2[inner].ravel(order='F')
+    nx, n = contents.shape[0]-2, values.size
+    h = Histo(np.arange(n+1, dtype=np.float64), np.concatenate([[0.], values, [0.]]),
+              np.concatenate([[0.], w2, [0.]]), name)
+
+    titles = list(titles or [])+[None]*2
+    outer = [[_group_label(titles[k], e[i], e[i+1]) for i in range(len(e)-1)] for k, e in enumerate(edges[1:])]
+    labels = outer[0]
+    if len(outer) > 1:
+        labels = ['{}, {}'.format(ly, lz) for lz in outer[1] for ly in outer[0]]
+    groups = [(l, float(i*nx), float((i+1)*nx)) for i, l in enumerate(labels)]
+    return h, groups
+
+
+def unroll(h, flow=False, titles=None, name=None):
+    '''
+    Unroll h [TH2 or TH3] into a 1D Histo (see unroll_arrays); the group labels use the titles
+    of the y and z axes, unless titles is given. Return (Histo, groups).
+    '''
+    if h.GetDimension() not in (2, 3):
+        raise TypeError('Histogram \'{}\' of class {} is not a TH2 or TH3'.format(h.GetName(), h.ClassName()))
+    contents, sumw2, edges = histo_arrays(h)
+    if titles is None:
+        titles = [h.GetYaxis().GetTitle(), h.GetZaxis().GetTitle()][:h.GetDimension()-1]
+    return unroll_arrays(contents, sumw2, edges, titles, flow, name or h.GetName()+'_unrolled')
+
+
+def unroll_inputs(dictBkg, hTot, hData=None, dictSig=None, variations=None, flow=False, titles=None,
+                  as_th1=True):
+    '''
+    Unroll all the inputs of a plot
+    ===============================
+
+    - Args:
+    . dictBkg, hTot, hData, dictSig: as given to make_nice_canvas, with TH2 or TH3 histograms
+    . variations [dict {systName: {bkgName: (up, down)}}] as given to build_total
+    . flow, titles: see unroll
+    . as_th1 [bool] return TH1D (needed by the ROOT backend) instead of Histo
+
+    - Return:
+    . (dictBkg, hTot, hData, dictSig, variations, groups) with new histograms (the colors and
+      legend names are kept); hData, dictSig and variations are None if not given
+    '''
+    def ur(h):
+        if h is None:
+            return None
+        new = unroll(h, flow, titles)[0]
+        return new.to_th1() if as_th1 else new
+
+    dictBkg = {n: [ur(v[0])]+list(v[1:]) for n, v in dictBkg.items()}
+    if dictSig:
+        dictSig = {n: [ur(v[0])]+list(v[1:]) for n, v in dictSig.items()}
+    if variations:
+        variations = {s: {p: tuple(ur(h) for h in v) for p, v in syst.items()}
+                      for s, syst in variations.items()}
+    hTot, groups = unroll(hTot, flow, titles)
+    return dictBkg, hTot.to_th1() if as_th1 else hTot, ur(hData), dictSig, variations, groups
+
+
+def thin_labels(labels, size, aspect, frame):
+    '''
+    [(bin index, label)] of the bin labels to draw: all of them up to MAX_BIN_LABELS bins, otherwise
+    one every k bins, such that the labels (of the given size and pad aspect, see text_width) fit
+    side by side in the frame width frame [NDC]
+    '''
+    if len(labels) <= MAX_BIN_LABELS:
+        return list(enumerate(labels))
+    widest = max(text_width(l, size, aspect) for l in labels)
+    n_fit = max(1, min(MAX_BIN_LABELS, int(frame/(1.5*widest)) if widest > 0 else MAX_BIN_LABELS))
+    step = -(-len(labels)//n_fit)
+    return [(i, labels[i]) for i in range(0, len(labels), step)]
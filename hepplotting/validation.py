@@ -0,0 +1,153 @@
+import numpy as np
+from collections import namedtuple
+
+from .histo import Histo
+from .significance import SIGNIF_TITLES
+from .intervals import DATA_ERRORS, RATIO_ERRORS
+from .unroll import unroll_inputs
+
+
+ValidationIssue = namedtuple('ValidationIssue', ['plot_name', 'severity', 'message'])
+
+
+def _as_histo(h):
+    return h if isinstance(h, Histo) else Histo.from_th1(h)
+
+
+def _spec_histos(spec, load):
+    '''
+    ([(role, histogram)], signal names) of a plot specification (hTot first, unrolled if the plot
+    is), or (None, None) if the histograms are only available through a loader and load is False
+    '''
+    kwargs = spec.get('kwargs', {})
+    if 'loader' in spec:
+        if not load:
+            return None, None
+        loaded = spec['loader'](*spec.get('loader_args', ()))
+        dictBkg, hTot, hData = loaded[:3]
+        dictSig = loaded[3] if len(loaded) > 3 else kwargs.get('dictSig')
+    else:
+        dictBkg, hTot, hData = spec.get('dictBkg'), spec.get('hTot'), spec.get('hData')
+        dictSig = kwargs.get('dictSig')
+    unroll = kwargs.get('unroll')
+    if unroll and hTot is not None:
+        options = unroll if isinstance(unroll, dict) else {}
+        dictBkg, hTot, hData, dictSig = unroll_inputs(dictBkg or {}, hTot, hData, dictSig, as_th1=False, **options)[:4]
+    histos = [('hTot', hTot), ('hData', hData)]
+    histos += [('background \'{}\''.format(n), v[0]) for n, v in (dictBkg or {}).items()]
+    histos += [('signal \'{}\''.format(n), v[0]) for n, v in (dictSig or {}).items()]
+    return histos, list((dictSig or {}).keys())
+
+
+def _check_options(name, kwargs, signals, nbins):
+    '''Issues of the key-word arguments of one plot'''
+    issues = []
+    ratio_type = kwargs.get('ratio_type', 'ratio')
+    if kwargs.get('plot_ratio', True):
+        if ratio_type != 'ratio' and ratio_type not in SIGNIF_TITLES:
+            issues.append('ratio_type is only \'ratio\', {}, but not \'{}\''.format(', '.join(sorted(SIGNIF_TITLES)), ratio_type))
+        elif ratio_type in SIGNIF_TITLES and signals is not None and not signals:
+            issues.append('ratio_type \'{}\' needs at least one signal in dictSig'.format(ratio_type))
+        ratio_signals = kwargs.get('ratio_signals')
+        if ratio_signals and ratio_signals != 'all' and signals is not None:
+            missing = [s for s in ratio_signals if s not in signals]
+            if missing:
+                issues.append('ratio_signals {} are not in dictSig'.format(', '.join(missing)))
+    if kwargs.get('data_errors', 'sqrt') not in DATA_ERRORS:
+        issues.append('data_errors is only {}, but not \'{}\''.format(', '.join(DATA_ERRORS), kwargs['data_errors']))
+    if kwargs.get('ratio_errors', 'sqrt') not in RATIO_ERRORS:
+        issues.append('ratio_errors is only {}, but not \'{}\''.format(', '.join(RATIO_ERRORS), kwargs['ratio_errors']))
+    bin_label = kwargs.get('bin_label')
+    if bin_label and nbins is not None and len(bin_label) != nbins and not kwargs.get('rebin'):
+        issues.append('bin_label has {} labels for {} bins'.format(len(bin_label), nbins))
+    return [ValidationIssue(name, 'error', m) for m in issues]
+
+
+def validate_specs(plot_specs, load=False):
+    '''
+    Pre-flight checks of a batch of plots
+    =====================================
+
+    Check, before any drawing, every plot specification of make_many_canvases:
+      - hData and hTot are given, all histograms have the binning of hTot,
+      - bin_label has one label per bin,
+      - ratio_type, ratio_signals, data_errors and ratio_errors are valid for the given signals,
+      - no content is NaN or infinite, data is not negative (errors), backgrounds are not
+        negative (warnings).
+    The binning and content checks are done at once on the histograms of all plots,
+    concatenated in a few numpy arrays.
+
+    - Args:
+    . plot_specs [list of dict] as in make_many_canvases
+    . load [bool] call the loaders of the specs giving one, to also check their histograms
+      (otherwise only their options are checked)
+
+    - Return:
+    . list of ValidationIssue(plot_name, severity, message), severity being \'error\' or \'warning\',
+      in the order of plot_specs
+    '''
+    issues, order = [], {}
+    names, roles, histos, ref = [], [], [], []
+    for i, spec in enumerate(plot_specs):
+        name = spec.get('plot_name', '#{}'.format(i))
+        order[name] = i
+        spec_histos, signals = _spec_histos(spec, load)
+        nbins = None
+        if spec_histos is not None:
+            for role, h in spec_histos[:2]:
+                if h is None:
+                    issues.append(ValidationIssue(name, 'error', '{} is missing'.format(role)))
+            spec_histos = [(r, _as_histo(h)) for r, h in spec_histos if h is not None]
+            if spec_histos:
+                nbins = spec_histos[0][1].nbins
+            first = len(histos)
+            for role, h in spec_histos:
+                names.append(name)
+                roles.append(role)
+                histos.append(h)
+                ref.append(first)
+        issues += _check_options(name, spec.get('kwargs', {}), signals, nbins)
+    if not histos:
+        return issues
+
+    # Binning of every histogram compared to the first histogram of its plot (hTot)
+    ref = np.array(ref)
+    nb = np.array([h.nbins for h in histos])
+    bad_binning = nb != nb[ref]
+    for n in np.unique(nb):
+        sel = np.flatnonzero((nb == n) & (nb[ref] == n))
+        if not len(sel):
+            continue
+        edges = np.array([histos[k].edges for k in sel])
+        ref_edges = np.array([histos[k].edges for k in ref[sel]])
+        bad_binning[sel] = ~np.all(np.isclose(edges, ref_edges, rtol=1e-9, atol=1e-12), axis=1)
+
+    # Contents of all histograms at once, with the index of their histogram
+    contents = np.concatenate([h.contents for h in histos]).astype(np.float64)
+    sumw2 = np.concatenate([h.sumw2 for h in histos])
+    owner = np.repeat(np.arange(len(histos)), [len(h.contents) for h in histos])
+    nonfinite = np.bincount(owner, ~np.isfinite(contents) | ~np.isfinite(sumw2), len(histos)) > 0
+    negative = np.bincount(owner, np.nan_to_num(contents) < 0, len(histos)) > 0
+    negative_w2 = np.bincount(owner, np.nan_to_num(sumw2) < 0, len(histos)) > 0
+
+    for k in np.flatnonzero(bad_binning | nonfinite | negative | negative_w2):
+        name, role, h = names[k], roles[k], histos[k]
+        if bad_binning[k]:
+            issues.append(ValidationIssue(name, 'error', '{} has {} bins in [{:g}, {:g}] while hTot has {} bins in [{:g}, {:g}]'.format(
+                role, h.nbins, h.edges[0], h.edges[-1], histos[ref[k]].nbins, histos[ref[k]].edges[0], histos[ref[k]].edges[-1])))
+        if nonfinite[k]:
+            issues.append(ValidationIssue(name, 'error', '{} has NaN or infinite contents or errors'.format(role)))
+        if negative_w2[k]:
+            issues.append(ValidationIssue(name, 'error', '{} has negative sum of weights squared'.format(role)))
+        if negative[k]:
+            severity = 'error' if role == 'hData' else 'warning'
+            issues.append(ValidationIssue(name, severity, '{} has negative contents'.format(role)))
+    return sorted(issues, key=lambda issue: order[issue.plot_name])
+
+
+def validation_report(issues):
+    '''Text report of a list of ValidationIssue, one line per issue'''
+    n_err = sum(i.severity == 'error' for i in issues)
+    lines = ['{} error(s), {} warning(s) in {} plot(s)'.format(n_err, len(issues)-n_err, len(set(i.plot_name for i in issues)))]
+    lines += ['{:7s} {}: {}'.format(i.severity.upper(), i.plot_name, i.message) for i in issues]
+    return '\n'.join(lines)
@@ -0,0 +1,255 @@
+import sys
+import atexit
+import pickle
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+OUTPUT_FORMATS = ('pdf', 'png', 'svg', 'eps', 'root')
+DEFAULT_OUTPUTS = ('pdf', 'png', 'root')
+
+
+def parse_outputs(outputs=None):
+    '''
+    Return the tuple of file extensions from the \'outputs\' option of make_nice_canvas:
+    None (default: pdf, png and root), \'none\', a single format or a list of formats.
+    '''
+    if outputs is None:
+        return DEFAULT_OUTPUTS
+    if isinstance(outputs, str):
+        outputs = [o.strip() for o in outputs.split(',') if o.strip()]
+    outputs = tuple(o.lower() for o in outputs if o.lower() != 'none')
+    for o in outputs:
+        if o not in OUTPUT_FORMATS:
+            raise NameError('output format is only {}, but not \'{}\''.format(', '.join(OUTPUT_FORMATS), o))
+    return outputs
+
+
+def png_variants(path, png_sizes=None):
+    '''
+    [(path, size)] of the reduced PNG files made from the PNG file path: path_<name>.png for
+    each {name: size} of png_sizes, size being a scale factor (<= 1) or a width in pixels (> 1)
+    '''
+    root = path[:-len('.png')]
+    return [('{}_{}.png'.format(root, name), size) for name, size in sorted((png_sizes or {}).items())]
+
+
+def check_png_compression(compression):
+    '''Return compression if it is None or a PNG compression level from 0 to 9, NameError otherwise'''
+    if compression is not None and (isinstance(compression, bool) or compression not in range(10)):
+        raise NameError('png_compression is only an integer from 0 to 9, but not \'{}\''.format(compression))
+    return compression
+
+
+def _png_width(size, width):
+    return int(size) if size > 1 else max(1, int(round(width*size)))
+
+
+def _png_shape(size, width, height):
+    w = _png_width(size, width)
+    return w, max(1, int(round(height*w/float(width))))
+
+
+def _root_compression(compression):
+    '''
+    TImage compression (1-100) of the zlib level compression (0-9). ROOT writes the zlib level
+    int(c*9/100) of c, except 0 which means the ROOT default: 0 is mapped to 1 (no compression).
+    '''
+    return max(1, -(-100*compression//9))
+
+
+def save_png(canv, path, variants=(), compression=None):
+    '''
+    Render canv [TCanvas] once into an image, written in path and scaled down into every
+    (path, size) of variants (see png_variants). compression [int 0-9] is the zlib level
+    of the PNG files (default: ROOT default).
+    '''
+    from .root_setup import ROOT
+    check_png_compression(compression)
+    img = ROOT.TImage.Create()
+    img.FromPad(canv)
+    if compression is not None:
+        img.SetImageCompression(_root_compression(compression))
+    img.WriteImage(path, ROOT.TImage.kPng)
+    width, height = img.GetWidth(), img.GetHeight()
+    # Every variant is scaled down from a copy of the full-size image
+    for vpath, size in variants:
+        small = img.Clone('{}_small'.format(img.GetName()))
+        small.Scale(*_png_shape(size, width, height))
+        if compression is not None:
+            small.SetImageCompression(_root_compression(compression))
+        small.WriteImage(vpath, ROOT.TImage.kPng)
+        del small
+    del img
+    return [path]+[v[0] for v in variants]
+
+
+def save_pil_png(image, path, variants=(), compression=None):
+    '''
+    Same as save_png for a PIL image: image is written in path, and resampled from the full-size
+    image into every (path, size) of variants.
+    '''
+    from PIL import Image
+    check_png_compression(compression)
+    options = {} if compression is None else {'compress_level': compression}
+    image.save(path, 'PNG', **options)
+    for vpath, size in variants:
+        image.resize(_png_shape(size, *image.size), Image.LANCZOS).save(vpath, 'PNG', **options)
+    return [path]+[v[0] for v in variants]
+
+
+def save_canvas(canv, paths, png_sizes=None, png_compression=None):
+    '''
+    Write canv [TCanvas] in the files paths (see output_paths); with png_sizes or
+    png_compression, the PNG files are made with save_png from a single rendering.
+    '''
+    variants = set(v for p in paths if p.endswith('.png') for v, size in png_variants(p, png_sizes))
+    for path in paths:
+        if path in variants:
+            continue
+        if path.endswith('.png') and (png_sizes or png_compression is not None):
+            save_png(canv, path, png_variants(path, png_sizes), png_compression)
+        else:
+            canv.SaveAs(path)
+
+
+def _init_writer():
+    from .root_setup import load_root
+    load_root().gROOT.SetBatch(True)
+
+
+def _save_canvas(payload, paths, png_sizes=None, png_compression=None):
+    '''
+    Writer entry point: re-build the canvas streamed in the main process and save it.
+    '''
+    canv = pickle.loads(payload)
+    canv.Draw()
+    save_canvas(canv, paths, png_sizes, png_compression)
+    canv.Close()
+    return paths
+
+
+class OutputWriter(object):
+    '''
+    Write canvases to disk in background processes
+    ==============================================
+
+    The canvas is serialized once (ROOT streamer) in the calling process, and the
+    files are written by writer processes, so that the next plot can be drawn meanwhile.
+
+    - Args:
+    . n_workers [int] number of writer processes (default: 1)
+    . max_pending [int] maximum number of canvases waiting to be written; submit()
+      blocks on the oldest one beyond this limit, to bound memory (default: 64)
+    . mp_context [string] multiprocessing start method ('fork', 'spawn', 'forkserver')
+
+    Usage:
+       with OutputWriter() as writer:
+           for ...:
+               make_nice_canvas(..., writer=writer)
+       # all files are written here (or call writer.wait())
+    '''
+
+    def __init__(self, n_workers=1, max_pending=64, mp_context=None):
+        self.n_workers = n_workers
+        self.max_pending = max_pending
+        self.mp_context = mp_context
+        self.written, self.failed = [], []
+        self._executor = None
+        self._pending = []
+
+    def _get_executor(self):
+        if self._executor is None:
+            ctx = multiprocessing.get_context(self.mp_context)
+            self._executor = ProcessPoolExecutor(self.n_workers, mp_context=ctx, initializer=_init_writer)
+        return self._executor
+
+    def _collect(self, paths, future, on_done):
+        try:
+            self.written.extend(future.result())
+        except Exception:
+            self.failed.append((paths, traceback.format_exc()))
+        else:
+            if on_done:
+                on_done()
+
+    def submit(self, canv, paths, on_done=None, png_sizes=None, png_compression=None):
+        '''
+        Schedule the writing of canv [TCanvas] into the files paths [list of string]
+        (with png_sizes and png_compression, see save_canvas).
+        on_done [callable] is called (in this process) once all files are written.
+        '''
+        if not paths:
+            return
+        payload = pickle.dumps(canv, pickle.HIGHEST_PROTOCOL)
+        future = self._get_executor().submit(_save_canvas, payload, list(paths), png_sizes, png_compression)
+        self._pending.append((paths, future, on_done))
+        while len(self._pending) > self.max_pending:
+            self._collect(*self._pending.pop(0))
+
+    def wait(self):
+        '''
+        Block until all submitted canvases are written, and return the list of written files.
+        Raise a RuntimeError listing the files which could not be written.
+        '''
+        while self._pending:
+            self._collect(*self._pending.pop(0))
+        if self.failed:
+            failed, self.failed = self.failed, []
+            msg = '\n'.join('{}:\n{}'.format(', '.join(p), err) for p, err in failed)
+            raise RuntimeError('{} canvas(es) could not be written\n{}'.format(len(failed), msg))
+        return list(self.written)
+
+    def close(self):
+        '''
+        Wait for all files and stop the writer processes.
+        '''
+        try:
+            return self.wait()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_default_writer = None
+
+
+def default_writer():
+    '''
+    Shared OutputWriter used by make_nice_canvas(..., async_outputs=True), closed at exit
+    '''
+    global _default_writer
+    if _default_writer is None:
+        _default_writer = OutputWriter()
+        atexit.register(_close_default_writer)
+    return _default_writer
+
+
+def _close_default_writer():
+    '''At exit: write the files not waited for with wait_outputs(), and report those which failed'''
+    global _default_writer
+    writer, _default_writer = _default_writer, None
+    if writer is None:
+        return
+    try:
+        writer.close()
+    except RuntimeError as err:
+        sys.stderr.write('hepplotting: {}\n'.format(err))
+
+
+def wait_outputs():
+    '''
+    Wait until all files of make_nice_canvas(..., async_outputs=True) are written,
+    and return the list of written files.
+    '''
+    if _default_writer is None:
+        return []
+    return _default_writer.wait()
@@ -0,0 +1,177 @@
+import csv
+import json
+import numpy as np
+
+from .histo import Histo
+
+
+def format_yield(n, e=None, is_data=False, latex=False):
+    '''
+    Yield and its uncertainty as printed in the legend (see leg_name_with_yield):
+    no decimal from 100 events, one below, and only the yield for data.
+    '''
+    if is_data or e is None:
+        return '{:.0f}'.format(n)
+    pm = ' $\\pm$ ' if latex else ' #pm '
+    fmt = '{:.0f}' if n >= 100 else '{:.1f}'
+    return fmt.format(n)+pm+fmt.format(e)
+
+
+def _as_region(plot):
+    '''
+    (dictBkg, hTot, hData, dictSig) from a make_many_canvases spec or a tuple
+    '''
+    if isinstance(plot, dict):
+        from .batch import _unpack_spec
+        dictBkg, hTot, hData, plot_name, kwargs = _unpack_spec(plot)
+        return dictBkg, hTot, hData, kwargs.get('dictSig')
+    plot = tuple(plot)+(None,)*(4-len(plot))
+    return plot[:4]
+
+
+def _arrays(h, flow):
+    if not isinstance(h, Histo):
+        h = Histo.from_th1(h)
+    sl = slice(None) if flow else slice(1, -1)
+    return h.contents[sl], h.sumw2[sl]
+
+
+class YieldTable(object):
+    '''
+    Yields of all processes in several regions
+    . regions [list of string] column names
+    . rows [list of (key, label, kind)] with kind \'bkg\', \'total\', \'signal\' or \'data\'
+    . values [array (row, region)] integrals (nan if the process is missing in a region)
+    . errors [array (row, region)] statistical uncertainties (square root of the summed sumw2)
+    '''
+
+    def __init__(self, regions, rows, values, errors):
+        self.regions, self.rows, self.values, self.errors = regions, rows, values, errors
+
+    def cell(self, i, j, latex=False):
+        if np.isnan(self.values[i, j]):
+            return '-'
+        return format_yield(self.values[i, j], self.errors[i, j], self.rows[i][2] == 'data', latex)
+
+    def to_dict(self):
+        '''{region: {key: {'yield': ..., 'error': ...}}}, without missing processes'''
+        out = {}
+        for j, r in enumerate(self.regions):
+            out[r] = {}
+            for i, (key, label, kind) in enumerate(self.rows):
+                if not np.isnan(self.values[i, j]):
+                    out[r][key] = {'yield': float(self.values[i, j]), 'error': float(self.errors[i, j])}
+        return out
+
+    def to_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def to_csv(self, path):
+        '''One line per process, with the yield and error columns of each region (not rounded)'''
+        with open(path, 'w') as f:
+            w = csv.writer(f)
+            w.writerow(['process']+[c for r in self.regions for c in (r, r+'_error')])
+            for i, (key, label, kind) in enumerate(self.rows):
+                w.writerow([key]+[x for j in range(len(self.regions))
+                                  for x in (self.values[i, j], self.errors[i, j])])
+
+    def to_latex(self, path=None, caption=None):
+        '''
+        Tabular with one column per region, rounded as in the legend; the total and
+        the data are separated by horizontal lines. Written in path if given, and returned.
+        '''
+        def tex(s):
+            '''ROOT TLatex (eg. t#bar{t}) in math mode, and special characters escaped otherwise'''
+            if '$' in s:
+                return s
+            if '#' in s:
+                return '$'+s.replace('#', '\\').replace(' ', '~')+'$'
+            return s.replace('_', '\\_').replace('%', '\\%').replace('&', '\\&')
+        lines = ['\\begin{table}[htbp]', '\\centering', '\\begin{tabular}{l'+'c'*len(self.regions)+'}',
+                 '\\hline', ' & '.join(['Process']+[tex(r) for r in self.regions])+' \\\\', '\\hline']
+        previous = 'bkg'
+        for i, (key, label, kind) in enumerate(self.rows):
+            if kind != previous:
+                lines.append('\\hline')
+                previous = kind
+            lines.append(' & '.join([tex(label)]+[self.cell(i, j, True) for j in range(len(self.regions))])+' \\\\')
+        lines += ['\\hline', '\\end{tabular}']
+        if caption:
+            lines.append('\\caption{{{}}}'.format(caption))
+        lines.append('\\end{table}')
+        text = '\n'.join(lines)+'\n'
+        if path:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+    def write(self, basename, formats=('tex', 'csv', 'json')):
+        '''Write basename.tex, basename.csv and basename.json; return the paths'''
+        writers = {'tex': self.to_latex, 'csv': self.to_csv, 'json': self.to_json}
+        paths = []
+        for fmt in formats:
+            if fmt not in writers:
+                raise NameError('yield table format is only \'tex\', \'csv\' or \'json\', but not \'{}\''.format(fmt))
+            paths.append(basename+'.'+fmt)
+            writers[fmt](paths[-1])
+        return paths
+
+
+def make_yield_table(plots, flow=True, total_name='Total bkg', data_name='Data'):
+    '''
+    Yield table of many regions
+    ===========================
+
+    All the integrals and errors are computed in one numpy pass over the concatenated
+    bin contents of every histogram. Signals are taken as given: make the table before
+    make_nice_canvas, which normalizes the signals with a norm.
+
+    - Args:
+    . plots [dict {region: spec or tuple}] the make_nice_canvas inputs of each region, either
+      (dictBkg, hTot, hData[, dictSig]) or a make_many_canvases spec (dictSig from its kwargs);
+      a list of specs is also accepted, the regions being their plot_name
+    . flow [bool] include the under/overflow bins
+    . total_name, data_name [string] labels of the total background and data rows
+
+    - Return:
+    . YieldTable
+    '''
+    if not isinstance(plots, dict):
+        plots = {spec['plot_name']: spec for spec in plots}
+    regions = list(plots.keys())
+    inputs = [_as_region(p) for p in plots.values()]
+
+    # Rows: backgrounds in order of appearance, total, signals and data
+    rows, index = [], {}
+
+    def add_row(key, label, kind):
+        if (key, kind) not in index:
+            index[(key, kind)] = len(rows)
+            rows.append((key, label, kind))
+        return index[(key, kind)]
+
+    cells = []
+    for j, (dictBkg, hTot, hData, dictSig) in enumerate(inputs):
+        for n, v in dictBkg.items():
+            cells.append((add_row(n, v[2], 'bkg'), j, v[0]))
+    for j, (dictBkg, hTot, hData, dictSig) in enumerate(inputs):
+        cells.append((add_row('total', total_name, 'total'), j, hTot))
+    for j, (dictBkg, hTot, hData, dictSig) in enumerate(inputs):
+        for n, v in (dictSig or {}).items():
+            cells.append((add_row(n, v[3], 'signal'), j, v[0]))
+    for j, (dictBkg, hTot, hData, dictSig) in enumerate(inputs):
+        if hData is not None:
+            cells.append((add_row('data', data_name, 'data'), j, hData))
+
+    values = np.full((len(rows), len(regions)), np.nan)
+    errors = np.full((len(rows), len(regions)), np.nan)
+    if cells:
+        arrays = [_arrays(h, flow) for _, _, h in cells]
+        offsets = np.cumsum([0]+[len(c) for c, _ in arrays[:-1]])
+        sums = np.add.reduceat(np.concatenate([c for c, _ in arrays]).astype(np.float64), offsets)
+        sumw2 = np.add.reduceat(np.concatenate([w for _, w in arrays]), offsets)
+        i, j = np.array([c[0] for c in cells]), np.array([c[1] for c in cells])
+        values[i, j] = sums
+        errors[i, j] = np.sqrt(sumw2)
+    return YieldTable(regions, rows, values, errors)
@@ -4,6 +4,7 @@ setup(name='hepplotting',
       version='0.1',
       description='Make publication quality plot for HEP based on ROOT histograms',
       packages=['hepplotting'],
+      entry_points={'console_scripts': ['hepplotting=hepplotting.cli:main']},
       zip_safe=False,
       license='MIT',
       author_email='romain.madar@cern.ch',
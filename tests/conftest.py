@@ -0,0 +1,48 @@
+import os
+import sys
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from hepplotting.histo import Histo
+
+
+def random_histo(name, mean, nbins=20, seed=0):
+    '''Histo of nbins Poisson(mean) counts in [0, 100], with empty under/overflow'''
+    rng = np.random.default_rng(seed)
+    contents = np.concatenate([[0.], rng.poisson(mean, nbins), [0.]])
+    return Histo(np.linspace(0, 100, nbins+1), contents, contents.copy(), name)
+
+
+@pytest.fixture
+def inputs():
+    '''(dictBkg, hTot, hData) of a two-background plot made of Histo (matplotlib backend)'''
+    b1, b2 = random_histo('b1', 50, seed=1), random_histo('b2', 20, seed=2)
+    dictBkg = OrderedDict([('b1', [b1, 2, 'B1']), ('b2', [b2, 4, 'B2'])])
+    hTot = Histo(b1.edges, b1.contents+b2.contents, b1.sumw2+b2.sumw2, 'tot')
+    return dictBkg, hTot, random_histo('data', 70, seed=3)
+
+
+@pytest.fixture
+def root_inputs(inputs):
+    '''Same as inputs, made of TH1 (ROOT backend): skipped without ROOT'''
+    ROOT = pytest.importorskip('ROOT')
+    ROOT.gROOT.SetBatch(True)
+    dictBkg, hTot, hData = inputs
+    dictBkg = OrderedDict((n, [v[0].to_th1(), v[1], v[2]]) for n, v in dictBkg.items())
+    return dictBkg, hTot.to_th1(), hData.to_th1()
+
+
+def pytest_addoption(parser):
+    parser.addoption('--require-root', action='store_true', help='fail the tests needing ROOT instead of skipping them')
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    '''With --require-root (CI job with ROOT), a test skipped for lack of ROOT fails'''
+    outcome = yield
+    report = outcome.get_result()
+    if report.skipped and item.config.getoption('require_root') and "'ROOT'" in str(report.longrepr):
+        report.outcome = 'failed'
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+import hepplotting as plt
+
+from conftest import random_histo
+
+
+def _specs(inputs, plotdir, n=4):
+    dictBkg, hTot, hData = inputs
+    kwargs = {'backend': 'mpl', 'plotdir': plotdir, 'outputs': ['png']}
+    return [{'plot_name': 'p{}'.format(i), 'dictBkg': dictBkg, 'hTot': hTot, 'hData': random_histo('data', 70, seed=i),
+             'kwargs': kwargs} for i in range(n)]
+
+
+@pytest.mark.parametrize('n_workers', [1, 2])
+def test_batch_renders_every_plot_in_order(inputs, tmp_path, n_workers):
+    seen = []
+    specs = _specs(inputs, str(tmp_path), 4)
+    specs[2] = dict(specs[2], kwargs=dict(specs[2]['kwargs'], ratio_type='unknown'))
+    results = plt.make_many_canvases(specs, n_workers=n_workers, validate=False, on_result=seen.append)
+    assert [r.plot_name for r in results] == [r.plot_name for r in seen] == ['p0', 'p1', 'p2', 'p3']
+    assert [r.ok for r in results] == [True, True, False, True] and 'NameError' in results[2].error
+    assert all(os.path.isfile(r.outputs[0]) for r in results if r.ok)
+
+
+def test_batch_validation_and_cache(inputs, tmp_path):
+    specs = _specs(inputs, str(tmp_path), 3)
+    bad = dict(specs[0], hData=random_histo('data', 70, nbins=5))
+    with pytest.raises(ValueError):
+        plt.make_many_canvases([bad]+specs, n_workers=1)
+    first = plt.make_many_canvases(specs, n_workers=1, use_cache=True)
+    second = plt.make_many_canvases(specs, n_workers=1, use_cache=True)
+    assert not any(r.cached for r in first) and all(r.cached and r.ok for r in second)
+    assert [r.outputs for r in first] == [r.outputs for r in second]
+
+
+def test_batch_default_mpl_outputs(inputs, tmp_path):
+    specs = [dict(spec, kwargs={'backend': 'mpl', 'plotdir': str(tmp_path)}) for spec in _specs(inputs, str(tmp_path), 2)]
+    first = plt.make_many_canvases(specs, n_workers=1, use_cache=True)
+    assert [sorted(os.path.splitext(p)[1] for p in r.outputs) for r in first] == [['.pdf', '.png']]*2
+    assert all(os.path.isfile(p) for r in first for p in r.outputs)
+    plt.reset_cache_stats()
+    second = plt.make_many_canvases(specs, n_workers=1, use_cache=True)
+    assert all(r.cached for r in second) and plt.cache_stats()['hits'] == 2
+
+
+def _load_or_die(i):
+    '''Loader killing its worker process for plot 2'''
+    if i == 2:
+        os._exit(1)
+    b1 = random_histo('b1', 50, seed=1)
+    return {'b1': [b1, 2, 'B1']}, b1, random_histo('data', 50, seed=i)
+
+
+def test_batch_survives_a_dead_worker(tmp_path):
+    specs = [{'plot_name': 'p{}'.format(i), 'loader': _load_or_die, 'loader_args': (i,),
+              'kwargs': {'backend': 'mpl', 'plotdir': str(tmp_path), 'outputs': ['png']}} for i in range(6)]
+    results = plt.make_many_canvases(specs, n_workers=2, max_plots_per_worker=1, validate=False)
+    assert [r.plot_name for r in results] == ['p{}'.format(i) for i in range(6)]
+    assert not results[2].ok and 'BrokenProcessPool' in results[2].error
+    # The next workers are new ones
+    assert all(r.ok for r in results[:2]+results[4:])
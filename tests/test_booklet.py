@@ -0,0 +1,75 @@
+import os
+import re
+import json
+
+import pytest
+
+import hepplotting as plt
+from hepplotting.booklet import Booklet
+
+from conftest import random_histo
+
+
+def _n_pages(path):
+    with open(path, 'rb') as f:
+        return len(re.findall(rb'/Type\s*/Page\b', f.read()))
+
+
+def _mpl_plot(inputs, name, booklet, seed=0):
+    dictBkg, hTot, hData = inputs
+    return plt.make_nice_canvas(dictBkg, hTot, random_histo('data', 70, seed=seed), name, backend='mpl',
+                                plotdir=booklet.plotdir, booklet=booklet)
+
+
+def test_mpl_booklet_pages_and_shards(inputs, tmp_path):
+    plotdir = str(tmp_path/'booklet')
+    with Booklet('camp', plotdir, max_pages=2) as booklet:
+        for i in range(5):
+            _mpl_plot(inputs, 'p{}'.format(i), booklet, seed=i)
+        with pytest.raises(NameError):
+            _mpl_plot(inputs, 'p0', booklet)
+    # No individual file: only the shards and the index
+    assert sorted(os.listdir(plotdir)) == ['camp_000.pdf', 'camp_001.pdf', 'camp_002.pdf', 'camp_index.json']
+    assert [_n_pages(os.path.join(plotdir, 'camp_00{}.pdf'.format(i))) for i in range(3)] == [2, 2, 1]
+    with open(os.path.join(plotdir, 'camp_index.json')) as f:
+        index = json.load(f)
+    assert [(os.path.basename(e['pdf']), e['page']) for e in index['plots'].values()] == [
+        ('camp_000.pdf', 1), ('camp_000.pdf', 2), ('camp_001.pdf', 1), ('camp_001.pdf', 2), ('camp_002.pdf', 1)]
+    assert index['toc'][os.path.join(plotdir, 'camp_001.pdf')] == [[1, 'p2'], [2, 'p3']]
+    assert all(e['root'] is None for e in index['plots'].values())
+
+
+@pytest.mark.parametrize('n_workers', [1, 2])
+def test_batch_booklet_merged_index(inputs, tmp_path, n_workers):
+    dictBkg, hTot, hData = inputs
+    specs = [{'plot_name': 'p{}'.format(i), 'dictBkg': dictBkg, 'hTot': hTot, 'hData': random_histo('data', 70, seed=i),
+              'kwargs': {'backend': 'mpl', 'plotdir': str(tmp_path)}} for i in range(5)]
+    base = str(tmp_path/'book'/'camp')
+    results = plt.make_many_canvases(specs, n_workers=n_workers, booklet=base, booklet_pages=2)
+    assert all(r.ok and r.outputs == [] for r in results)
+    with open(base+'_index.json') as f:
+        index = json.load(f)
+    assert list(index['plots']) == ['p{}'.format(i) for i in range(5)]
+    assert [r.page for r in results] == list(index['plots'].values())
+    # Every page of every booklet holds one plot, numbered from 1 in each shard
+    assert sum(_n_pages(pdf) for pdf in index['toc']) == 5
+    for pdf, toc in index['toc'].items():
+        assert [page for page, name in toc] == list(range(1, len(toc)+1)) and len(toc) <= 2
+    assert not [f for f in os.listdir(str(tmp_path)) if f.endswith('.png')]
+
+
+def test_root_booklet(root_inputs, tmp_path):
+    ROOT = pytest.importorskip('ROOT')
+    dictBkg, hTot, hData = root_inputs
+    plotdir = str(tmp_path)
+    with Booklet('camp', plotdir, max_pages=2) as booklet:
+        for i in range(3):
+            plt.make_nice_canvas(dictBkg, hTot, hData, 'p{}'.format(i), plotdir=plotdir, booklet=booklet,
+                                 is_logy=bool(i % 2))
+    assert sorted(os.listdir(plotdir)) == ['camp_000.pdf', 'camp_000.root', 'camp_001.pdf', 'camp_001.root',
+                                           'camp_index.json']
+    assert [_n_pages(os.path.join(plotdir, 'camp_00{}.pdf'.format(i))) for i in range(2)] == [2, 1]
+    f = ROOT.TFile.Open(os.path.join(plotdir, 'camp_000.root'))
+    assert sorted(k.GetName() for k in f.GetListOfKeys()) == ['p0', 'p1']
+    assert f.Get('p1').InheritsFrom('TCanvas')
+    f.Close()
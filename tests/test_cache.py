@@ -0,0 +1,64 @@
+from collections import OrderedDict
+
+import pytest
+
+import hepplotting as plt
+from hepplotting.cache import fingerprint
+
+from conftest import random_histo
+
+
+def test_fingerprint_is_stable_across_copies(inputs):
+    dictBkg, hTot, hData = inputs
+    kwargs = {'xtitle': 'm [GeV]', 'outputs': ['png'], 'leg_pos': (0.6, 0.5, 0.9, 0.9)}
+    copied = {n: [v[0].copy()]+v[1:] for n, v in dictBkg.items()}
+    assert fingerprint(dictBkg, hTot, hData, 'p', kwargs) == fingerprint(copied, hTot.copy(), hData.copy(), 'p', dict(kwargs))
+
+
+def test_fingerprint_separates_data_and_cosmetics(inputs):
+    dictBkg, hTot, hData = inputs
+    ref = fingerprint(dictBkg, hTot, hData, 'p', {'atlas_label': 'Internal'})
+    cosmetic = fingerprint(dictBkg, hTot, hData, 'p', {'atlas_label': 'Preliminary'})
+    assert cosmetic.split(':')[0] == ref.split(':')[0] and cosmetic != ref
+    changed = hData.copy()
+    changed.contents[3] += 1
+    assert fingerprint(dictBkg, hTot, changed, 'p', {'atlas_label': 'Internal'}).split(':')[0] != ref.split(':')[0]
+
+
+def test_fingerprint_follows_the_signal_order(inputs):
+    dictBkg, hTot, hData = inputs
+    s1, s2 = [random_histo('s1', 5, seed=5), 2, 10., 'S1'], [random_histo('s2', 5, seed=6), 3, 10., 'S2']
+    kwargs = {'dictSig': OrderedDict([('s1', s1), ('s2', s2)]), 'xtitle': 'm [GeV]', 'atlas_label': 'Internal'}
+    swapped = {'dictSig': OrderedDict([('s2', s2), ('s1', s1)]), 'xtitle': 'm [GeV]', 'atlas_label': 'Internal'}
+    # The first signal is the default one of the bottom panel: the order changes the plot
+    assert fingerprint(dictBkg, hTot, hData, 'p', kwargs) != fingerprint(dictBkg, hTot, hData, 'p', swapped)
+    # but not the order of the key-word arguments themselves
+    reordered = OrderedDict(reversed(list(kwargs.items())))
+    assert fingerprint(dictBkg, hTot, hData, 'p', kwargs) == fingerprint(dictBkg, hTot, hData, 'p', reordered)
+
+
+def test_fingerprint_rejects_unknown_objects(inputs):
+    dictBkg, hTot, hData = inputs
+    with pytest.raises(TypeError):
+        fingerprint(dictBkg, hTot, hData, 'p', {'bin_label': [object()]})
+
+
+def test_cache_hit_on_second_rendering(inputs, tmp_path):
+    dictBkg, hTot, hData = inputs
+    kwargs = dict(backend='mpl', plotdir=str(tmp_path), outputs=['png'], use_cache=True)
+    plt.reset_cache_stats()
+    assert plt.make_nice_canvas(dictBkg, hTot, hData, 'cached', **kwargs) is not None
+    assert plt.make_nice_canvas(dictBkg, hTot, hData, 'cached', **kwargs) is None
+    hData = random_histo('data', 70, seed=4)
+    assert plt.make_nice_canvas(dictBkg, hTot, hData, 'cached', **kwargs) is not None
+    assert plt.cache_stats()['hits'] == 1 and plt.cache_stats()['misses'] == 2
+
+
+def test_graph_fingerprint_uses_points():
+    ROOT = pytest.importorskip('ROOT')
+    g1 = plt.asym_graph([0., 1., 2.], [1., 2.], [0.1, 0.2], [0.3, 0.4], 'g')
+    g2 = plt.asym_graph([0., 1., 2.], [1., 2.], [0.1, 0.2], [0.3, 0.4], 'g')
+    g3 = plt.asym_graph([0., 1., 2.], [1., 2.], [0.1, 0.2], [0.3, 0.5], 'g')
+    h = random_histo('h', 10)
+    digests = [fingerprint({}, h, h, 'p', {'tot_graph': g}) for g in (g1, g2, g3)]
+    assert digests[0] == digests[1] != digests[2]
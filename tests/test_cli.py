@@ -0,0 +1,55 @@
+from collections import OrderedDict
+
+import pytest
+
+from hepplotting.batch import PlotResult
+from hepplotting.cli import expand_plots, parse_shard, in_shard, Checkpoint
+
+
+def _result(name, ok=True):
+    return PlotResult(name, ok, 0., None, [], False, None, None, False)
+
+
+def test_expand_plots_merges_kwargs_in_order():
+    campaign = {'defaults': {'lumi': 140, 'is_logy': False},
+                'field_kwargs': {'variable': {'met': {'xtitle': 'MET', 'is_logy': True}}},
+                'plots': [OrderedDict([('region', ['SR', 'CR']), ('variable', ['met', 'pt']), ('name', '{region}_{variable}'),
+                                       ('kwargs', {'lumi': 36})]),
+                          OrderedDict([('region', 'VR'), ('variable', 'met')])]}
+    plots = expand_plots(campaign)
+    assert [p[0] for p in plots] == ['SR_met', 'SR_pt', 'CR_met', 'CR_pt', 'VR_met']
+    assert plots[0][1] == {'region': 'SR', 'variable': 'met'}
+    assert plots[0][2] == {'lumi': 36, 'is_logy': True, 'xtitle': 'MET'}
+    assert plots[1][2] == {'lumi': 36, 'is_logy': False} and plots[4][2]['lumi'] == 140
+    campaign['plots'].append({'region': 'VR', 'variable': 'met'})
+    with pytest.raises(NameError):
+        expand_plots(campaign)
+
+
+def test_parse_shard():
+    assert parse_shard(None) == (0, 1) and parse_shard(' 3 / 8 ') == (3, 8)
+    for bad in ('8/8', '1', '-1/2'):
+        with pytest.raises(NameError):
+            parse_shard(bad)
+
+
+def test_shards_are_a_stable_partition():
+    names = ['plot_{}'.format(i) for i in range(500)]
+    shards = [[n for n in names if in_shard(n, i, 7)] for i in range(7)]
+    assert sorted(sum(shards, [])) == sorted(names) and min(len(s) for s in shards) > 40
+    # Adding plots does not move the others
+    assert [n for n in names+['new_1', 'new_2'] if in_shard(n, 2, 7)][:len(shards[2])] == shards[2]
+
+
+def test_checkpoint_resume(tmp_path):
+    path = str(tmp_path/'sub'/'done.txt')
+    ckpt = Checkpoint(path)
+    ckpt.add(_result('a'))
+    ckpt.add(_result('b', ok=False))
+    ckpt.close()
+    resumed = Checkpoint(path)
+    assert resumed.done == {'a'}
+    resumed.close()
+    restarted = Checkpoint(path, restart=True)
+    assert restarted.done == set()
+    restarted.close()
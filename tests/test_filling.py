@@ -0,0 +1,59 @@
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from hepplotting.filling import fill_arrays, fill_histograms, iter_chunks, _parts
+
+
+def _columns(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return OrderedDict([('met', rng.exponential(80., n)), ('njets', rng.integers(0, 10, n).astype(np.float64)),
+                        ('weight', rng.normal(1., 0.1, n))])
+
+
+def test_fill_arrays_matches_numpy_histogram():
+    x, w = np.array([-1., 0., 0.5, 1., 9.99, 10., 12., np.nan]), np.arange(8.)
+    edges = np.linspace(0., 10., 11)
+    contents, sumw2 = fill_arrays(x, w, edges)
+    inner, _ = np.histogram(x[1:5], edges, weights=w[1:5])
+    assert np.allclose(contents[1:-1], inner)
+    assert contents[0] == 0. and contents[-1] == 5.+6.
+    assert sumw2[-1] == 25.+36. and np.isclose(contents.sum(), w[:7].sum())
+
+
+@pytest.mark.parametrize('save', [np.savez, np.savez_compressed])
+def test_npz_chunks_match_in_memory(tmp_path, save):
+    data = _columns()
+    path = str(tmp_path/'events.npz')
+    save(path, **data)
+    ref = list(iter_chunks(data, {'met', 'weight'}, 700, 100, 4000))
+    chunks = list(iter_chunks(path, {'met', 'weight'}, 700, 100, 4000))
+    assert len(chunks) == len(ref) == 6
+    for c, r in zip(chunks, ref):
+        assert list(c) == list(r) and all(np.array_equal(c[k], r[k]) for k in r)
+    n_parts = len(_parts(path, 700))
+    assert n_parts == (8 if save is np.savez else 1)
+
+
+def test_fill_histograms_matches_direct_fill(tmp_path):
+    data = _columns()
+    path = str(tmp_path/'events.npz')
+    np.savez(path, **data)
+    histos = fill_histograms({'mc': {'source': path, 'weight': 'weight', 'scale': 2.}, 'data': data},
+                             {'met': (20, 0, 400)}, selections={'SR': 'njets >= 4'}, chunksize=1000, n_workers=1)
+    sel = data['njets'] >= 4
+    contents, sumw2 = fill_arrays(data['met'][sel], 2*data['weight'][sel], np.linspace(0, 400, 21))
+    mc = histos.get('mc', 'met', 'SR')
+    assert np.allclose(mc.contents, contents) and np.allclose(mc.sumw2, sumw2)
+    assert histos.get('data', 'met', 'SR').contents.sum() == sel.sum()
+
+
+def test_flat_syst_is_not_added_to_the_overflow():
+    data = _columns()
+    histos = fill_histograms({'mc': data, 'data': data}, {'met': (10, 0, 100)}, n_workers=1)
+    dictBkg, hTot, hData = histos.make_inputs({'mc': [2, 'MC']}, variable='met', region=None, syst=0.1)
+    h = dictBkg['mc'][0]
+    assert h.contents[-1] > 0
+    assert hTot.sumw2[-1] == h.sumw2[-1]
+    assert np.allclose(hTot.sumw2[:-1], h.sumw2[:-1]+(0.1*h.contents[:-1])**2)
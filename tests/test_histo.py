@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from hepplotting.histo import Histo
+
+
+def test_histo_shape_and_integrals():
+    h = Histo([0., 1., 2., 4.], [1., 2., 3., 4., 5.], [1., 4., 9., 16., 25.], 'h')
+    assert h.nbins == 3
+    assert list(h.values) == [2., 3., 4.] and list(h.errors) == [2., 3., 4.]
+    assert h.integral() == (15., np.sqrt(55.))
+    assert h.integral(flow=False) == (9., np.sqrt(29.))
+
+
+def test_histo_defaults_and_copy():
+    h = Histo(np.linspace(0, 1, 5), [0., -1., 2., 0., 0., 3.])
+    assert np.array_equal(h.sumw2, np.abs(h.contents))
+    c = h.copy('c')
+    c.contents[1] = 7.
+    assert h.contents[1] == -1. and c.name == 'c'
+
+
+def test_histo_rejects_bad_shapes():
+    with pytest.raises(ValueError):
+        Histo([0., 1., 2.], [1., 2., 3.])
+
+
+def test_th1_round_trip_shares_buffers():
+    ROOT = pytest.importorskip('ROOT')
+    h = Histo(np.array([0., 1., 3., 6.]), np.array([1., 2., 3., 4., 5.]), np.array([1., 2., 3., 4., 5.])*2, 'rt')
+    th1 = h.to_th1()
+    assert th1.GetNbinsX() == 3 and th1.GetBinContent(2) == 3. and np.isclose(th1.GetBinError(2), np.sqrt(6.))
+    view = Histo.from_th1(th1)
+    assert np.array_equal(view.edges, h.edges) and np.array_equal(view.contents, h.contents)
+    view.contents[1] = 10.
+    assert th1.GetBinContent(1) == 10.
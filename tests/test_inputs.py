@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from hepplotting.inputs import _pattern_regex, HistoProvider
+
+
+def test_pattern_regex():
+    regex = _pattern_regex('{region}/{variable}/h_{process}.v1')
+    assert regex.match('SR/met/h_ttbar.v1').groupdict() == {'region': 'SR', 'variable': 'met', 'process': 'ttbar'}
+    assert regex.match('SR/met/h_ttbar_v1') is None and regex.match('SR/sub/met/h_ttbar.v1') is None
+
+
+def test_provider_reads_lazily_with_flat_syst(tmp_path):
+    ROOT = pytest.importorskip('ROOT')
+    path = str(tmp_path/'h.root')
+    tfile = ROOT.TFile.Open(path, 'RECREATE')
+    for region in ('SR', 'CR'):
+        directory = tfile.mkdir(region).mkdir('met')
+        directory.cd()
+        for i, process in enumerate(('b1', 'b2', 'data')):
+            h = ROOT.TH1D(process, '', 4, 0., 4.)
+            for b in range(6):
+                h.SetBinContent(b, 10.*(i+1))
+                h.SetBinError(b, 1.)
+            h.Write()
+    tfile.Close()
+    provider = HistoProvider(path, max_cached=2)
+    assert provider.values('region') == ['CR', 'SR'] and len(provider.find(region='SR')) == 3
+    dictBkg, hTot, hData = provider.make_inputs({'b1': [2, 'B1'], 'b2': [4, 'B2']}, syst=0.1, region='SR', variable='met')
+    assert len(provider._cache) == 2 and provider.binning(region='SR', variable='met', process='b1') == (4, 0., 4.)
+    assert hTot.GetBinContent(1) == 30. and np.isclose(hTot.GetBinError(1)**2, 2.+9.)
+    assert np.isclose(hTot.GetBinError(5)**2, 2.)     # no syst on the overflow
+    provider.close()
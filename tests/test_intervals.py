@@ -0,0 +1,91 @@
+import os
+import time
+
+import numpy as np
+
+import hepplotting as plt
+from hepplotting.histo import Histo
+from hepplotting.systematics import graph_arrays
+from hepplotting.intervals import garwood_interval, toy_ratio_interval, gamma_quantile, N_TOYS
+
+# Garwood one sigma intervals (n, lower, upper), from the exact Gamma quantiles
+GARWOOD = [(0, 0., 1.8410), (1, 0.1727, 3.2996), (2, 0.7083, 4.6384), (10, 6.8914, 14.2620), (100, 90.4983, 110.4841)]
+
+
+def test_garwood_known_values():
+    n = np.array([g[0] for g in GARWOOD])
+    err_down, err_up = garwood_interval(n)
+    # Exact with scipy, Wilson-Hilferty (about 1% for n = 1) otherwise
+    assert np.allclose(n-err_down, [g[1] for g in GARWOOD], rtol=0.02, atol=0.005)
+    assert np.allclose(n+err_up, [g[2] for g in GARWOOD], rtol=0.01)
+    assert err_down[0] == 0.
+
+
+def test_garwood_broadcasts_leading_axes():
+    n = np.arange(12.).reshape(3, 4)
+    err_down, err_up = garwood_interval(n)
+    assert err_down.shape == (3, 4) and np.allclose(err_up.ravel(), garwood_interval(n.ravel())[1])
+
+
+def test_gamma_quantile_is_zero_for_zero_shape():
+    assert np.array_equal(gamma_quantile([0.1, 0.9], [0., 0.]), [0., 0.])
+
+
+def test_toys_without_prediction_error_are_garwood():
+    n, pred = np.array([0., 3., 20.]), np.array([2., 3., 10.])
+    ratio, lo, hi = toy_ratio_interval(n, pred, np.zeros(3))
+    err_down, err_up = garwood_interval(n)
+    assert np.allclose(ratio, n/pred) and np.allclose(lo, err_down/pred) and np.allclose(hi, err_up/pred)
+
+
+def test_toys_converge_to_garwood():
+    n, pred = np.array([1., 5., 50.]), np.array([1., 5., 50.])
+    ratio, lo, hi = toy_ratio_interval(n, pred, 1e-6*pred, n_toys=20000)
+    err_down, err_up = garwood_interval(n)
+    assert np.allclose(lo, err_down/pred, rtol=0.05) and np.allclose(hi, err_up/pred, rtol=0.05)
+
+
+def test_toys_include_prediction_error():
+    n, pred = np.full(3, 100.), np.full(3, 100.)
+    narrow = toy_ratio_interval(n, pred, 0.01*pred)
+    wide = toy_ratio_interval(n, pred, 0.2*pred)
+    assert (wide[1] > narrow[1]).all() and (wide[2] > narrow[2]).all()
+    # 1/pred is skewed upwards: the upper error exceeds the quadratic sum of the relative errors
+    assert np.allclose(narrow[2], garwood_interval(n)[1]/pred, rtol=0.1)
+    assert (wide[2] > np.hypot(0.1, 0.2)).all() and (wide[2] < 0.4).all()
+
+
+def test_toys_empty_prediction_and_reproducibility():
+    ratio, lo, hi = toy_ratio_interval([3., 3.], [0., 2.], [0.5, 0.5])
+    assert ratio[0] == lo[0] == hi[0] == 0.
+    assert np.array_equal(hi, toy_ratio_interval([3., 3.], [0., 2.], [0.5, 0.5])[2])
+
+
+def test_toys_time_for_many_bins():
+    rng = np.random.default_rng(1)
+    pred = rng.uniform(1, 100, 10000)
+    start = time.perf_counter()
+    ratio, lo, hi = toy_ratio_interval(rng.poisson(pred), pred, 0.1*pred)
+    assert N_TOYS == 1000 and time.perf_counter()-start < 5.
+    assert lo.shape == hi.shape == (10000,) and (hi > 0).all()
+
+
+def _primitives(canv, pad, cls):
+    return [p for p in canv.GetPrimitive(pad).GetListOfPrimitives() if p.InheritsFrom(cls)]
+
+
+def test_root_asymmetric_error_bars(root_inputs, tmp_path):
+    dictBkg, hTot, hData = root_inputs
+    data = Histo.from_th1(hData).values.copy()
+    for ratio_errors in ('poisson', 'toys'):
+        canv = plt.make_nice_canvas(dictBkg, hTot, hData, 'asym_'+ratio_errors, plotdir=str(tmp_path), outputs=['png'],
+                                    data_errors='poisson', ratio_errors=ratio_errors, n_toys=200)
+        assert os.path.isfile(str(tmp_path/'asym_{}_Internal.png'.format(ratio_errors)))
+        gdata = _primitives(canv, 'padhigh', 'TGraphAsymmErrors')
+        gratio = _primitives(canv, 'padlow', 'TGraphAsymmErrors')
+        # Data are drawn again over the signals
+        assert set(g.GetName() for g in gdata) == {'gdata'} and [g.GetName() for g in gratio] == ['gdataovermc']
+        y, eylow, eyhigh = graph_arrays(gdata[0])
+        err_down, err_up = garwood_interval(data)
+        assert np.allclose(y, data) and np.allclose(eylow, err_down) and np.allclose(eyhigh, err_up)
+        assert gratio[0].GetN() == len(data)
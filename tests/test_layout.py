@@ -0,0 +1,54 @@
+import numpy as np
+
+from hepplotting.layout import auto_layout, log_ymin, text_width, PAD_MARGINS, HEADROOM
+
+EDGES = np.linspace(0., 100., 21)
+LEGEND = ['Data', 'Background 1', 'Background 2', 'Total bkg w/ unc.']
+LABELS = ['#sqrt{s} = 13 TeV, 140 fb^{-1}']
+
+
+def _clear_of_boxes(tops, layout, boxes_ndc, plot_ratio=True, is_logy=False):
+    '''True if every bin under a box stays below its bottom (in frame fraction)'''
+    left, right, bottom, top = PAD_MARGINS[plot_ratio]
+    lo, hi = EDGES[:-1]/100., EDGES[1:]/100.
+    ymin, ymax = layout['ymin'], layout['ymax']
+    if is_logy:
+        frac = (np.log(tops)-np.log(ymin))/(np.log(ymax)-np.log(ymin))
+    else:
+        frac = (tops-ymin)/(ymax-ymin)
+    for x1, y1, x2, y2 in boxes_ndc:
+        fx1, fx2 = (x1-left)/(1-left-right), (x2-left)/(1-left-right)
+        under = (hi > fx1) & (lo < fx2)
+        if (frac[under] > (y1-bottom)/(1-bottom-top)-HEADROOM+1e-9).any():
+            return False
+    return True
+
+
+def test_text_width_ignores_latex_commands():
+    assert text_width('#sqrt{s}', 0.05, 1.) == text_width('s', 0.05, 1.)
+
+
+def test_log_ymin():
+    assert log_ymin(np.array([0., 0.3, 50.])) == 0.1
+    assert log_ymin(np.zeros(3)) == 0.02
+
+
+def test_legend_stays_clear_of_the_content():
+    for tops in (np.linspace(100., 5., 20), np.linspace(5., 100., 20), np.full(20, 50.)):
+        layout = auto_layout(tops[np.newaxis], tops, EDGES, LEGEND, LABELS)
+        assert layout['ymin'] == 0. and layout['ymax'] > tops.max()
+        assert _clear_of_boxes(tops, layout, [layout['leg_pos']])
+
+
+def test_legend_moves_away_from_a_rising_tail():
+    falling = auto_layout(np.linspace(100., 5., 20), None, EDGES, LEGEND, LABELS)
+    rising = auto_layout(np.linspace(5., 100., 20), None, EDGES, LEGEND, LABELS)
+    assert falling['leg_pos'][2] > 0.9
+    assert rising['leg_pos'][0] < falling['leg_pos'][0] and rising['ymax'] < 2*100.
+
+
+def test_log_scale_range():
+    tops = np.logspace(4, 0, 20)
+    layout = auto_layout(tops, tops, EDGES, LEGEND, LABELS, is_logy=True)
+    assert layout['ymin'] == 0.1 and layout['ymax'] > 1e4
+    assert _clear_of_boxes(tops, layout, [layout['leg_pos']], is_logy=True)
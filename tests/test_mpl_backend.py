@@ -0,0 +1,20 @@
+import os
+
+import pytest
+
+import hepplotting as plt
+
+from conftest import random_histo
+
+
+def test_mpl_plot_without_root(inputs, tmp_path):
+    dictBkg, hTot, hData = inputs
+    sig = {'s': [random_histo('s', 5, seed=5), 2, 10., 'Signal']}
+    for ratio_type in ('ratio', 'signif'):
+        fig = plt.make_nice_canvas(dictBkg, hTot, hData, 'm_'+ratio_type, backend='mpl', plotdir=str(tmp_path),
+                                   dictSig=sig, ratio_type=ratio_type, data_errors='poisson', is_logy=True)
+        assert len(fig.axes) == 2
+        assert os.path.isfile(str(tmp_path/'m_{}_Internal.pdf'.format(ratio_type)))
+        assert os.path.isfile(str(tmp_path/'m_{}_Internal.png'.format(ratio_type)))
+    with pytest.raises(NameError):
+        plt.make_nice_canvas(dictBkg, hTot, hData, 'm', backend='mpl', plotdir=str(tmp_path), outputs=['root'])
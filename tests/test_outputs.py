@@ -0,0 +1,19 @@
+import pytest
+
+from hepplotting.plot_maker import output_paths
+from hepplotting.writers import parse_outputs, DEFAULT_OUTPUTS
+
+
+def test_parse_outputs():
+    assert parse_outputs() == DEFAULT_OUTPUTS
+    assert parse_outputs('none') == ()
+    assert parse_outputs(' PNG, pdf ') == ('png', 'pdf')
+    assert parse_outputs(['svg']) == ('svg',)
+    with pytest.raises(NameError):
+        parse_outputs('jpg')
+
+
+def test_output_paths_with_png_variants():
+    paths = output_paths('p', 'out', 'Internal', ['pdf', 'png'], {'thumb': 200, 'half': 0.5})
+    assert paths == ['out/p_Internal.pdf', 'out/p_Internal.png', 'out/p_Internal_half.png', 'out/p_Internal_thumb.png']
+    assert output_paths('p', None, 'Preliminary', 'root') == ['p_Preliminary.root']
@@ -0,0 +1,42 @@
+import io
+import os
+
+from PIL import Image
+
+import hepplotting as plt
+
+from conftest import random_histo
+
+
+def test_mpl_preview_is_made_in_memory(inputs, tmp_path):
+    dictBkg, hTot, hData = inputs
+    preview = plt.make_nice_canvas(dictBkg, hTot, hData, 'prev', backend='mpl', plotdir=str(tmp_path), preview=True)
+    assert os.listdir(str(tmp_path)) == []
+    assert Image.open(io.BytesIO(preview._repr_png_())).size == (450, 400)
+    assert preview._repr_svg_() is None
+    svg = plt.make_nice_canvas(dictBkg, hTot, hData, 'prev', backend='mpl', preview='svg', preview_scale=0.25)
+    assert svg._repr_svg_().lstrip().startswith('<?xml') and svg._repr_png_() is None
+    svg.save(str(tmp_path/'prev.svg'))
+    assert os.path.getsize(str(tmp_path/'prev.svg')) > 0
+
+
+def test_root_previews_in_a_row(root_inputs, tmp_path):
+    '''Previews share one canvas: each one must redraw it cleanly'''
+    dictBkg, hTot, hData = root_inputs
+    sizes = []
+    for i, (fmt, ratio_type, is_logy) in enumerate([('png', 'ratio', False), ('png', 'signif', True), ('svg', 'ratio', True),
+                                                    ('png', None, False), ('svg', 'signif', False), ('png', 'ratio', True)]):
+        sig = {'s': [random_histo('s', 5, seed=i).to_th1(), 2, 10., 'Signal']}
+        preview = plt.make_nice_canvas(dictBkg, hTot, hData, 'prev_{}'.format(i), plotdir=str(tmp_path), dictSig=sig,
+                                       preview=fmt, plot_ratio=ratio_type is not None, ratio_type=ratio_type or 'ratio',
+                                       is_logy=is_logy)
+        assert preview.canvas is plt.preview_session().canvas
+        if fmt == 'png':
+            size = Image.open(io.BytesIO(preview._repr_png_())).size
+            assert size == (preview.canvas.GetWw(), preview.canvas.GetWh())
+            sizes.append((ratio_type is not None, size))
+        else:
+            assert '<svg' in preview._repr_svg_() and preview._repr_png_() is None
+    # The same plot size gives the same image from one preview to the next
+    assert len(set(size for ratio, size in sizes if ratio)) == 1
+    assert os.listdir(str(tmp_path)) == []
@@ -0,0 +1,27 @@
+import hepplotting as plt
+
+
+def _profile(name, total, stages, counts=None):
+    return {'plot_name': name, 'total': total, 'stages': stages, 'counts': counts or {}}
+
+
+def test_summary_of_profiles():
+    profiles = [_profile('a', 1., {'draw': 0.6, 'save': 0.4}, {'clones': 3}),
+                _profile('b', 3., {'draw': 1., 'save': 2.}, {'clones': 2}), None]
+    summary = plt.summarize_profiles(profiles)
+    assert summary['n_plots'] == 2 and summary['total'] == 4.
+    assert list(summary['stages']) == ['draw', 'save']
+    assert summary['stages']['save'] == {'total': 2.4, 'mean': 1.2, 'max': 2., 'fraction': 0.6}
+    assert summary['counts'] == {'clones': 5} and summary['slowest'][0] == ('b', 3.)
+    report = plt.profile_report(profiles)
+    assert report.startswith('2 plots, 4.00 s') and 'clones=5' in report
+
+
+def test_profile_of_a_plot(inputs, tmp_path):
+    dictBkg, hTot, hData = inputs
+    received = []
+    plt.make_nice_canvas(dictBkg, hTot, hData, 'prof', backend='mpl', plotdir=str(tmp_path), outputs=['png'],
+                         profile=received.append)
+    assert len(received) == 1 and received[0] is plt.last_profile()
+    stages = received[0]['stages']
+    assert 'draw' in stages and sum(stages.values()) <= received[0]['total']
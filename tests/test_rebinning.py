@@ -0,0 +1,60 @@
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from hepplotting.histo import Histo
+from hepplotting.rebinning import fold_flow, merge_bins, find_binning, rebin, rebin_inputs
+
+from conftest import random_histo
+
+
+def _falling(nbins=40, seed=0):
+    '''Exponentially falling background with MC weights of 0.5'''
+    rng = np.random.default_rng(seed)
+    contents = np.concatenate([[3.], 0.5*rng.poisson(400*np.exp(-np.arange(nbins)/5.)), [2.]])
+    return contents, 0.5*contents
+
+
+def test_merge_bins_preserves_totals():
+    contents = np.arange(12.)
+    bounds = np.array([1, 4, 6, 10])
+    merged = merge_bins(contents, bounds)
+    assert len(merged) == len(bounds)+1 and merged.sum() == contents.sum()
+    assert list(merged) == [0.+1., 2.+3.+4., 5.+6., 7.+8.+9.+10., 11.]
+    stacked = merge_bins(np.stack([contents, 2*contents]), bounds)
+    assert np.array_equal(stacked[1], 2*merged)
+
+
+def test_fold_flow():
+    contents = fold_flow(np.array([1., 2., 3., 4.]))
+    assert list(contents) == [0., 3., 7., 0.]
+
+
+@pytest.mark.parametrize('from_right', [True, False])
+def test_find_binning_meets_thresholds(from_right):
+    bkg, sumw2 = _falling()
+    data = np.round(bkg)
+    bounds = find_binning(bkg, sumw2, data, max_rel_error=0.1, min_bkg=5., min_data=3, from_right=from_right)
+    assert bounds[0] == 0 and bounds[-1] == len(bkg)-2 and (np.diff(bounds) > 0).all()
+    b, w, d = [merge_bins(fold_flow(a.copy()), bounds)[1:-1] for a in (bkg, sumw2, data)]
+    assert np.isclose(b.sum(), bkg.sum())
+    assert (b >= 5.).all() and (np.sqrt(w) <= 0.1*b).all() and (d >= 3).all()
+
+
+def test_find_binning_keeps_good_bins():
+    bkg = np.full(12, 1000.)
+    assert np.array_equal(find_binning(bkg, bkg, max_rel_error=0.1), np.arange(11))
+
+
+def test_rebin_inputs_is_consistent():
+    b1, b2 = random_histo('b1', 3., nbins=30, seed=1), random_histo('b2', 1., nbins=30, seed=2)
+    dictBkg = OrderedDict([('b1', [b1, 2, 'B1']), ('b2', [b2, 4, 'B2'])])
+    hTot = Histo(b1.edges, b1.contents+b2.contents, b1.sumw2+b2.sumw2, 'tot')
+    hData = random_histo('data', 4., nbins=30, seed=3)
+    dictBkg, tot, data, _, _, bounds = rebin_inputs(dictBkg, hTot, hData, max_rel_error=0.2)
+    assert tot.nbins == len(bounds)-1 < 30
+    assert np.array_equal(dictBkg['b1'][0].edges, tot.edges) and dictBkg['b2'][1:] == [4, 'B2']
+    assert np.allclose(dictBkg['b1'][0].contents+dictBkg['b2'][0].contents, tot.contents)
+    assert data.contents.sum() == hData.contents.sum()
+    assert np.array_equal(rebin(hTot, bounds).contents, tot.contents)
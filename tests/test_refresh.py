@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+import hepplotting as plt
+from hepplotting.cache import fingerprint, refreshable, store_fingerprint
+from hepplotting.scene import cosmetic_changes
+
+
+def test_cosmetic_changes():
+    previous = {'atlas_label': 'Internal', 'leg_pos': [0.6, 0.5, 0.9, 0.9], 'ymax': 100}
+    same = {'atlas_label': 'Internal', 'leg_pos': (0.6, 0.5, 0.9, 0.9), 'ymax': 100}
+    assert cosmetic_changes(previous, same) == {}
+    assert cosmetic_changes(previous, dict(same, atlas_label='Preliminary', lumi=140.)) == {
+        'atlas_label': 'Preliminary', 'lumi': 140.}
+    # Dropped arguments go back to their default, unless it depends on the histograms
+    assert cosmetic_changes(previous, {'leg_pos': (0.6, 0.5, 0.9, 0.9), 'ymax': 100}) == {'atlas_label': 'Internal'}
+    assert cosmetic_changes(previous, {'atlas_label': 'Internal', 'leg_pos': (0.6, 0.5, 0.9, 0.9)}) is None
+    assert cosmetic_changes(previous, dict(same, leg_pos='auto')) is None
+
+
+def test_refreshable_needs_same_data_and_a_root_file(inputs, tmp_path):
+    dictBkg, hTot, hData = inputs
+    plotdir = str(tmp_path)
+    root_path = os.path.join(plotdir, 'p.root')
+    kwargs = {'atlas_label': 'Internal', 'leg_pos': (0.6, 0.5, 0.9, 0.9)}
+    store_fingerprint(fingerprint(dictBkg, hTot, hData, 'p', kwargs), plotdir, 'p', [root_path], kwargs)
+    new = dict(kwargs, atlas_label='Preliminary')
+    assert refreshable(fingerprint(dictBkg, hTot, hData, 'p', new), plotdir, 'p', new) is None
+    open(root_path, 'w').close()
+    assert refreshable(fingerprint(dictBkg, hTot, hData, 'p', new), plotdir, 'p', new) == (
+        root_path, {'atlas_label': 'Preliminary'})
+    other = dict(new, is_logy=True)
+    assert refreshable(fingerprint(dictBkg, hTot, hData, 'p', other), plotdir, 'p', other) is None
+
+
+def test_root_plot_is_refreshed_in_place(inputs, tmp_path):
+    pytest.importorskip('ROOT')
+    dictBkg, hTot, hData = inputs
+    dictBkg = {n: [v[0].to_th1(), v[1], v[2]] for n, v in dictBkg.items()}
+    hTot, hData = hTot.to_th1(), hData.to_th1()
+    kwargs = dict(plotdir=str(tmp_path), outputs=['png', 'root'], use_cache=True)
+    plt.reset_cache_stats()
+    plt.make_nice_canvas(dictBkg, hTot, hData, 'r', **kwargs)
+    plt.make_nice_canvas(dictBkg, hTot, hData, 'r', atlas_label='Preliminary', **kwargs)
+    assert plt.cache_stats()['refreshed'] == 1 and plt.cache_stats()['misses'] == 1
@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def test_import_and_mpl_plots_do_not_load_root(tmp_path):
+    code = '\n'.join([
+        'import sys',
+        'import numpy as np',
+        'import hepplotting as plt',
+        'from hepplotting.histo import Histo',
+        'h = Histo(np.linspace(0, 1, 11), np.arange(12.))',
+        'plt.make_nice_canvas({"b": [h, 2, "B"]}, h, h, "p", backend="mpl", plotdir=sys.argv[1], outputs=["png"])',
+        'assert "ROOT" not in sys.modules and "cppyy" not in sys.modules',
+    ])
+    subprocess.check_call([sys.executable, '-c', code, str(tmp_path)], cwd=ROOT_DIR)
+
+
+def test_style_is_applied_once():
+    pytest.importorskip('ROOT')
+    from hepplotting.root_setup import load_root
+    ROOT = load_root()
+    assert load_root() is ROOT and ROOT.gStyle.GetName() == 'ATLAS'
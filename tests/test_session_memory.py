@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+import hepplotting as plt
+
+N_PLOTS = 300
+MAX_GROWTH_MB = 10.
+
+
+def rss_mb():
+    '''Current resident memory of the process in MB'''
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1])*os.sysconf('SC_PAGE_SIZE')/1024.**2
+
+
+def test_session_memory_is_bounded(tmp_path):
+    '''Same check as benchmarks/bench_memory.py, on fewer plots'''
+    ROOT = pytest.importorskip('ROOT')
+    if not os.path.exists('/proc/self/statm'):
+        pytest.skip('needs /proc/self/statm')
+    ROOT.gROOT.SetBatch(True)
+    ROOT.gErrorIgnoreLevel = ROOT.kWarning
+
+    def histo(name, i, n):
+        h = ROOT.TH1F('{}_{}'.format(name, i), name, 50, -5, 10)
+        h.FillRandom('gaus', n)
+        return h
+
+    warmup = N_PLOTS//5
+    with plt.PlotSession() as session:
+        for i in range(N_PLOTS):
+            dictBkg = {b: [histo(b, i, 500), c, b] for b, c in (('bkg1', 868), ('bkg2', 867))}
+            dictSig = {'s': [histo('s', i, 100), ROOT.kRed+1, 20, 'signal']}
+            hTot = plt.sum_histograms([v[0] for v in dictBkg.values()], name='tot_{}'.format(i))
+            plt.make_nice_canvas(dictBkg, hTot, histo('data', i, 1000), 'mem', dictSig=dictSig,
+                                 ratio_type=('ratio', 'signif')[i % 2], is_logy=bool(i % 3), plotdir=str(tmp_path),
+                                 outputs='none', session=session)
+            if i+1 == warmup:
+                rss0 = rss_mb()
+        assert session.n_plots == N_PLOTS
+    growth = rss_mb()-rss0
+    assert growth < MAX_GROWTH_MB, 'memory grew by {:.1f} MB over {} plots'.format(growth, N_PLOTS-warmup)
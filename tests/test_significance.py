@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from hepplotting.histo import Histo
+from hepplotting.significance import (s_over_sqrt_b, asimov_z, cumulative_significance, optimal_cut,
+                                      significance, significance_array, save_significance)
+
+
+def test_asimov_reference_values():
+    # Z_A = sqrt(2((s+b)ln(1+s/b)-s)), close to s/sqrt(b) for s << b
+    assert np.isclose(asimov_z(10., 100.), np.sqrt(2*(110*np.log(1.1)-10)))
+    assert np.isclose(asimov_z(1., 1e6), 1e-3, rtol=1e-3)
+    assert np.isclose(asimov_z(5., 10., 0.), asimov_z(5., 10.))
+    assert asimov_z(10., 100., 100.) < asimov_z(10., 100.)
+    assert np.isclose(s_over_sqrt_b(10., 64., 36.), 1.)
+
+
+def test_empty_bins_give_zero():
+    z = asimov_z([1., 0., 3.], [0., 5., np.inf], [0., 1., 1.])
+    assert np.array_equal(z, [0., 0., 0.])
+
+
+def test_signals_are_computed_at_once():
+    s = np.array([[1., 2., 3.], [4., 5., 6.]])
+    b, berr2 = np.array([10., 20., 30.]), np.array([1., 2., 3.])
+    z = asimov_z(s, b, berr2)
+    assert z.shape == (2, 3)
+    assert np.allclose(z[1], [asimov_z(si, bi, ei) for si, bi, ei in zip(s[1], b, berr2)])
+
+
+def test_cumulative_significance_and_optimal_cut():
+    s, b = np.array([0., 1., 5., 5.]), np.array([100., 50., 5., 1.])
+    z = cumulative_significance(s, b)
+    assert np.isclose(z[0], asimov_z(11., 156.)) and np.isclose(z[-1], asimov_z(5., 1.))
+    ibin, zmax = optimal_cut(s, b)
+    assert zmax == z.max() and ibin == np.argmax(z)
+
+
+def test_significance_kinds(tmp_path):
+    edges = np.linspace(0., 1., 4)
+    tot = Histo(edges, [0., 10., 20., 30., 0.], [0., 1., 2., 3., 0.])
+    sig = {'a': [Histo(edges, [0., 1., 2., 3., 0.])], 'b': [Histo(edges, [0., 3., 2., 1., 0.])]}
+    names, z = significance_array(sig, tot, 'signif', signals=['b'])
+    assert names == ['b'] and np.allclose(z, significance(np.array([sig['b'][0].contents]), tot.contents, tot.sumw2))
+    with pytest.raises(NameError):
+        significance(1., 1., 0., 'other')
+    path = str(tmp_path/'z.npz')
+    save_significance(path, names, edges, z, 'signif')
+    with np.load(path) as f:
+        assert f['values'].shape == (1, 3) and str(f['kind']) == 'signif'
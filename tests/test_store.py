@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from hepplotting import fill_histograms, build_store, HistoStore
+
+PROCESSES = {'b1': [2, 'B1'], 'b2': [4, 'B2']}
+
+
+@pytest.fixture
+def filled():
+    rng = np.random.default_rng(0)
+    sources = {p: {'x': rng.normal(mean, 20., 3000), 'y': rng.integers(0, 2, 3000)}
+               for p, mean in (('b1', 40.), ('b2', 60.), ('data', 50.))}
+    return fill_histograms(sources, {'x': (15, 0, 100), 'y': [0., 0.5, 1., 2.]},
+                           selections={'SR': 'y > 0', 'CR': 'y < 1'}, n_workers=1)
+
+
+def _same(a, b):
+    return (np.array_equal(a.edges, b.edges) and np.allclose(a.contents, b.contents)
+            and np.allclose(a.sumw2, b.sumw2))
+
+
+@pytest.mark.parametrize('syst', [0., 0.1])
+def test_store_round_trip_matches_filled_histos(filled, tmp_path, syst):
+    path = str(tmp_path/'store')
+    build_store(filled, path, totals=sorted(PROCESSES), syst=0.1)
+    store = HistoStore(path)
+    assert sorted(store.values('region')) == ['CR', 'SR'] and store.values('variable') == ['x', 'y']
+    for region in ('SR', 'CR'):
+        for variable in ('x', 'y'):
+            ref = filled.make_inputs(PROCESSES, syst=syst, region=region, variable=variable)
+            new = store.make_inputs(PROCESSES, syst=syst, region=region, variable=variable)
+            assert list(new[0]) == list(ref[0]) and new[0]['b2'][1:] == ref[0]['b2'][1:]
+            assert all(_same(new[0][p][0], ref[0][p][0]) for p in PROCESSES)
+            assert _same(new[1], ref[1]) and _same(new[2], ref[2])
+    store.close()
+
+
+def test_store_rejects_other_versions(filled, tmp_path):
+    path = str(tmp_path/'store')
+    build_store(filled, path)
+    with open(path+'.json') as f:
+        text = f.read().replace('"version": 1', '"version": 0')
+    with open(path+'.json', 'w') as f:
+        f.write(text)
+    with pytest.raises(IOError):
+        HistoStore(path)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from hepplotting.histo import Histo
+from hepplotting.systematics import combine_systematics, build_total, graph_arrays
+
+NOMINAL = np.array([[10., 20.], [5., 5.]])     # (proc, bin)
+
+
+def test_correlated_shifts_add_linearly():
+    up = NOMINAL[np.newaxis]*1.1                # one nuisance parameter, +10% on both processes
+    total, err_down, err_up = combine_systematics(NOMINAL, up)
+    assert np.allclose(total, [15., 25.])
+    assert np.allclose(err_up, [1.5, 2.5]) and np.allclose(err_down, err_up)
+
+
+def test_uncorrelated_processes_and_parameters_add_in_quadrature():
+    up = NOMINAL[np.newaxis]*1.1
+    err = combine_systematics(NOMINAL, up, correlation=False)[2]
+    assert np.allclose(err, np.hypot(0.1*NOMINAL[0], 0.1*NOMINAL[1]))
+    two = np.stack([NOMINAL*[[1.1], [1.]], NOMINAL*[[1.], [1.1]]])   # one parameter per process
+    assert np.allclose(combine_systematics(NOMINAL, two)[2], err)
+
+
+def test_symmetrize_and_envelope():
+    up, down = NOMINAL[np.newaxis]*1.2, NOMINAL[np.newaxis]*0.9
+    sym = combine_systematics(NOMINAL, up, down)
+    assert np.allclose(sym[1], 0.15*NOMINAL.sum(axis=0)) and np.allclose(sym[1], sym[2])
+    env = combine_systematics(NOMINAL, up, down, method='envelope')
+    assert np.allclose(env[2], 0.2*NOMINAL.sum(axis=0)) and np.allclose(env[1], 0.1*NOMINAL.sum(axis=0))
+    # Both variations upwards: nothing downwards
+    one_sided = combine_systematics(NOMINAL, up, NOMINAL[np.newaxis]*1.1, method='envelope')
+    assert np.allclose(one_sided[1], 0.)
+
+
+def test_stat_and_stacked_plots():
+    up = NOMINAL[np.newaxis]*1.1
+    stat2 = np.array([4., 9.])
+    err = combine_systematics(NOMINAL, up, stat2=stat2)[2]
+    assert np.allclose(err, np.sqrt([1.5**2+4., 2.5**2+9.]))
+    plots = combine_systematics(np.stack([NOMINAL, 2*NOMINAL]), np.stack([up, 2*up]))
+    assert plots[2].shape == (2, 2) and np.allclose(plots[2][1], 2*plots[2][0])
+
+
+def test_bad_options():
+    with pytest.raises(NameError):
+        combine_systematics(NOMINAL, NOMINAL[np.newaxis], method='max')
+    with pytest.raises(ValueError):
+        combine_systematics(NOMINAL, NOMINAL[np.newaxis], correlation=np.eye(3))
+
+
+def test_build_total_down_variations(root_inputs):
+    dictBkg, hTot, hData = root_inputs
+    b1, b2 = (v[0] for v in dictBkg.values())
+    up = Histo.from_th1(b1).copy()
+    up.contents *= 1.1
+    empty = Histo.from_th1(b1).copy()
+    empty.contents[:] = 0.
+    variations = {'mirrored': {'b1': (up.to_th1('b1_up'), None)},
+                  'empty_down': {'b2': (b2.Clone('b2_up'), empty.to_th1('b2_down'))}}
+    hsyst, gsyst = build_total(dictBkg, variations, method='envelope', stat=False)
+    nominal = Histo.from_th1(hTot).values
+    y, eylow, eyhigh = graph_arrays(gsyst)
+    # An empty down variation is used as is, not mirrored
+    assert np.allclose(eylow, np.hypot(0.1*Histo.from_th1(b1).values, Histo.from_th1(b2).values))
+    assert np.allclose(eyhigh, 0.1*Histo.from_th1(b1).values) and np.allclose(y, nominal)
@@ -0,0 +1,135 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+import hepplotting as plt
+from hepplotting.profiling import StageTimer, summarize_profiles
+from hepplotting.unroll import unroll_arrays, thin_labels, MAX_BIN_LABELS
+
+
+def _arrays(nx=3, ny=2, nz=None):
+    '''contents with under/overflow where the in-range bin (ix, iy, iz) holds 1+ix+10*iy+100*iz'''
+    shape = (nx+2, ny+2) if nz is None else (nx+2, ny+2, nz+2)
+    contents = np.zeros(shape)
+    index = np.indices(shape)
+    inner = tuple(slice(1, -1) for _ in shape)
+    contents[inner] = (1+(index[0]-1)+10*(index[1]-1)+(100*(index[2]-1) if nz else 0))[inner]
+    edges = [np.linspace(0, 1, n+1) for n in (nx, ny, nz) if n]
+    return contents, 2*contents, edges
+
+
+def test_unroll_order_2d():
+    contents, sumw2, edges = _arrays()
+    h, groups = unroll_arrays(contents, sumw2, edges, titles=['y'])
+    assert list(h.contents[1:-1]) == [1, 2, 3, 11, 12, 13]
+    assert np.array_equal(h.sumw2, 2*h.contents)
+    assert h.contents[0] == h.contents[-1] == 0
+    assert np.array_equal(h.edges, np.arange(7))
+    assert groups == [('0 < y < 0.5', 0., 3.), ('0.5 < y < 1', 3., 6.)]
+
+
+def test_unroll_order_3d():
+    nx, ny, nz = 2, 3, 2
+    contents, sumw2, edges = _arrays(nx, ny, nz)
+    h, groups = unroll_arrays(contents, sumw2, edges)
+    for ix in range(nx):
+        for iy in range(ny):
+            for iz in range(nz):
+                assert h.contents[1+ix+nx*(iy+ny*iz)] == 1+ix+10*iy+100*iz
+    assert len(groups) == ny*nz and groups[1][0].startswith('[0.333333, 0.666667], [0, 0.5]')
+
+
+def test_unroll_flow_folding():
+    contents, sumw2, edges = _arrays()
+    contents[0, 1] = 5.     # x underflow of the first y bin
+    contents[2, -1] = 7.    # y overflow of the second x bin
+    contents[-1, -1] = 9.   # x and y overflow
+    dropped = unroll_arrays(contents, sumw2, edges)[0]
+    folded = unroll_arrays(contents, sumw2, edges, flow=True)[0]
+    assert dropped.contents.sum() == sum([1, 2, 3, 11, 12, 13])
+    assert list(folded.contents[1:-1]) == [1+5, 2, 3, 11, 12+7, 13+9]
+    assert contents[0, 1] == 5.     # inputs are not modified
+
+
+def test_unroll_rejects_1d():
+    with pytest.raises(ValueError):
+        unroll_arrays(np.zeros(5), np.zeros(5), [np.arange(4.)])
+
+
+def test_thin_labels():
+    few = ['b{}'.format(i) for i in range(MAX_BIN_LABELS)]
+    assert thin_labels(few, 0.04, 1., 0.8) == list(enumerate(few))
+    many = ['bin {}'.format(i) for i in range(1000)]
+    kept = thin_labels(many, 0.04, 1., 0.8)
+    assert kept[0] == (0, 'bin 0') and len(kept) <= MAX_BIN_LABELS
+    steps = set(b[0]-a[0] for a, b in zip(kept, kept[1:]))
+    assert len(steps) == 1
+
+
+def test_unroll_stage_is_summarized():
+    timer = StageTimer('p')
+    for stage in ('cache', 'unroll', 'save', 'custom'):
+        timer.start(stage)
+    stages = summarize_profiles([timer.stop()])['stages']
+    assert list(stages) == ['cache', 'unroll', 'save', 'custom']
+
+
+def _th2(ROOT, name, nx, ny, seed):
+    h = ROOT.TH2F(name, name, nx, 0, 100, ny, 0, 4)
+    h.SetDirectory(0)
+    contents, sumw2 = plt.th1_views(h)
+    contents[:] = np.random.default_rng(seed).poisson(20, contents.size)
+    sumw2[:] = contents
+    return h
+
+
+def test_root_unrolled_th2(tmp_path):
+    ROOT = pytest.importorskip('ROOT')
+    ROOT.gROOT.SetBatch(True)
+    nx, ny = 10, 4
+    dictBkg = {'b1': [_th2(ROOT, 'u_b1', nx, ny, 1), 2, 'B1'], 'b2': [_th2(ROOT, 'u_b2', nx, ny, 2), 4, 'B2']}
+    hTot = plt.sum_histograms([v[0] for v in dictBkg.values()], name='u_tot')
+    canv = plt.make_nice_canvas(dictBkg, hTot, _th2(ROOT, 'u_data', nx, ny, 3), 'unrolled', plotdir=str(tmp_path),
+                                outputs=['png'], unroll={'titles': ['y']})
+    assert os.path.isfile(str(tmp_path/'unrolled_Internal.png'))
+    padhigh = canv.GetPrimitive('padhigh')
+    stack = next(p for p in padhigh.GetListOfPrimitives() if p.InheritsFrom('THStack'))
+    assert all(h.GetNbinsX() == nx*ny for h in stack.GetHists())
+    # One separator between groups and one label per group, in both panels
+    lines = [p for p in padhigh.GetListOfPrimitives() if p.InheritsFrom('TLine')]
+    assert sorted(l.GetX1() for l in lines) == [nx, 2*nx, 3*nx]
+    assert [p.GetTitle() for p in padhigh.GetListOfPrimitives() if p.GetName() == 'bin_group_label'] == [
+        '0 < y < 1', '1 < y < 2', '2 < y < 3', '3 < y < 4']
+    assert len([p for p in canv.GetPrimitive('padlow').GetListOfPrimitives() if p.InheritsFrom('TLine')]) == ny-1
+
+
+def test_root_labels_of_10k_bins(tmp_path):
+    nbins, ngroups = 10000, 100
+    ROOT = pytest.importorskip('ROOT')
+    ROOT.gROOT.SetBatch(True)
+    rng = np.random.default_rng(0)
+
+    def th1(name, mean):
+        h = ROOT.TH1F(name, name, nbins, 0, nbins)
+        contents, sumw2 = plt.th1_views(h)
+        contents[1:-1] = rng.poisson(mean, nbins)
+        sumw2[:] = contents
+        return h
+    dictBkg = {'b1': [th1('l_b1', 20), 2, 'B1'], 'b2': [th1('l_b2', 30), 4, 'B2']}
+    hTot = plt.sum_histograms([v[0] for v in dictBkg.values()], name='l_tot')
+    labels = ['SR{}'.format(i) for i in range(nbins)]
+    groups = [('Channel {}'.format(j), j*nbins//ngroups, (j+1)*nbins//ngroups) for j in range(ngroups)]
+    start = time.perf_counter()
+    canv = plt.make_nice_canvas(dictBkg, hTot, th1('l_data', 50), 'labels', plotdir=str(tmp_path), outputs='none',
+                                bin_label=labels, bin_groups=groups)
+    # Nothing is done per bin: the drawing takes a fraction of a second (the PNG rendering of ROOT does not)
+    assert time.perf_counter()-start < 5.
+    drawn = [hTot.GetXaxis().GetBinLabel(i+1) for i in range(nbins)]
+    kept = [(i, l) for i, l in enumerate(drawn) if l]
+    assert 1 < len(kept) <= MAX_BIN_LABELS and all(labels[i] == l for i, l in kept)
+    padhigh = canv.GetPrimitive('padhigh')
+    # Too many groups for their labels: only the separators are drawn
+    assert len([p for p in padhigh.GetListOfPrimitives() if p.InheritsFrom('TLine')]) == ngroups-1
+    assert not [p for p in padhigh.GetListOfPrimitives() if p.GetName() == 'bin_group_label']
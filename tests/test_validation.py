@@ -0,0 +1,58 @@
+import numpy as np
+
+from hepplotting.histo import Histo
+from hepplotting.validation import validate_specs, validation_report
+
+from conftest import random_histo
+
+
+def _spec(name, dictBkg, hTot, hData, **kwargs):
+    return {'plot_name': name, 'dictBkg': dictBkg, 'hTot': hTot, 'hData': hData, 'kwargs': kwargs}
+
+
+def test_valid_batch_has_no_issues(inputs):
+    assert validate_specs([_spec('ok', *inputs), _spec('ok2', *inputs, ratio_errors='toys')]) == []
+
+
+def test_issues_are_found_per_plot(inputs):
+    dictBkg, hTot, hData = inputs
+    coarse = random_histo('data', 70, nbins=10)
+    shifted = Histo(hData.edges+1., hData.contents, hData.sumw2, 'data')
+    negative = hData.copy()
+    negative.contents[2] = -1.
+    bkg = {'b1': [dictBkg['b1'][0].copy(), 2, 'B1']}
+    bkg['b1'][0].contents[3] = np.nan
+    specs = [_spec('binning', dictBkg, hTot, coarse), _spec('edges', dictBkg, hTot, shifted),
+             _spec('ok', dictBkg, hTot, hData), _spec('negative', dictBkg, hTot, negative),
+             _spec('nan', bkg, hTot, hData), _spec('missing', dictBkg, hTot, None),
+             _spec('options', dictBkg, hTot, hData, ratio_type='signif', bin_label=['a', 'b'])]
+    issues = validate_specs(specs)
+    found = {}
+    for issue in issues:
+        found.setdefault(issue.plot_name, []).append((issue.severity, issue.message))
+    assert 'ok' not in found
+    assert found['binning'] == [('error', 'hData has 10 bins in [0, 100] while hTot has 20 bins in [0, 100]')]
+    assert len(found['edges']) == 1 and found['negative'] == [('error', 'hData has negative contents')]
+    assert found['nan'] == [('error', 'background \'b1\' has NaN or infinite contents or errors')]
+    assert found['missing'] == [('error', 'hData is missing')]
+    assert len(found['options']) == 2 and all(s == 'error' for s, m in found['options'])
+    assert [i.plot_name for i in issues] == sorted([i.plot_name for i in issues], key=[s['plot_name'] for s in specs].index)
+    assert validation_report(issues).startswith('7 error(s), 0 warning(s) in 6 plot(s)')
+
+
+def test_negative_background_is_a_warning(inputs):
+    dictBkg, hTot, hData = inputs
+    bkg = {'b1': [dictBkg['b1'][0].copy(), 2, 'B1']}
+    bkg['b1'][0].contents[1] = -0.5
+    assert [i.severity for i in validate_specs([_spec('w', bkg, hTot, hData)])] == ['warning']
+
+
+def test_loaders_are_only_called_when_asked(inputs):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return inputs
+    spec = {'plot_name': 'lazy', 'loader': loader, 'kwargs': {}}
+    assert validate_specs([spec]) == [] and not calls
+    assert validate_specs([spec], load=True) == [] and calls == [1]
@@ -0,0 +1,77 @@
+import os
+import sys
+import subprocess
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import hepplotting as plt
+from hepplotting.writers import check_png_compression, save_pil_png, _root_compression
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def test_png_variants_from_a_single_rendering(inputs, tmp_path):
+    dictBkg, hTot, hData = inputs
+    plt.make_nice_canvas(dictBkg, hTot, hData, 'sizes', backend='mpl', plotdir=str(tmp_path), outputs=['png'],
+                         png_sizes={'half': 0.5, 'thumb': 200}, png_compression=9)
+    full = Image.open(str(tmp_path/'sizes_Internal.png'))
+    half = Image.open(str(tmp_path/'sizes_Internal_half.png'))
+    thumb = Image.open(str(tmp_path/'sizes_Internal_thumb.png'))
+    assert full.size == (900, 800)
+    assert half.size == (450, 400) and thumb.size == (200, 178)
+
+
+def test_root_png_variants(root_inputs, tmp_path):
+    dictBkg, hTot, hData = root_inputs
+    for compression in (None, 9):
+        name = 'rsizes{}'.format(compression)
+        canv = plt.make_nice_canvas(dictBkg, hTot, hData, name, plotdir=str(tmp_path), outputs=['png', 'pdf'],
+                                    png_sizes={'half': 0.5, 'thumb': 200}, png_compression=compression)
+        full = Image.open(str(tmp_path/'{}_Internal.png'.format(name)))
+        half = Image.open(str(tmp_path/'{}_Internal_half.png'.format(name)))
+        thumb = Image.open(str(tmp_path/'{}_Internal_thumb.png'.format(name)))
+        assert full.size == (canv.GetWw(), canv.GetWh())
+        assert half.size == (full.size[0]//2, full.size[1]//2) and thumb.size[0] == 200
+        assert os.path.isfile(str(tmp_path/'{}_Internal.pdf'.format(name)))
+
+
+def test_variants_are_resampled_from_the_full_image(tmp_path):
+    rng = np.random.default_rng(0)
+    image = Image.fromarray(rng.integers(0, 256, (300, 400, 3), dtype=np.uint8))
+    variants = [(str(tmp_path/'a.png'), 0.5), (str(tmp_path/'b.png'), 0.25)]
+    save_pil_png(image, str(tmp_path/'full.png'), variants)
+    direct = image.resize((100, 75), Image.LANCZOS)
+    assert np.array_equal(np.asarray(Image.open(variants[1][0])), np.asarray(direct))
+
+
+def test_png_compression_levels(tmp_path):
+    rng = np.random.default_rng(0)
+    image = Image.fromarray(np.repeat(rng.integers(0, 4, (200, 200, 1), dtype=np.uint8)*60, 3, axis=2))
+    sizes = []
+    for level in (0, 9):
+        path = str(tmp_path/'c{}.png'.format(level))
+        save_pil_png(image, path, compression=level)
+        sizes.append(os.path.getsize(path))
+    assert sizes[0] > 2*sizes[1]
+
+
+@pytest.mark.parametrize('level', [-1, 10, 2.5, True, '5'])
+def test_png_compression_range(level):
+    with pytest.raises(NameError):
+        check_png_compression(level)
+
+
+def test_root_compression_mapping():
+    # ROOT writes the zlib level int(c*9/100), and takes 0 as its default
+    assert [_root_compression(c)*9//100 for c in range(10)] == list(range(10))
+    assert min(_root_compression(c) for c in range(10)) == 1 and _root_compression(9) == 100
+
+
+def test_default_writer_reports_failures_at_exit(tmp_path):
+    script = 'from hepplotting.writers import default_writer\ndefault_writer().submit("not a canvas", [{!r}])\n'.format(
+        str(tmp_path/'x.png'))
+    proc = subprocess.run([sys.executable, '-c', script], cwd=ROOT_DIR, stderr=subprocess.PIPE, universal_newlines=True)
+    assert proc.returncode == 0
+    assert 'hepplotting: 1 canvas(es) could not be written' in proc.stderr and 'x.png' in proc.stderr
@@ -0,0 +1,41 @@
+import json
+from collections import OrderedDict
+
+import numpy as np
+
+from hepplotting.yields import make_yield_table, format_yield
+
+from conftest import random_histo
+
+
+def test_format_yield():
+    assert format_yield(1234.4, 35.6) == '1234 #pm 36'
+    assert format_yield(12.34, 3.56, latex=True) == '12.3 $\\pm$ 3.6'
+    assert format_yield(12.0, 3.5, is_data=True) == '12'
+
+
+def test_yield_table_values(inputs, tmp_path):
+    dictBkg, hTot, hData = inputs
+    sig = random_histo('s', 5, seed=5)
+    cr = OrderedDict([('b1', dictBkg['b1'])])
+    table = make_yield_table(OrderedDict([('SR', (dictBkg, hTot, hData, {'s': [sig, 2, 1., 'Signal']})),
+                                          ('CR', (cr, hTot, None))]))
+    assert table.regions == ['SR', 'CR']
+    assert [r[0] for r in table.rows] == ['b1', 'b2', 'total', 's', 'data']
+    b1 = dictBkg['b1'][0]
+    assert np.isclose(table.values[0, 0], b1.contents.sum()) and np.isclose(table.errors[0, 0], np.sqrt(b1.sumw2.sum()))
+    assert np.isclose(table.values[2, 0], table.values[0, 0]+table.values[1, 0])
+    assert np.isnan(table.values[1, 1]) and np.isnan(table.values[4, 1]) and table.cell(1, 1) == '-'
+
+    paths = table.write(str(tmp_path/'yields'))
+    with open(paths[2]) as f:
+        dumped = json.load(f)
+    assert set(dumped['CR']) == {'b1', 'total'} and np.isclose(dumped['SR']['data']['yield'], hData.contents.sum())
+    assert 'Signal' in open(paths[0]).read()
+
+
+def test_yield_table_without_flow():
+    h = random_histo('b', 10)
+    h.contents[0] = h.contents[-1] = 100.
+    table = make_yield_table({'r': ({'b': [h, 1, 'B']}, h, None)}, flow=False)
+    assert np.isclose(table.values[0, 0], h.contents[1:-1].sum())